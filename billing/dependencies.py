@@ -45,12 +45,17 @@ async def require_starter_or_pro(current_user: User = Depends(get_current_user))
     return current_user
 
 
+def url_limit_for(plan: str) -> int:
+    """Maximum URLs per scan on ``plan``."""
+    return _URL_LIMITS.get(plan, 10)
+
+
 def check_bulk_url_limit(url_count: int, user: User) -> None:
     """Check if the user is within their plan's URL limit.
 
     Raises HTTPException 403 if the user tries to scan more URLs than their plan allows.
     """
-    limit = _URL_LIMITS.get(user.plan, 10)
+    limit = url_limit_for(user.plan)
     if url_count > limit:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
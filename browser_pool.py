@@ -0,0 +1,233 @@
+"""Long-lived pool of headless browsers shared by every crawl in the process.
+
+Launching Chromium costs seconds and hundreds of MB, so browsers are started
+once and reused. Each slot is recycled after a number of pages, and the slot
+finishing a render is recycled while the pool's browsers together use more
+memory than a pool-wide limit. A slot is health-checked before reuse if it has
+not rendered for a while. A failed launch pauses the pool for a while instead
+of retrying Chromium on every request. Callers queue for a slot and are served
+round-robin by key (e.g. the crawled host) so one large crawl cannot starve the
+others.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_PAGES = int(os.environ.get("BROWSER_MAX_PAGES", "100"))
+BROWSER_POOL_MAX_MEMORY_MB = int(os.environ.get("BROWSER_POOL_MAX_MEMORY_MB", "1024"))
+HEALTH_CHECK_INTERVAL = 60.0
+HEALTH_CHECK_TIMEOUT = 10.0
+RENDER_TIMEOUT = 30.0
+LAUNCH_RETRY_DELAY = 300.0
+
+_HEALTH_CHECK_URL = "raw:<html><body>ok</body></html>"
+
+
+def _browser_memory_mb() -> float:
+    """Return the resident memory of all child processes (the browsers) in MB.
+
+    Reads /proc directly; returns 0.0 on platforms without it.
+    """
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+        page_size = os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0.0
+
+    children: dict[int, list[int]] = {}
+    rss: dict[int, int] = {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields resume after the last ")".
+        fields = stat[stat.rfind(")") + 2:].split()
+        ppid, resident = int(fields[1]), int(fields[21])
+        children.setdefault(ppid, []).append(int(pid))
+        rss[int(pid)] = resident * page_size
+
+    total = 0
+    stack = list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total / (1024 * 1024)
+
+
+class _BrowserSlot:
+    """One browser instance plus its usage counters."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.crawler = None
+        self.pages = 0
+        self.last_checked = 0.0
+
+    async def start(self) -> None:
+        from crawl4ai import AsyncWebCrawler, BrowserConfig
+
+        crawler = AsyncWebCrawler(config=BrowserConfig(headless=True, verbose=False))
+        await crawler.start()
+        self.crawler = crawler
+        self.pages = 0
+        self.last_checked = time.monotonic()
+
+    async def close(self) -> None:
+        crawler, self.crawler = self.crawler, None
+        if crawler is not None:
+            try:
+                await crawler.close()
+            except Exception:
+                logger.warning("Failed to close browser slot %d", self.index, exc_info=True)
+
+    async def is_healthy(self) -> bool:
+        try:
+            result = await asyncio.wait_for(
+                self.crawler.arun(url=_HEALTH_CHECK_URL),
+                timeout=HEALTH_CHECK_TIMEOUT,
+            )
+        except Exception:
+            return False
+        self.last_checked = time.monotonic()
+        return bool(result and result.success)
+
+
+class BrowserPool:
+    """Fixed-size pool of browser slots with fair, keyed queueing."""
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_pages: int = BROWSER_MAX_PAGES,
+        max_pool_memory_mb: int = BROWSER_POOL_MAX_MEMORY_MB,
+    ):
+        self.max_pages = max_pages
+        self.max_pool_memory_mb = max_pool_memory_mb
+        self._launch_retry_at = 0.0
+        self._slots = [_BrowserSlot(i) for i in range(max(1, size))]
+        self._idle: deque[_BrowserSlot] = deque(self._slots)
+        self._waiters: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+
+    async def _acquire(self, key: str) -> _BrowserSlot:
+        if self._idle and not self._waiters:
+            return self._idle.popleft()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(future.result())
+            raise
+
+    def _release(self, slot: _BrowserSlot) -> None:
+        # Serve the longest-waiting key first, then move it to the back so
+        # keys with many queued requests take turns with everyone else.
+        while self._waiters:
+            key, futures = self._waiters.popitem(last=False)
+            while futures:
+                future = futures.popleft()
+                if not future.done():
+                    if futures:
+                        self._waiters[key] = futures
+                    future.set_result(slot)
+                    return
+        self._idle.append(slot)
+
+    async def _start(self, slot: _BrowserSlot) -> None:
+        try:
+            await slot.start()
+        except Exception:
+            # Chromium missing or broken: don't pay a failed launch per page.
+            self._launch_retry_at = time.monotonic() + LAUNCH_RETRY_DELAY
+            raise
+
+    async def _prepare(self, slot: _BrowserSlot) -> None:
+        if slot.crawler is None:
+            await self._start(slot)
+        elif time.monotonic() - slot.last_checked > HEALTH_CHECK_INTERVAL:
+            if not await slot.is_healthy():
+                logger.info("Browser slot %d failed health check, restarting", slot.index)
+                await slot.close()
+                await self._start(slot)
+
+    async def _recycle_if_needed(self, slot: _BrowserSlot) -> None:
+        if slot.pages >= self.max_pages:
+            logger.info("Recycling browser slot %d after %d pages", slot.index, slot.pages)
+            await slot.close()
+        elif self.max_pool_memory_mb and _browser_memory_mb() > self.max_pool_memory_mb:
+            logger.info("Recycling browser slot %d, pool over memory limit", slot.index)
+            await slot.close()
+
+    async def render(self, url: str, key: str = "default") -> str | None:
+        """Render a page and return its DOM HTML, or None if rendering failed.
+
+        Returns None straight away while launches are paused after a failure.
+        """
+        if time.monotonic() < self._launch_retry_at:
+            return None
+
+        from crawl4ai import CrawlerRunConfig
+        from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
+
+        slot = await self._acquire(key)
+        try:
+            await self._prepare(slot)
+            result = await asyncio.wait_for(
+                slot.crawler.arun(
+                    url=url,
+                    config=CrawlerRunConfig(
+                        scraping_strategy=LXMLWebScrapingStrategy(),
+                        verbose=False,
+                    ),
+                ),
+                timeout=RENDER_TIMEOUT,
+            )
+            slot.pages += 1
+            slot.last_checked = time.monotonic()
+            await self._recycle_if_needed(slot)
+        except asyncio.CancelledError:
+            await slot.close()
+            raise
+        except Exception:
+            logger.warning("Browser render failed for %s", url, exc_info=True)
+            await slot.close()
+            return None
+        finally:
+            self._release(slot)
+
+        if not result or not result.success:
+            return None
+        return result.html
+
+    async def close(self) -> None:
+        for slot in self._slots:
+            await slot.close()
+
+
+_pool: BrowserPool | None = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide browser pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+    return _pool
+
+
+async def close_browser_pool() -> None:
+    """Shut down all pooled browsers (called on application shutdown)."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -0,0 +1,84 @@
+"""Small in-process caches shared by the scraper and crawler."""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """LRU cache whose entries expire after a fixed TTL.
+
+    Bounded by entry count and, optionally, by total size as measured by
+    ``sizeof`` (e.g. ``len`` for strings). Least recently used entries are
+    evicted first.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._entries: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            self.pop(key)
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self.pop(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        self._bytes -= entry[1]
+        return entry[2]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+
+# HTML downloaded while discovering pages (fallback crawl), reused by
+# analyze_page so /bulk-analyze does not fetch the same pages again.
+DISCOVERY_HTML_TTL = float(os.environ.get("DISCOVERY_HTML_TTL", "600"))
+DISCOVERY_HTML_MAX_BYTES = int(os.environ.get("DISCOVERY_HTML_MAX_MB", "64")) * 1024 * 1024
+
+discovered_html = TTLCache(
+    ttl=DISCOVERY_HTML_TTL,
+    max_entries=5000,
+    max_bytes=DISCOVERY_HTML_MAX_BYTES,
+    sizeof=len,
+)
@@ -17,6 +17,11 @@ def _build_database_url() -> str:
     return url
 
 
+def persistence_enabled() -> bool:
+    """Whether a database is configured; without one, caches stay in memory only."""
+    return bool(os.environ.get("DATABASE_URL"))
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import Any, Optional
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Integer, PrimaryKeyConstraint, String, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -173,3 +173,98 @@ class BlogPost(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+
+
+class LinkGraphPage(Base):
+    """A scanned page's internal out-links, one row per page of a user's link graph."""
+
+    __tablename__ = "link_graph_pages"
+    __table_args__ = (PrimaryKeyConstraint("owner", "domain", "page_key", name="link_graph_pages_pkey"),)
+
+    owner: Mapped[str] = mapped_column(Text, nullable=False)  # tenant key of the user
+    domain: Mapped[str] = mapped_column(Text, nullable=False)
+    page_key: Mapped[str] = mapped_column(Text, nullable=False)  # the page's dedupe key
+    url: Mapped[str] = mapped_column(Text, nullable=False)
+    outlinks: Mapped[Any] = mapped_column(JSONB, nullable=False, default=list)  # [{"url", "origin"}]
+    scanned_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class PageScanState(Base):
+    """What a page looked like at its last incremental scan, and its result."""
+
+    __tablename__ = "page_scan_states"
+    __table_args__ = (PrimaryKeyConstraint("owner", "domain", "url", name="page_scan_states_pkey"),)
+
+    owner: Mapped[str] = mapped_column(Text, nullable=False)  # tenant key of who scanned
+    domain: Mapped[str] = mapped_column(Text, nullable=False)
+    url: Mapped[str] = mapped_column(Text, nullable=False)
+    lastmod: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    etag: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    last_modified: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    config_hash: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    result: Mapped[Optional[Any]] = mapped_column(JSONB, nullable=True)
+    scanned_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class ScheduledScan(Base):
+    """A recurring re-scan of a saved analysis session."""
+
+    __tablename__ = "scheduled_scans"
+    __table_args__ = (UniqueConstraint("session_id", name="scheduled_scans_session_id_unique"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    session_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("analysis_sessions.id", ondelete="CASCADE"), nullable=False
+    )
+    cron: Mapped[str] = mapped_column(Text, nullable=False)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True, server_default="true")
+    next_run_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_run_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    last_status: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # running, ok, failed
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    # Relationships
+    session: Mapped["AnalysisSession"] = relationship("AnalysisSession")
+
+
+class ScanTask(Base):
+    """One URL of a queued scan job, claimed by workers on any node."""
+
+    __tablename__ = "scan_tasks"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    job_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    url: Mapped[str] = mapped_column(Text, nullable=False)
+    params: Mapped[Optional[Any]] = mapped_column(JSONB, nullable=True)
+    status: Mapped[str] = mapped_column(Text, default="queued", server_default="queued")  # queued, running, done, failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    worker_id: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    result: Mapped[Optional[Any]] = mapped_column(JSONB, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
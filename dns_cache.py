@@ -0,0 +1,216 @@
+"""In-process async DNS cache for outbound fetches.
+
+Crawls and bulk scans connect to the same few hosts thousands of times, often
+through short-lived httpx clients. CachedDNSTransport resolves hostnames
+through one process-wide DNSCache instead of the system resolver on every
+new connection:
+
+- answers are kept for their DNS TTL (clamped to DNS_MIN_TTL..DNS_MAX_TTL);
+  single-label names (e.g. docker-compose services, localhost) and names the
+  DNS servers cannot answer for go to getaddrinfo and are kept for
+  DNS_FALLBACK_TTL; NXDOMAIN is final
+- failed lookups are cached for DNS_NEGATIVE_TTL, so a dead domain is not
+  re-queried for every URL of a scan
+- concurrent lookups of one name share a single query, and the cache holds
+  at most DNS_CACHE_SIZE names
+
+TLS still verifies and sends SNI for the hostname; only the TCP connect uses
+the cached address. Resolver errors of any kind surface as httpx.ConnectError.
+"""
+
+import asyncio
+import ipaddress
+import os
+import socket
+import ssl
+from typing import Awaitable, Callable, Iterable, Optional
+
+import dns.asyncresolver
+import dns.exception
+import dns.rdatatype
+import dns.resolver
+import httpcore
+import httpx
+
+from cache import TTLCache
+from singleflight import SingleFlight
+
+DNS_CACHE_SIZE = int(os.environ.get("DNS_CACHE_SIZE", "1024"))
+DNS_NEGATIVE_TTL = float(os.environ.get("DNS_NEGATIVE_TTL", "30"))
+DNS_MIN_TTL = 5.0
+DNS_MAX_TTL = 3600.0
+DNS_FALLBACK_TTL = 60.0
+DNS_LOOKUP_TIMEOUT = 5.0
+# Addresses of one name tried in turn before a connect counts as failed
+MAX_CONNECT_ADDRESSES = 3
+
+Resolver = Callable[[str], Awaitable[tuple[list[str], float]]]
+
+
+async def system_resolve(host: str) -> tuple[list[str], float]:
+    """Resolve A and AAAA records (IPv4 first) and their TTL; raises OSError."""
+    try:
+        resolver = dns.asyncresolver.get_default_resolver()
+    except dns.resolver.NoResolverConfiguration:
+        resolver = None
+
+    async def query(rdtype) -> Optional[dns.resolver.Answer]:
+        try:
+            return await resolver.resolve(host, rdtype, lifetime=DNS_LOOKUP_TIMEOUT)
+        except (dns.resolver.NoAnswer, dns.resolver.NoNameservers, dns.exception.Timeout):
+            return None
+
+    if resolver is not None and "." in host:
+        results = await asyncio.gather(
+            query(dns.rdatatype.A), query(dns.rdatatype.AAAA), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, dns.resolver.NXDOMAIN):
+                raise OSError(f"cannot resolve {host}: no such domain") from result
+            if isinstance(result, dns.exception.DNSException):
+                # Names dnspython rejects outright, e.g. a label over 63 bytes
+                raise OSError(f"cannot resolve {host}: {result}") from result
+            if isinstance(result, BaseException):
+                raise result
+        answers = [answer for answer in results if answer is not None]
+        if answers:
+            addresses = [record.address for answer in answers for record in answer]
+            return addresses, min(answer.rrset.ttl for answer in answers)
+
+    # Single-label names (/etc/hosts, docker-compose services) and names the
+    # resolver could not answer for: ask the system
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError) as exc:
+        raise OSError(f"cannot resolve {host}: {exc}") from exc
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    if not addresses:
+        raise OSError(f"cannot resolve {host}")
+    return addresses, DNS_FALLBACK_TTL
+
+
+class _Failure:
+    def __init__(self, message: str):
+        self.message = message
+
+
+class DNSCache:
+    def __init__(
+        self,
+        resolve: Resolver = system_resolve,
+        max_entries: int = DNS_CACHE_SIZE,
+        negative_ttl: float = DNS_NEGATIVE_TTL,
+    ):
+        self._resolve = resolve
+        self.negative_ttl = negative_ttl
+        self._entries = TTLCache(ttl=DNS_MIN_TTL, max_entries=max_entries)
+        self._flights = SingleFlight()
+
+    async def resolve(self, host: str) -> list[str]:
+        """Addresses for ``host``; raises OSError if it does not resolve."""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        host = host.lower().rstrip(".")
+        cached = self._entries.get(host)
+        if cached is None:
+            cached = await self._flights.do(host, lambda: self._lookup(host))
+        if isinstance(cached, _Failure):
+            raise OSError(cached.message)
+        return cached
+
+    async def _lookup(self, host: str) -> "list[str] | _Failure":
+        try:
+            addresses, ttl = await self._resolve(host)
+        except OSError as exc:
+            failure = _Failure(str(exc) or f"cannot resolve {host}")
+            self._entries.set(host, failure, ttl=self.negative_ttl)
+            return failure
+        self._entries.set(host, addresses, ttl=min(max(ttl, DNS_MIN_TTL), DNS_MAX_TTL))
+        return addresses
+
+
+dns_cache = DNSCache()
+
+
+class CachedDNSBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that connects to cached addresses of the requested host."""
+
+    def __init__(self, cache: DNSCache, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._cache = cache
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            addresses = await asyncio.wait_for(self._cache.resolve(host), timeout)
+        except asyncio.TimeoutError as exc:
+            raise httpcore.ConnectTimeout(f"resolving {host} timed out") from exc
+        except Exception as exc:
+            raise httpcore.ConnectError(str(exc) or f"cannot resolve {host}") from exc
+
+        error: Optional[Exception] = None
+        for address in addresses[:MAX_CONNECT_ADDRESSES]:
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+        raise error
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class CachedDNSTransport(httpx.AsyncHTTPTransport):
+    """
+    The standard httpx transport, except that new direct connections resolve
+    hosts through ``dns_cache``. Takes the same options (verify, cert, http2,
+    proxy, ...); through a proxy, name resolution is left to the proxy.
+    """
+
+    def __init__(
+        self,
+        verify: "ssl.SSLContext | str | bool" = True,
+        cert=None,
+        trust_env: bool = True,
+        http1: bool = True,
+        http2: bool = False,
+        limits: httpx.Limits = httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        proxy=None,
+        local_address: Optional[str] = None,
+        retries: int = 0,
+        socket_options: Optional[Iterable] = None,
+    ):
+        super().__init__(
+            verify=verify, cert=cert, trust_env=trust_env, http1=http1, http2=http2, limits=limits,
+            proxy=proxy, local_address=local_address, retries=retries, socket_options=socket_options,
+        )
+        if proxy is None:
+            # httpx has no network_backend option: build the same direct-connection
+            # pool it would, with the caching backend
+            self._pool = httpcore.AsyncConnectionPool(
+                ssl_context=httpx.create_ssl_context(verify=verify, cert=cert, trust_env=trust_env),
+                max_connections=limits.max_connections,
+                max_keepalive_connections=limits.max_keepalive_connections,
+                keepalive_expiry=limits.keepalive_expiry,
+                http1=http1,
+                http2=http2,
+                local_address=local_address,
+                retries=retries,
+                socket_options=socket_options,
+                network_backend=CachedDNSBackend(dns_cache),
+            )
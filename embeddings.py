@@ -6,6 +6,8 @@ from functools import lru_cache
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from url_canonical import dedupe_key
+
 logger = logging.getLogger(__name__)
 
 MODEL_NAME = "all-MiniLM-L6-v2"
@@ -84,6 +86,55 @@ def compute_similarities(
     return results
 
 
+def embed_texts(texts: list[str], batch_size: int = 64) -> np.ndarray:
+    """Encode texts into L2-normalised embeddings (one row per text)."""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return get_model().encode(texts, batch_size=batch_size, normalize_embeddings=True)
+
+
+def best_window_matches(
+    chunks: list[tuple[str, int, int]],
+    chunk_embeddings: np.ndarray,
+    targets: list[dict],
+    target_embeddings: np.ndarray,
+    threshold: float = 0.7,
+) -> list[dict]:
+    """
+    Match pre-computed window embeddings against pre-computed target embeddings.
+
+    Returns:
+        List of match dicts sorted by similarity descending (one per target, best window only).
+    """
+    if not chunks or not targets:
+        return []
+
+    scores = chunk_embeddings @ target_embeddings.T  # (windows, targets)
+    best_window = scores.argmax(axis=0)
+    best_score = scores[best_window, np.arange(len(targets))]
+
+    matches = []
+    seen_targets = set()
+    for target_idx in np.argsort(-best_score, kind="stable"):
+        similarity = float(best_score[target_idx])
+        if similarity < threshold:
+            break
+        target = targets[target_idx]
+        if target["url"] in seen_targets:
+            continue
+        seen_targets.add(target["url"])
+        chunk_text, start_idx, end_idx = chunks[best_window[target_idx]]
+        matches.append({
+            "target_url": target["url"],
+            "target_title": target["title"],
+            "similarity": round(similarity, 4),
+            "matched_text": chunk_text,
+            "start_idx": start_idx,
+            "end_idx": end_idx,
+        })
+    return matches
+
+
 def find_link_opportunities(
     source_content: str,
     targets: list[dict],
@@ -128,3 +179,148 @@ def find_link_opportunities(
             matches.append(pair)
 
     return matches
+
+
+# Windows embedded and scored per block in match_site; bounds the
+# (windows x targets) score block to SITE_MATCH_BLOCK_WINDOWS x SITE_MATCH_BLOCK_TARGETS.
+SITE_MATCH_BLOCK_WINDOWS = 1024
+SITE_MATCH_BLOCK_TARGETS = 4096
+SITE_MATCH_EMBED_BATCH = 256
+
+
+def _top_k(scores: np.ndarray, k: int, axis: int) -> np.ndarray:
+    """Indices of the k largest entries along ``axis``, best first."""
+    k = min(k, scores.shape[axis])
+    if k <= 0:
+        shape = list(scores.shape)
+        shape[axis] = 0
+        return np.zeros(shape, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1, axis=axis).take(np.arange(k), axis=axis)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=axis), axis=axis, kind="stable")
+    return np.take_along_axis(top, order, axis=axis)
+
+
+def _source_blocks(window_counts: list[int], block_windows: int) -> list[list[int]]:
+    """Group consecutive sources so each group has about block_windows windows."""
+    blocks, current, size = [], [], 0
+    for i, count in enumerate(window_counts):
+        if count == 0:
+            continue
+        if current and size + count > block_windows:
+            blocks.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += count
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def match_site(
+    sources: list[dict],
+    targets: list[dict],
+    threshold: float = 0.7,
+    top_per_source: int = 10,
+    top_per_target: int = 10,
+    window_size: int = 120,
+    overlap: int = 30,
+    embed=None,
+) -> tuple[list[list[dict]], list[list[dict]]]:
+    """
+    Match every source page against every target in one batched computation.
+
+    Sources are dicts with "url" and "content"; targets have "url" and "title".
+    Target titles are embedded once; source windows are embedded and scored a
+    block at a time, reducing each block to the best window per
+    (source, target) pair, so memory stays bounded however large the site.
+    A page is never matched to itself.
+
+    Returns:
+        (per_source, per_target): for each source, its top matches as
+        find_link_opportunities-style dicts; for each target, its top sources
+        as dicts with "source_url" instead of target fields. Both best first.
+    """
+    embed = embed or (lambda texts: embed_texts(texts, batch_size=SITE_MATCH_EMBED_BATCH))
+    per_source: list[list[dict]] = [[] for _ in sources]
+    if not sources or not targets:
+        return per_source, [[] for _ in targets]
+
+    target_embeddings = embed([t["title"] for t in targets])
+    target_keys = np.array([dedupe_key(t["url"]) for t in targets], dtype=object)
+    source_chunks = [
+        sliding_window_chunks(s["content"], window_size, overlap) if (s.get("content") or "").strip() else []
+        for s in sources
+    ]
+
+    # Running top-k sources per target: scores, source index, window index
+    k_target = max(top_per_target, 0)
+    best_scores = np.full((k_target, len(targets)), -np.inf, dtype=np.float32)
+    best_sources = np.full((k_target, len(targets)), -1, dtype=np.int64)
+    best_windows = np.zeros((k_target, len(targets)), dtype=np.int64)
+
+    for block in _source_blocks([len(c) for c in source_chunks], SITE_MATCH_BLOCK_WINDOWS):
+        window_embeddings = embed([chunk[0] for i in block for chunk in source_chunks[i]])
+        starts = np.cumsum([0] + [len(source_chunks[i]) for i in block])
+
+        for t0 in range(0, len(targets), SITE_MATCH_BLOCK_TARGETS):
+            t1 = min(t0 + SITE_MATCH_BLOCK_TARGETS, len(targets))
+            scores = window_embeddings @ target_embeddings[t0:t1].T  # (block windows, targets)
+
+            # Best window per (source, target) in this block
+            pair_scores = np.empty((len(block), t1 - t0), dtype=np.float32)
+            pair_windows = np.empty((len(block), t1 - t0), dtype=np.int64)
+            for row, source_idx in enumerate(block):
+                segment = scores[starts[row]:starts[row + 1]]
+                window = segment.argmax(axis=0)
+                pair_windows[row] = window
+                pair_scores[row] = segment[window, np.arange(t1 - t0)]
+                pair_scores[row, target_keys[t0:t1] == dedupe_key(sources[source_idx]["url"])] = -np.inf
+            pair_scores[pair_scores < threshold] = -np.inf
+
+            # Per source: top targets in this target block (merged across blocks below)
+            for row, source_idx in enumerate(block):
+                for col in _top_k(pair_scores[row], top_per_source, axis=0):
+                    if not np.isfinite(pair_scores[row, col]):
+                        break
+                    chunk_text, start_idx, end_idx = source_chunks[source_idx][pair_windows[row, col]]
+                    target = targets[t0 + col]
+                    per_source[source_idx].append({
+                        "target_url": target["url"],
+                        "target_title": target["title"],
+                        "similarity": round(float(pair_scores[row, col]), 4),
+                        "matched_text": chunk_text,
+                        "start_idx": start_idx,
+                        "end_idx": end_idx,
+                    })
+
+            # Per target: merge this block's sources into the running top-k
+            if k_target:
+                merged_scores = np.vstack([best_scores[:, t0:t1], pair_scores])
+                merged_sources = np.vstack([best_sources[:, t0:t1], np.repeat(np.array(block)[:, None], t1 - t0, axis=1)])
+                merged_windows = np.vstack([best_windows[:, t0:t1], pair_windows])
+                keep = _top_k(merged_scores, k_target, axis=0)
+                best_scores[:, t0:t1] = np.take_along_axis(merged_scores, keep, axis=0)
+                best_sources[:, t0:t1] = np.take_along_axis(merged_sources, keep, axis=0)
+                best_windows[:, t0:t1] = np.take_along_axis(merged_windows, keep, axis=0)
+
+    for matches in per_source:
+        matches.sort(key=lambda m: m["similarity"], reverse=True)
+        del matches[top_per_source:]
+
+    per_target: list[list[dict]] = []
+    for col in range(len(targets)):
+        links = []
+        for rank in range(k_target):
+            if not np.isfinite(best_scores[rank, col]):
+                break
+            source_idx = best_sources[rank, col]
+            chunk_text, start_idx, end_idx = source_chunks[source_idx][best_windows[rank, col]]
+            links.append({
+                "source_url": sources[source_idx]["url"],
+                "similarity": round(float(best_scores[rank, col]), 4),
+                "matched_text": chunk_text,
+                "start_idx": start_idx,
+                "end_idx": end_idx,
+            })
+        per_target.append(links)
+    return per_source, per_target
@@ -1,67 +1,306 @@
-"""Fallback page discovery using crawl4ai when no sitemap is available."""
+"""Fallback page discovery when no sitemap is available.
+
+Pages are crawled over plain HTTP (httpx + lxml link extraction). The shared
+headless browser pool is only used for pages whose HTML carries little or no
+content or links, which usually means the page is rendered client-side.
+"""
 
 import asyncio
-from urllib.parse import urlparse
+import heapq
+import itertools
+import re
+import time
+from contextlib import nullcontext
+from urllib.parse import urljoin, urlparse
 
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
-from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
-from crawl4ai.deep_crawling import BFSDeepCrawlStrategy
+import httpx
+import lxml.html
+from lxml.etree import ParserError
 
+from browser_pool import get_browser_pool
+from cache import discovered_html
+from host_limiter import HostThrottle
+from http_client import outbound_transport
 from models import PageInfo
+from robots import crawl_delay, get_robots
+from url_canonical import dedupe_key, strip_tracking
+from work_scheduler import Slot
 
+USER_AGENT = "InternalLinkFinder/1.0 (SEO Analysis Tool)"
 CRAWL_TIMEOUT = 60.0
+PAGE_TIMEOUT = 10.0
+# Links found deeper than this are only followed if they match a pattern.
+MAX_DEPTH = 3
+
+# Number of pages fetched concurrently and the minimum gap between two
+# requests to the same host.
+CRAWL_CONCURRENCY = 4
+HOST_DELAY = 0.25
+
+# Upper bound on queued-but-unfetched URLs, independent of max_pages.
+MAX_FRONTIER = 5000
+
+# A page with fewer words or links than this is treated as client-rendered
+# and re-fetched through the headless browser.
+THIN_PAGE_WORDS = 50
+THIN_PAGE_LINKS = 3
+MAX_BROWSER_ESCALATIONS = 10
+
+_PAGINATION_RE = re.compile(r"/page/\d+|[?&]page=\d+")
+
+_SKIP_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".pdf", ".zip",
+    ".gz", ".mp3", ".mp4", ".avi", ".mov", ".css", ".js", ".json", ".xml",
+    ".woff", ".woff2", ".ttf", ".doc", ".docx", ".xls", ".xlsx", ".ppt",
+)
+
+
+def score_link(url: str, depth: int, patterns: list[str]) -> float:
+    """Score a discovered URL so pages matching the scan patterns are crawled first.
+
+    URLs containing a source/target pattern score highest; URLs that look like
+    hubs leading towards them (e.g. "/blog" for "/blog/", or a path sharing a
+    pattern's words) score next. Deeper and query-string URLs are penalised.
+    """
+    parsed = urlparse(url)
+    path = parsed.path.lower() or "/"
+    full = url.lower()
+    score = 0.0
+
+    for pattern in patterns:
+        if pattern in full:
+            score += 10.0
+            continue
+        stripped = pattern.strip("/")
+        if stripped and path.rstrip("/") == "/" + stripped:
+            score += 8.0
+        elif any(len(token) >= 3 and token in path for token in re.split(r"[/\-_.]+", stripped)):
+            score += 4.0
+
+    if _PAGINATION_RE.search(full):
+        score += 1.0
+    if parsed.query:
+        score -= 2.0
+    return score - depth
+
+
+class _Frontier:
+    """Bounded priority queue of (url, depth) pairs, de-duplicated by canonical URL.
+
+    Highest-scoring URLs pop first; ties keep discovery (breadth-first) order.
+    When full, the lower-scoring half is discarded.
+    """
+
+    def __init__(self, max_size: int = MAX_FRONTIER):
+        self.max_size = max_size
+        self._heap: list[tuple[float, int, str, int]] = []
+        self._seen: set[str] = set()
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, url: str, depth: int, score: float = 0.0) -> None:
+        key = dedupe_key(url)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        if len(self._heap) >= self.max_size:
+            self._heap = heapq.nsmallest(self.max_size // 2, self._heap)
+        heapq.heappush(self._heap, (-score, next(self._counter), url, depth))
+
+    def pop(self) -> tuple[str, int]:
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
 
+    def mark_seen(self, url: str) -> None:
+        self._seen.add(dedupe_key(url))
 
-async def crawl_site(domain: str, max_pages: int) -> list[PageInfo]:
-    """Discover pages on a domain using BFS crawling.
+
+def _normalize_link(base_url: str, href: str) -> str | None:
+    """Resolve an href against its page and strip the fragment."""
+    href = href.strip()
+    if not href or href.startswith(("#", "javascript:", "mailto:", "tel:")):
+        return None
+    absolute = strip_tracking(urljoin(base_url, href))
+    parsed = urlparse(absolute)
+    if parsed.scheme not in ("http", "https"):
+        return None
+    if parsed.path.lower().endswith(_SKIP_EXTENSIONS):
+        return None
+    return absolute
+
+
+def extract_links(html: str, base_url: str, hostname: str) -> tuple[list[str], int]:
+    """Parse HTML with lxml and return (same-host links, word count)."""
+    try:
+        doc = lxml.html.fromstring(html)
+    except (ParserError, ValueError):
+        return [], 0
+
+    links: list[str] = []
+    for anchor in doc.iter("a"):
+        href = anchor.get("href")
+        if not href:
+            continue
+        link = _normalize_link(base_url, href)
+        if link and (urlparse(link).hostname or "") == hostname:
+            links.append(link)
+
+    for element in doc.xpath("//script|//style|//noscript"):
+        element.drop_tree()
+    body = doc.find("body")
+    text = (body if body is not None else doc).text_content()
+    return links, len(text.split())
+
+
+async def _fetch_html(client: httpx.AsyncClient, url: str) -> tuple[str, str] | None:
+    """Fetch a page and return (final_url, html), or None for non-HTML/errors."""
+    try:
+        response = await client.get(url)
+    except (httpx.HTTPError, httpx.InvalidURL):
+        return None
+    if response.status_code != 200:
+        return None
+    content_type = response.headers.get("content-type", "")
+    if "html" not in content_type:
+        return None
+    return str(response.url), response.text
+
+
+class _BrowserEscalation:
+    """Per-crawl budget for rendering thin pages through the shared browser pool."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.used = 0
+
+    async def render(self, url: str) -> str | None:
+        if self.used >= MAX_BROWSER_ESCALATIONS:
+            return None
+        self.used += 1
+        return await get_browser_pool().render(url, key=self.key)
+
+
+async def _crawl_page(
+    client: httpx.AsyncClient,
+    throttle: HostThrottle,
+    browser: _BrowserEscalation,
+    url: str,
+    hostname: str,
+    slot: Slot = nullcontext,
+) -> tuple[str, list[str]] | None:
+    """Fetch one page over HTTP, escalating to the browser if it looks empty."""
+    await throttle.wait(hostname)
+    async with slot():
+        fetched = await _fetch_html(client, url)
+        if fetched is None:
+            return None
+        final_url, html = fetched
+        if (urlparse(final_url).hostname or "") != hostname:
+            return None
+
+        links, word_count = extract_links(html, final_url, hostname)
+        if word_count < THIN_PAGE_WORDS or len(links) < THIN_PAGE_LINKS:
+            rendered = await browser.render(final_url)
+            if rendered:
+                rendered_links, _ = extract_links(rendered, final_url, hostname)
+                if len(rendered_links) > len(links):
+                    links, html = rendered_links, rendered
+
+    # Keep the HTML so the analysis step right after discovery can skip the refetch.
+    discovered_html.set(dedupe_key(final_url), html)
+    return final_url, links
+
+
+async def crawl_site(
+    domain: str,
+    max_pages: int,
+    source_pattern: str = "",
+    target_pattern: str = "",
+    slot: Slot = nullcontext,
+) -> list[PageInfo]:
+    """Discover pages on a domain by crawling internal links.
 
     Used as a fallback when no sitemap is found. Crawls from the homepage
-    following internal links breadth-first.
+    following same-host links over plain HTTP where possible, visiting URLs
+    that match (or lead towards) the source/target patterns first so the page
+    budget is spent on pages the scan can use. robots.txt rules are obeyed and
+    its Crawl-delay, if longer than HOST_DELAY, paces requests.
 
     Args:
         domain: The base URL to crawl (e.g. "https://example.com").
         max_pages: Maximum number of pages to discover.
+        source_pattern: URL pattern for source pages (e.g. "/blog/").
+        target_pattern: URL pattern for target pages (e.g. "/services/").
+        slot: Held around each page fetch (not the politeness delay before it).
 
     Returns:
         List of PageInfo with discovered URLs (lastmod will be None).
     """
-    parsed = urlparse(domain)
-    hostname = parsed.hostname or ""
-
-    strategy = BFSDeepCrawlStrategy(
-        max_depth=3,
-        max_pages=max_pages,
-        include_external=False,
-    )
-
-    browser_config = BrowserConfig(headless=True)
-    run_config = CrawlerRunConfig(
-        deep_crawl_strategy=strategy,
-        scraping_strategy=LXMLWebScrapingStrategy(),
-        verbose=False,
-    )
+    hostname = urlparse(domain).hostname or ""
+    patterns = [p.lower() for p in (source_pattern, target_pattern) if p and p != "/"]
+    deadline = time.monotonic() + CRAWL_TIMEOUT
+
+    robots = await get_robots(domain)
+    throttle = HostThrottle(max(HOST_DELAY, await crawl_delay(domain) or 0.0))
+
+    frontier = _Frontier()
+    if robots.can_fetch(domain):
+        frontier.push(domain, 0)
+    browser = _BrowserEscalation(hostname)
 
     discovered: list[PageInfo] = []
     seen_urls: set[str] = set()
+    pending: dict[asyncio.Task, int] = {}
+
+    async with httpx.AsyncClient(
+        timeout=PAGE_TIMEOUT,
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+        transport=outbound_transport(),
+    ) as client:
+        try:
+            while (frontier or pending) and len(discovered) < max_pages:
+                while (
+                    frontier
+                    and len(pending) < CRAWL_CONCURRENCY
+                    and len(discovered) + len(pending) < max_pages
+                ):
+                    url, depth = frontier.pop()
+                    task = asyncio.create_task(
+                        _crawl_page(client, throttle, browser, url, hostname, slot)
+                    )
+                    pending[task] = depth
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        results = await asyncio.wait_for(
-            crawler.arun(url=domain, config=run_config),
-            timeout=CRAWL_TIMEOUT,
-        )
-
-        # arun with deep crawl returns a list of results
-        if isinstance(results, list):
-            for result in results:
-                url = result.url
-                if url and url not in seen_urls:
-                    # Filter to same domain only
-                    result_host = urlparse(url).hostname or ""
-                    if result_host == hostname:
-                        seen_urls.add(url)
-                        discovered.append(PageInfo(url=url, lastmod=None))
-        elif results and results.url:
-            # Single result fallback
-            discovered.append(PageInfo(url=results.url, lastmod=None))
+                if not pending:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    depth = pending.pop(task)
+                    page = task.result()
+                    if page is None:
+                        continue
+                    final_url, links = page
+                    frontier.mark_seen(final_url)
+                    if dedupe_key(final_url) in seen_urls or len(discovered) >= max_pages:
+                        continue
+                    seen_urls.add(dedupe_key(final_url))
+                    discovered.append(PageInfo(url=final_url, lastmod=None))
+                    for link in links:
+                        if depth >= MAX_DEPTH and not any(p in link.lower() for p in patterns):
+                            continue
+                        if not robots.can_fetch(link):
+                            continue
+                        frontier.push(link, depth + 1, score_link(link, depth + 1, patterns))
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
 
     return discovered
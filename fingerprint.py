@@ -0,0 +1,137 @@
+"""Near-duplicate page detection using 64-bit SimHash fingerprints.
+
+Paginated archives, tag pages and templated location pages often differ by a
+handful of words. Their SimHash fingerprints differ by only a few bits, so
+pages within NEAR_DUPLICATE_DISTANCE bits of each other are treated as
+near-duplicates.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+from cache import TTLCache
+from url_canonical import dedupe_key
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+# 3 of 64 bits ~= 95% similarity.
+NEAR_DUPLICATE_DISTANCE = 3
+
+_TOKEN_RE = re.compile(r"\w+")
+_BIT_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE) -> int | None:
+    """Return the 64-bit SimHash of ``text`` over word shingles, or None if empty."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return None
+    if len(tokens) < shingle_size:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = [
+            " ".join(tokens[i:i + shingle_size])
+            for i in range(len(tokens) - shingle_size + 1)
+        ]
+
+    hashes = np.fromiter((_hash64(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int(np.sum(np.left_shift(np.uint64(1), _BIT_SHIFTS[votes > 0]), dtype=np.uint64))
+
+
+def content_fingerprint(text: str) -> str | None:
+    """SimHash of page content as a 16-character hex string."""
+    value = simhash(text)
+    return None if value is None else f"{value:016x}"
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def similarity(a: str, b: str) -> float:
+    """Similarity (0-1) of two hex fingerprints."""
+    return 1.0 - hamming_distance(int(a, 16), int(b, 16)) / SIMHASH_BITS
+
+
+class NearDuplicateIndex:
+    """Finds previously added fingerprints within ``max_distance`` bits.
+
+    The fingerprint is split into ``max_distance + 1`` bands; by pigeonhole,
+    two fingerprints that close agree exactly on at least one band, so only
+    pages sharing a band are compared.
+    """
+
+    def __init__(self, max_distance: int = NEAR_DUPLICATE_DISTANCE):
+        self.max_distance = max_distance
+        self._bands = max_distance + 1
+        self._band_bits = SIMHASH_BITS // self._bands
+        self._buckets: dict[tuple[int, int], list[tuple[str, int]]] = {}
+
+    def _band_keys(self, value: int) -> list[tuple[int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [(i, (value >> (i * self._band_bits)) & mask) for i in range(self._bands)]
+
+    def find(self, fingerprint: str) -> str | None:
+        """Return the key of an indexed near-duplicate of ``fingerprint``, if any."""
+        value = int(fingerprint, 16)
+        for band in self._band_keys(value):
+            for key, other in self._buckets.get(band, ()):
+                if hamming_distance(value, other) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key: str, fingerprint: str) -> str | None:
+        """Index ``fingerprint`` under ``key``; return the key of an earlier near-duplicate.
+
+        Near-duplicates are not indexed themselves, so every group is
+        represented by its first page.
+        """
+        duplicate_of = self.find(fingerprint)
+        if duplicate_of is None:
+            value = int(fingerprint, 16)
+            for band in self._band_keys(value):
+                self._buckets.setdefault(band, []).append((key, value))
+        return duplicate_of
+
+
+# Fingerprints of recently analyzed pages, used to de-duplicate match targets.
+page_fingerprints = TTLCache(ttl=24 * 3600.0, max_entries=100_000)
+
+
+def remember_fingerprint(url: str, fingerprint: str | None) -> None:
+    if fingerprint:
+        page_fingerprints.set(dedupe_key(url), fingerprint)
+
+
+def dedupe_targets(targets: list[dict]) -> list[dict]:
+    """Drop targets that duplicate an earlier one before embedding.
+
+    Targets are duplicates if they name the same page, or if their pages were
+    analyzed and their content fingerprints are near-duplicates. Titles alone
+    never count: templated sites give many distinct pages the same title.
+
+    Content matching is best-effort: no page is fetched here, so only pages
+    analyzed by this process within the last day have a fingerprint; other
+    targets are kept unless they name the same page as an earlier one.
+    """
+    index = NearDuplicateIndex()
+    seen_urls: set[str] = set()
+    unique: list[dict] = []
+    for target in targets:
+        key = dedupe_key(target["url"])
+        if key in seen_urls:
+            continue
+        fingerprint = page_fingerprints.get(key)
+        if fingerprint and index.add(target["url"], fingerprint) is not None:
+            continue
+        seen_urls.add(key)
+        unique.append(target)
+    return unique
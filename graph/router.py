@@ -0,0 +1,89 @@
+"""Internal link graph analytics router: the signed-in user's own graphs."""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+
+from auth.dependencies import get_current_user
+from db_models import User
+from link_graph import get_graph
+from work_scheduler import user_tenant
+
+router = APIRouter(prefix="/link-graph", tags=["link-graph"])
+
+MAX_LIST_LIMIT = 500
+
+
+# ---------------------------------------------------------------------------
+# Schemas
+# ---------------------------------------------------------------------------
+
+
+class PageMetrics(BaseModel):
+    url: str
+    scanned: bool  # False for pages only known as link targets
+    inlinks: int  # All same-site links, navigation and footers included
+    outlinks: int
+    content_inlinks: int  # Links placed in pages' main content
+    content_outlinks: int
+    click_depth: Optional[int] = None  # None when unreachable from the homepage
+    authority: float  # PageRank-style internal authority; sums to 1 over the site
+
+
+class LinkGraphSummary(BaseModel):
+    domain: str
+    pages: int
+    scanned_pages: int
+    links: int
+    orphan_count: int
+    orphans: list[str]
+    unreachable_count: int  # Scanned pages with no link path from the homepage
+    top_pages: list[PageMetrics]
+
+
+# ---------------------------------------------------------------------------
+# GET /link-graph/{domain}
+# ---------------------------------------------------------------------------
+
+
+@router.get("/{domain}", response_model=LinkGraphSummary)
+async def get_link_graph_summary(
+    domain: str,
+    limit: int = 20,
+    current_user: User = Depends(get_current_user),
+) -> LinkGraphSummary:
+    limit = min(max(limit, 1), MAX_LIST_LIMIT)
+    graph = await get_graph(user_tenant(current_user.id, current_user.plan).key, domain)
+    if not len(graph):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No pages analyzed for this domain")
+
+    orphans = graph.orphans()
+    scanned = graph.scanned
+    return LinkGraphSummary(
+        domain=graph.domain,
+        pages=len(graph),
+        scanned_pages=int(scanned.sum()),
+        links=int(graph.adjacency().nnz),
+        orphan_count=len(orphans),
+        orphans=orphans[:limit],
+        unreachable_count=int((scanned & (graph.click_depths() < 0)).sum()),
+        top_pages=[PageMetrics(**metrics) for metrics in graph.top_pages(limit)],
+    )
+
+
+# ---------------------------------------------------------------------------
+# GET /link-graph/{domain}/page?url=...
+# ---------------------------------------------------------------------------
+
+
+@router.get("/{domain}/page", response_model=PageMetrics)
+async def get_page_metrics(
+    domain: str,
+    url: str,
+    current_user: User = Depends(get_current_user),
+) -> PageMetrics:
+    graph = await get_graph(user_tenant(current_user.id, current_user.plan).key, domain)
+    node = graph.find(url)
+    if node is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Page not in link graph")
+    return PageMetrics(**graph.page_metrics(node))
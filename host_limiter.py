@@ -0,0 +1,171 @@
+"""Adaptive per-host fetch concurrency (AIMD).
+
+Each host starts at HOST_INITIAL_CONCURRENCY concurrent requests. Every
+healthy response adds 1/limit, so the limit grows by about one per round of
+requests; a 429/503/504, a timeout or latency rising well above the host's
+baseline halves it (at most once per round trip, so one burst of failures
+counts once). A Retry-After on a 429/503 pauses new requests to the host
+until it has passed. Fast, CDN-backed sites thus ramp up to
+HOST_MAX_CONCURRENCY while fragile ones settle at one or two.
+"""
+
+import asyncio
+import email.utils
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+HOST_INITIAL_CONCURRENCY = 2
+HOST_MAX_CONCURRENCY = int(os.environ.get("HOST_MAX_CONCURRENCY", "16"))
+MIN_CONCURRENCY = 1.0
+DECREASE_FACTOR = 0.5
+# Latency (smoothed) above this multiple of the host's baseline counts as congestion
+LATENCY_TOLERANCE = 2.0
+LATENCY_SMOOTHING = 0.2
+# Per response, the baseline may creep up by this fraction, tracking slow drift
+BASELINE_DRIFT = 0.01
+MAX_RETRY_AFTER = 120.0
+OVERLOAD_STATUSES = frozenset({429, 503, 504})
+MAX_TRACKED_HOSTS = 4096
+
+
+def retry_after_seconds(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Parse a Retry-After header (seconds or an HTTP date), capped at MAX_RETRY_AFTER."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            moment = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = moment.timestamp() - (time.time() if now is None else now)
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class HostLimit:
+    """The adaptive concurrency limit of one host."""
+
+    def __init__(self, initial: float = HOST_INITIAL_CONCURRENCY, maximum: float = HOST_MAX_CONCURRENCY):
+        self.limit = float(initial)
+        self.maximum = float(maximum)
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # smoothed response time
+        self.baseline: Optional[float] = None  # healthy response time
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._waiters: list[asyncio.Future] = []
+
+    async def acquire(self) -> None:
+        while True:
+            pause = self.paused_until - time.monotonic()
+            if pause <= 0 and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, pause if pause > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        # Waiters re-check the limit and pause themselves
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def on_success(self, elapsed: float) -> None:
+        self.latency = elapsed if self.latency is None else (
+            LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * self.latency
+        )
+        if self.baseline is None:
+            self.baseline = self.latency
+        else:
+            self.baseline = min(self.latency, self.baseline * (1 + BASELINE_DRIFT))
+        if self.latency > self.baseline * LATENCY_TOLERANCE:
+            self.on_overload()
+        else:
+            self.limit = min(self.limit + 1 / self.limit, self.maximum)
+
+    def on_overload(self, retry_after: Optional[float] = None) -> None:
+        now = time.monotonic()
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        # Requests already in flight when the limit was cut report the same congestion
+        if now - self._last_decrease < (self.latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.limit * DECREASE_FACTOR, MIN_CONCURRENCY)
+
+
+class HostThrottle:
+    """Spaces out request start times per host by a fixed delay (politeness, not capacity)."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._next_slot: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host: str) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.delay
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+_limits: "OrderedDict[str, HostLimit]" = OrderedDict()
+
+
+def host_limit(host: str) -> HostLimit:
+    limit = _limits.get(host)
+    if limit is None:
+        limit = _limits[host] = HostLimit()
+        if len(_limits) > MAX_TRACKED_HOSTS:
+            for key, old in list(_limits.items())[: len(_limits) - MAX_TRACKED_HOSTS]:
+                if old.in_flight == 0 and not old._waiters:
+                    del _limits[key]
+    _limits.move_to_end(host)
+    return limit
+
+
+@asynccontextmanager
+async def host_slot(url: str) -> AsyncIterator[HostLimit]:
+    """
+    Hold one of the host's concurrent request slots around a request.
+
+    The outcome adjusts the host's limit: an httpx timeout, or an
+    HTTPStatusError with an overload status, counts as congestion (honouring
+    Retry-After); a normal exit counts as a healthy response with the block's
+    duration as latency. Other errors leave the limit alone.
+    """
+    limit = host_limit((urlparse(url).hostname or "").lower())
+    await limit.acquire()
+    started = time.monotonic()
+    try:
+        yield limit
+    except httpx.TimeoutException:
+        limit.on_overload()
+        raise
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code in OVERLOAD_STATUSES:
+            limit.on_overload(retry_after_seconds(exc.response.headers.get("retry-after")))
+        raise
+    else:
+        limit.on_success(time.monotonic() - started)
+    finally:
+        limit.release()
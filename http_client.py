@@ -0,0 +1,51 @@
+"""Process-wide outbound HTTP client.
+
+Reusing one AsyncClient keeps connections (and their TLS sessions) warm across
+requests instead of paying connection setup on every call. Host lookups of
+this and every other outbound client go through the shared DNS cache, unless
+proxies are configured in the environment (HTTP_PROXY etc.), in which case
+httpx's standard proxy handling applies and the proxy resolves names.
+"""
+
+import urllib.request
+
+import httpx
+
+from dns_cache import CachedDNSTransport
+
+USER_AGENT = "InternalLinkFinder/1.0 (SEO Analysis Tool)"
+DEFAULT_TIMEOUT = 10.0
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            transport=outbound_transport(),
+        )
+    return _client
+
+
+def outbound_transport() -> httpx.AsyncBaseTransport | None:
+    """
+    Transport for an outbound client, resolving hosts through the DNS cache.
+
+    None (httpx's default, honouring the proxy environment) when proxies are configured.
+    """
+    if urllib.request.getproxies():
+        return None
+    return CachedDNSTransport()
+
+
+async def close_http_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,136 @@
+"""Live job progress: workers NOTIFY through Postgres, API nodes relay over SSE.
+
+When a worker writes back a batch of task results it also sends, in the same
+transaction, a ``pg_notify`` on PROGRESS_CHANNEL with each touched job's
+status counts and the tasks that just finished. Postgres delivers the
+notification on commit to every listening connection, so the node a client
+is connected to relays progress no matter which node did the work.
+
+Each API node keeps one LISTEN connection (run_progress_listener) and fans
+notifications out to in-process subscribers of the job, which stream them as
+Server-Sent Events. Clients wait without polling the database.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Any, AsyncIterator
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import _get_engine, async_session_factory
+from db_models import ScanTask
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_CHANNEL = "scan_job_progress"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7500
+SUBSCRIBER_QUEUE_SIZE = 100
+LISTENER_RETRY_DELAY = 5.0
+SSE_KEEPALIVE_SECONDS = 15.0
+
+_subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+
+async def job_counts(db: AsyncSession, job_id: uuid.UUID) -> dict[str, int]:
+    """Number of a job's tasks in each status, plus the total."""
+    rows = (await db.execute(
+        select(ScanTask.status, func.count()).where(ScanTask.job_id == job_id).group_by(ScanTask.status)
+    )).all()
+    counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+    counts.update({status: count for status, count in rows})
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+def is_finished(counts: dict[str, int]) -> bool:
+    return counts["queued"] == 0 and counts["running"] == 0
+
+
+async def publish_progress(db: AsyncSession, finished: dict[uuid.UUID, list[dict[str, Any]]]) -> None:
+    """
+    Queue a progress notification per job; Postgres sends them on commit.
+
+    ``finished`` maps job ids to the tasks (url and status) that just finished.
+    """
+    for job_id, tasks in finished.items():
+        event = {"job_id": str(job_id), **await job_counts(db, job_id), "tasks": tasks}
+        payload = json.dumps(event)
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            payload = json.dumps({**event, "tasks": []})
+        await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": PROGRESS_CHANNEL, "payload": payload})
+
+
+def _dispatch(payload: str) -> None:
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        return
+    for queue in _subscribers.get(event.get("job_id"), ()):
+        if queue.full():
+            # Counts are cumulative, so a slow client only loses intermediate steps
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+async def run_progress_listener() -> None:
+    """Background task: LISTEN for progress notifications, reconnecting on failure."""
+    while True:
+        try:
+            async with _get_engine().connect() as connection:
+                raw = (await connection.get_raw_connection()).driver_connection
+                await raw.add_listener(PROGRESS_CHANNEL, lambda _conn, _pid, _channel, payload: _dispatch(payload))
+                while not raw.is_closed():
+                    await asyncio.sleep(LISTENER_RETRY_DELAY)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Job progress listener disconnected", exc_info=True)
+        await asyncio.sleep(LISTENER_RETRY_DELAY)
+
+
+def subscribe(job_id: uuid.UUID) -> asyncio.Queue:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    _subscribers[str(job_id)].add(queue)
+    return queue
+
+
+def unsubscribe(job_id: uuid.UUID, queue: asyncio.Queue) -> None:
+    queues = _subscribers.get(str(job_id))
+    if queues is not None:
+        queues.discard(queue)
+        if not queues:
+            del _subscribers[str(job_id)]
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def progress_stream(job_id: uuid.UUID, queue: asyncio.Queue, snapshot: dict[str, int]) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for a job: the current counts, then each progress
+    notification (or fresh counts every SSE_KEEPALIVE_SECONDS when quiet),
+    ending with a "done" event once no task is left to run.
+
+    ``queue`` must be subscribed before ``snapshot`` is read so that no
+    notification falls between the two; it is unsubscribed when the stream ends.
+    """
+    try:
+        event = {"job_id": str(job_id), **snapshot, "tasks": []}
+        while not is_finished(event):
+            yield _sse("progress", event)
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Concurrent workers' notifications can each miss the other's
+                # last task, so re-read the counts now and then
+                async with async_session_factory() as db:
+                    event = {"job_id": str(job_id), **await job_counts(db, job_id), "tasks": []}
+        yield _sse("done", event)
+    finally:
+        unsubscribe(job_id, queue)
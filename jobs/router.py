@@ -0,0 +1,140 @@
+"""Queued scan jobs: bulk scans spread over the work queue of every node."""
+import uuid
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.dependencies import get_current_user
+from billing.dependencies import check_bulk_url_limit
+from database import get_db
+from db_models import ScanTask, User
+from job_events import job_counts, progress_stream, subscribe, unsubscribe
+from rate_limit import limiter
+from url_canonical import dedupe_urls
+from work_queue import enqueue_job, job_tasks
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+# ---------------------------------------------------------------------------
+# Schemas
+# ---------------------------------------------------------------------------
+
+
+class JobCreateRequest(BaseModel):
+    urls: list[str]
+    target_pattern: str = "/services/"
+
+
+class JobCreated(BaseModel):
+    job_id: str
+    queued: int
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    total: int
+    queued: int
+    running: int
+    done: int
+    failed: int
+    results: list[Any]  # PageResult of each finished task, in queue order
+    errors: dict[str, Optional[str]]  # url -> error of each failed task
+
+
+# ---------------------------------------------------------------------------
+# POST /jobs
+# ---------------------------------------------------------------------------
+
+
+@limiter.limit("5/minute")
+@router.post("", response_model=JobCreated, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    request: Request,
+    request_body: JobCreateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> JobCreated:
+    urls = dedupe_urls(request_body.urls)
+    if not urls:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No URLs to scan.")
+    check_bulk_url_limit(len(urls), current_user)
+
+    job_id = await enqueue_job(db, current_user.id, urls, {"target_pattern": request_body.target_pattern})
+    return JobCreated(job_id=str(job_id), queued=len(urls))
+
+
+# ---------------------------------------------------------------------------
+# GET /jobs/{job_id}
+# ---------------------------------------------------------------------------
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> JobStatus:
+    try:
+        jid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+
+    tasks = await job_tasks(db, jid, current_user.id)
+    if not tasks:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+
+    statuses = [task.status for task in tasks]
+    return JobStatus(
+        job_id=job_id,
+        total=len(tasks),
+        queued=statuses.count("queued"),
+        running=statuses.count("running"),
+        done=statuses.count("done"),
+        failed=statuses.count("failed"),
+        results=[task.result for task in tasks if task.status == "done"],
+        errors={task.url: task.error for task in tasks if task.status == "failed"},
+    )
+
+
+# ---------------------------------------------------------------------------
+# GET /jobs/{job_id}/events
+# ---------------------------------------------------------------------------
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Server-Sent Events with the job's progress, relayed from whichever node runs its tasks."""
+    try:
+        jid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+
+    owned = await db.scalar(
+        select(ScanTask.id).where(ScanTask.job_id == jid, ScanTask.user_id == current_user.id).limit(1)
+    )
+    if owned is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+
+    queue = subscribe(jid)
+    try:
+        snapshot = await job_counts(db, jid)
+    except Exception:
+        unsubscribe(jid, queue)
+        raise
+    # Return the connection to the pool rather than holding it for the stream
+    await db.commit()
+
+    return StreamingResponse(
+        progress_stream(jid, queue, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,405 @@
+"""Per-user, per-domain internal link graph built from analyze_page results.
+
+Pages analyzed by a signed-in user's scans record every same-site link they
+contain in that user's graph of the domain, tagged by origin: "content" links
+sit in the page's main content, "template" links in navigation, headers,
+footers and sidebars. Structure analytics use all links; content link counts
+are reported alongside. The graph is held in memory as a CSR sparse adjacency
+matrix (rows link to columns, nodes are URL ids) and persisted per page, keyed
+by the page's dedupe key, to the ``link_graph_pages`` table, so it survives
+restarts and is shared with other nodes when they next load the graph.
+
+Analytics (in/out-link counts, orphans, click depth from the homepage and
+PageRank-style authority) are vectorized over the sparse matrix and cached
+until the graph next changes.
+
+Updates are incremental: re-scanning a page replaces only that page's row,
+degree counts are adjusted in place, the CSR matrix is patched rather than
+rebuilt page by page, and authority is re-iterated from the previous scores,
+which converges in a few iterations when little has changed.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from database import async_session_factory, persistence_enabled
+from db_models import LinkGraphPage
+from url_canonical import dedupe_key
+
+logger = logging.getLogger(__name__)
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-6
+PAGERANK_MAX_ITERATIONS = 100
+# Graphs (owner and domain) kept in memory; least recently used graphs are
+# dropped, those with no unsaved changes first.
+MAX_GRAPHS = 256
+LINK_GRAPH_FLUSH_INTERVAL = float(os.environ.get("LINK_GRAPH_FLUSH_INTERVAL", "30"))
+
+
+def site_key(url: str) -> str:
+    """The domain a URL's page belongs to (lowercase host without ``www.``)."""
+    host = urlparse(url if "://" in url else f"https://{url}").hostname or ""
+    return host.lower().removeprefix("www.")
+
+
+@lru_cache(maxsize=200_000)
+def _node_key(url: str) -> str:
+    # www and bare hosts are the same site, so they share nodes too.
+    # Cached: the same navigation links appear on every page of a site.
+    return dedupe_key(url).removeprefix("www.")
+
+
+class LinkGraph:
+    """Internal links between the pages of one domain."""
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.urls: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._outlinks: dict[int, np.ndarray] = {}  # scanned pages only
+        self._content_outlinks: dict[int, np.ndarray] = {}  # the in-content subset
+        # Degree counts, kept current on every update (capacity may exceed len(urls))
+        self._inlinks = np.zeros(1024, dtype=np.int64)
+        self._outlink_counts = np.zeros(1024, dtype=np.int64)
+        self._content_inlinks = np.zeros(1024, dtype=np.int64)
+        self._adjacency: sparse.csr_matrix | None = None
+        self._changed: set[int] = set()  # rows not yet patched into _adjacency
+        self._analytics: dict = {}
+        self._ranks: np.ndarray | None = None  # last authority scores, to warm-start from
+        self.pagerank_iterations = 0
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def node_id(self, url: str) -> int:
+        key = _node_key(url)
+        node = self._ids.get(key)
+        if node is None:
+            node = self._ids[key] = len(self.urls)
+            self.urls.append(url)
+            if node >= len(self._inlinks):
+                self._inlinks = np.concatenate([self._inlinks, np.zeros_like(self._inlinks)])
+                self._outlink_counts = np.concatenate([self._outlink_counts, np.zeros_like(self._outlink_counts)])
+                self._content_inlinks = np.concatenate([self._content_inlinks, np.zeros_like(self._content_inlinks)])
+            self._analytics = {}
+        return node
+
+    def find(self, url: str) -> int | None:
+        return self._ids.get(_node_key(url))
+
+    def set_outlinks(self, url: str, hrefs: list[str], content_hrefs: list[str] | None = None) -> bool:
+        """
+        Record the internal links found on a (re-)scanned page; False if unchanged.
+
+        ``hrefs`` are all of the page's links, ``content_hrefs`` those in its
+        main content (links only found there are added to ``hrefs``).
+        """
+        source = self.node_id(url)
+        self.urls[source] = url  # report pages by the URL they were scanned at
+        linked = self._targets(source, hrefs)
+        new_content = self._targets(source, content_hrefs or [])
+        new = np.union1d(linked, new_content).astype(np.int32)
+
+        old = self._outlinks.get(source)
+        old_content = self._content_outlinks.get(source)
+        if old is not None:
+            if np.array_equal(old, new) and np.array_equal(old_content, new_content):
+                return False
+            self._inlinks[old] -= 1  # targets are unique, so plain fancy indexing is safe
+            self._content_inlinks[old_content] -= 1
+        self._inlinks[new] += 1
+        self._content_inlinks[new_content] += 1
+        self._outlink_counts[source] = len(new)
+        self._outlinks[source] = new
+        self._content_outlinks[source] = new_content
+        if old is None or not np.array_equal(old, new):
+            self._changed.add(source)
+        self._analytics = {}
+        return True
+
+    def _targets(self, source: int, hrefs: list[str]) -> np.ndarray:
+        prefix = f"{self.domain}/"
+        targets = {self.node_id(href) for href in hrefs if _node_key(href).startswith(prefix)}
+        targets.discard(source)
+        return np.fromiter(sorted(targets), dtype=np.int32, count=len(targets))
+
+    def outlinks(self, url: str) -> list[str]:
+        node = self.find(url)
+        if node is None or node not in self._outlinks:
+            return []
+        return [self.urls[target] for target in self._outlinks[node]]
+
+    def tagged_outlinks(self, url: str) -> list[dict]:
+        """The page's links as {"url", "origin"} with origin "content" or "template"."""
+        node = self.find(url)
+        if node is None or node not in self._outlinks:
+            return []
+        content = set(self._content_outlinks[node].tolist())
+        return [
+            {"url": self.urls[target], "origin": "content" if target in content else "template"}
+            for target in self._outlinks[node]
+        ]
+
+    @property
+    def scanned(self) -> np.ndarray:
+        mask = np.zeros(len(self.urls), dtype=bool)
+        mask[list(self._outlinks)] = True
+        return mask
+
+    def adjacency(self) -> sparse.csr_matrix:
+        """CSR matrix with a 1 at (source, target) for every internal link."""
+        n = len(self.urls)
+        if self._adjacency is None or self._changed or self._adjacency.shape[0] != n:
+            self._adjacency = self._patched_adjacency(n)
+            self._changed.clear()
+        return self._adjacency
+
+    def _patched_adjacency(self, n: int) -> sparse.csr_matrix:
+        """Copy unchanged rows from the previous matrix and write the changed ones."""
+        previous = self._adjacency
+        old_n = previous.shape[0] if previous is not None else 0
+        changed = np.fromiter(self._changed, dtype=np.int64, count=len(self._changed))
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(self._outlink_counts[:n], out=indptr[1:])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+
+        if old_n:
+            old_lengths = np.diff(previous.indptr)
+            keep = np.ones(old_n, dtype=bool)
+            keep[changed[changed < old_n]] = False
+            rows = np.repeat(np.arange(old_n), old_lengths)
+            kept = keep[rows]
+            rows = rows[kept]
+            offsets = np.flatnonzero(kept) - previous.indptr[rows]
+            indices[indptr[rows] + offsets] = previous.indices[kept]
+        for row in changed:
+            indices[indptr[row]:indptr[row + 1]] = self._outlinks[row]
+
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(n, n))
+
+    def _cached(self, name: str, compute):
+        if name not in self._analytics:
+            self._analytics[name] = compute()
+        return self._analytics[name]
+
+    def inlink_counts(self) -> np.ndarray:
+        return self._inlinks[:len(self.urls)]
+
+    def outlink_counts(self) -> np.ndarray:
+        return self._outlink_counts[:len(self.urls)]
+
+    def content_inlink_counts(self) -> np.ndarray:
+        return self._content_inlinks[:len(self.urls)]
+
+    def homepage(self) -> int | None:
+        return self._ids.get(f"{self.domain}/")
+
+    def orphans(self) -> list[str]:
+        """Scanned pages (other than the homepage) that no scanned page links to."""
+        orphaned = self.scanned & (self.inlink_counts() == 0)
+        home = self.homepage()
+        if home is not None:
+            orphaned[home] = False
+        return [self.urls[node] for node in np.flatnonzero(orphaned)]
+
+    def click_depths(self) -> np.ndarray:
+        """Links needed to reach each page from the homepage (-1 if unreachable)."""
+        return self._cached("depths", self._click_depths)
+
+    def _click_depths(self) -> np.ndarray:
+        depths = np.full(len(self.urls), -1, dtype=np.int32)
+        home = self.homepage()
+        if home is None:
+            return depths
+        adjacency = self.adjacency()
+        frontier = np.array([home])
+        depth = 0
+        depths[home] = 0
+        while len(frontier):
+            depth += 1
+            reached = np.unique(adjacency[frontier].indices)
+            frontier = reached[depths[reached] < 0]
+            depths[frontier] = depth
+        return depths
+
+    def pagerank(self) -> np.ndarray:
+        """Internal authority by power iteration; scores sum to 1.
+
+        Iteration starts from the previous scores (new pages get the average),
+        so small updates converge quickly.
+        """
+        return self._cached("pagerank", self._pagerank)
+
+    def _pagerank(self) -> np.ndarray:
+        n = len(self.urls)
+        if n == 0:
+            return np.zeros(0)
+        transposed = self.adjacency().T.tocsr()
+        out_degree = self.outlink_counts().astype(np.float64)
+        dangling = out_degree == 0
+        inverse_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+
+        ranks = np.full(n, 1.0 / n)
+        if self._ranks is not None and len(self._ranks):
+            ranks[:len(self._ranks)] = self._ranks
+            ranks /= ranks.sum()
+
+        for iteration in range(1, PAGERANK_MAX_ITERATIONS + 1):
+            spread = PAGERANK_DAMPING * ranks[dangling].sum() + (1.0 - PAGERANK_DAMPING)
+            updated = PAGERANK_DAMPING * (transposed @ (ranks * inverse_degree)) + spread / n
+            converged = np.abs(updated - ranks).sum() < PAGERANK_TOLERANCE
+            ranks = updated
+            if converged:
+                break
+        self.pagerank_iterations = iteration
+        self._ranks = ranks
+        return ranks
+
+    def page_metrics(self, node: int) -> dict:
+        return {
+            "url": self.urls[node],
+            "scanned": node in self._outlinks,
+            "inlinks": int(self.inlink_counts()[node]),
+            "outlinks": int(self.outlink_counts()[node]),
+            "content_inlinks": int(self.content_inlink_counts()[node]),
+            "content_outlinks": len(self._content_outlinks.get(node, ())),
+            "click_depth": int(self.click_depths()[node]) if self.click_depths()[node] >= 0 else None,
+            "authority": float(self.pagerank()[node]),
+        }
+
+    def top_pages(self, limit: int = 20) -> list[dict]:
+        ranks = self.pagerank()
+        top = np.argsort(-ranks, kind="stable")[:limit]
+        return [self.page_metrics(node) for node in top]
+
+
+# ---------------------------------------------------------------------------
+# Registry and persistence
+# ---------------------------------------------------------------------------
+
+# Graphs are keyed by (owner, domain); the owner is the scanning user's tenant key
+_graphs: "OrderedDict[tuple[str, str], LinkGraph]" = OrderedDict()
+_loaded: set[tuple[str, str]] = set()
+_dirty: dict[tuple[str, str], set[str]] = {}
+
+
+def _graph(owner: str, domain: str) -> LinkGraph:
+    key = (owner, domain)
+    graph = _graphs.get(key)
+    if graph is None:
+        graph = _graphs[key] = LinkGraph(domain)
+        excess = len(_graphs) - MAX_GRAPHS
+        if excess > 0:
+            older = [k for k in _graphs if k != key]
+            clean = [k for k in older if k not in _dirty]
+            unsaved = [k for k in older if k in _dirty]
+            for stale in (clean + unsaved)[:excess]:
+                if stale in _dirty:
+                    # Only while the database is unreachable: bound memory over keeping every change
+                    logger.warning("Dropping unsaved link graph changes for %s", stale[1])
+                    del _dirty[stale]
+                del _graphs[stale]
+                _loaded.discard(stale)
+    _graphs.move_to_end(key)
+    return graph
+
+
+def record_outlinks(owner: str, url: str, hrefs: list[str], content_hrefs: list[str] | None = None) -> None:
+    """Record a page's internal links in ``owner``'s graph (called by analyze_page)."""
+    domain = site_key(url)
+    if not domain:
+        return
+    if _graph(owner, domain).set_outlinks(url, hrefs, content_hrefs) and persistence_enabled():
+        _dirty.setdefault((owner, domain), set()).add(_node_key(url))
+
+
+async def get_graph(owner: str, domain: str) -> LinkGraph:
+    """``owner``'s graph of the domain, loading previously persisted pages on first use."""
+    domain = site_key(domain)
+    graph = _graph(owner, domain)
+    if (owner, domain) not in _loaded and persistence_enabled():
+        try:
+            await _load(owner, graph)
+            _loaded.add((owner, domain))
+        except Exception:
+            logger.warning("Could not load link graph for %s", domain, exc_info=True)
+    return graph
+
+
+async def _load(owner: str, graph: LinkGraph) -> None:
+    async with async_session_factory() as db:
+        rows = (await db.execute(
+            select(LinkGraphPage.page_key, LinkGraphPage.url, LinkGraphPage.outlinks)
+            .where(LinkGraphPage.owner == owner, LinkGraphPage.domain == graph.domain)
+        )).all()
+    pending = _dirty.get((owner, graph.domain), set())
+    for page_key, url, outlinks in rows:
+        # Pages scanned since startup are newer than what was persisted
+        if page_key not in pending:
+            links = outlinks or []
+            graph.set_outlinks(
+                url,
+                [link["url"] for link in links],
+                [link["url"] for link in links if link["origin"] == "content"],
+            )
+
+
+async def flush_link_graphs() -> None:
+    """Persist pages whose links changed since the last flush."""
+    if not _dirty or not persistence_enabled():
+        return
+
+    batch = {graph_key: keys for graph_key, keys in _dirty.items()}
+    _dirty.clear()
+    rows = []
+    now = datetime.now(timezone.utc)
+    for (owner, domain), keys in batch.items():
+        graph = _graphs.get((owner, domain))
+        if graph is None:
+            continue
+        for key in keys:
+            url = graph.urls[graph._ids[key]]
+            rows.append({
+                "owner": owner, "domain": domain, "page_key": key, "url": url,
+                "outlinks": graph.tagged_outlinks(url), "scanned_at": now,
+            })
+    try:
+        async with async_session_factory() as db:
+            for start in range(0, len(rows), 1000):
+                statement = insert(LinkGraphPage).values(rows[start:start + 1000])
+                await db.execute(statement.on_conflict_do_update(
+                    index_elements=["owner", "domain", "page_key"],
+                    set_={
+                        "url": statement.excluded.url,
+                        "outlinks": statement.excluded.outlinks,
+                        "scanned_at": statement.excluded.scanned_at,
+                    },
+                ))
+            await db.commit()
+    except Exception:
+        logger.warning("Could not persist link graph updates", exc_info=True)
+        for graph_key, keys in batch.items():
+            _dirty.setdefault(graph_key, set()).update(keys)
+
+
+async def run_link_graph_flusher(interval: float = LINK_GRAPH_FLUSH_INTERVAL) -> None:
+    """Background task: flush link graph updates every ``interval`` seconds."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await flush_link_graphs()
+    finally:
+        await flush_link_graphs()
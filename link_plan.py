@@ -0,0 +1,148 @@
+"""Site-wide internal link plan: assign link opportunities under capacity limits.
+
+Each source page can take links up to the top of the 0.35%-0.7% density band
+(see analyze_page_summary), minus the links it already has; each target
+accepts at most a fixed number of new inlinks. Given scored
+(source, target) opportunities, plan_links picks a feasible set that favours
+the highest similarities.
+
+The assignment is a vectorized greedy in rounds: with edges ranked by
+similarity, every edge that is within the remaining capacity of both its
+source and its target (by rank among the remaining edges of each) is accepted
+at once, capacities are reduced, and exhausted edges are dropped. The best
+remaining edge is always accepted, so each round makes progress; in practice
+a handful of rounds suffices even for tens of thousands of edges.
+"""
+
+import math
+
+import numpy as np
+
+from url_canonical import dedupe_key
+
+# Upper bound of the good density band (links per word), as in analyze_page_summary
+MAX_LINK_DENSITY = 0.007
+DEFAULT_MAX_INLINKS_PER_TARGET = 5
+
+
+def link_headroom(word_count: int, existing_links: int) -> int:
+    """How many more internal links a page can take before its density is too high."""
+    return max(math.floor(word_count * MAX_LINK_DENSITY) - existing_links, 0)
+
+
+def _rank_in_group(groups: np.ndarray) -> np.ndarray:
+    """For edges already in priority order, each edge's position within its group."""
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    ranks = np.empty(len(groups), dtype=np.int64)
+    ranks[order] = np.arange(len(groups)) - np.repeat(starts, sizes)
+    return ranks
+
+
+def plan_links(
+    edge_sources: np.ndarray,
+    edge_targets: np.ndarray,
+    scores: np.ndarray,
+    source_capacity: np.ndarray,
+    target_capacity: np.ndarray,
+) -> np.ndarray:
+    """
+    Choose edges maximising similarity within source and target capacities.
+
+    Args:
+        edge_sources, edge_targets: integer node ids of each candidate edge
+        scores: similarity of each edge
+        source_capacity, target_capacity: links each source may gain and
+            inlinks each target may gain, indexed by node id
+
+    Returns:
+        Indices of the accepted edges, best score first.
+    """
+    source_left = np.array(source_capacity, dtype=np.int64)
+    target_left = np.array(target_capacity, dtype=np.int64)
+    remaining = np.argsort(-np.asarray(scores), kind="stable")
+    accepted = []
+
+    while len(remaining):
+        sources = edge_sources[remaining]
+        targets = edge_targets[remaining]
+        fits = (
+            (_rank_in_group(sources) < source_left[sources])
+            & (_rank_in_group(targets) < target_left[targets])
+        )
+        chosen = remaining[fits]
+        if not len(chosen):
+            break
+        accepted.append(chosen)
+        np.subtract.at(source_left, edge_sources[chosen], 1)
+        np.subtract.at(target_left, edge_targets[chosen], 1)
+
+        remaining = remaining[~fits]
+        remaining = remaining[
+            (source_left[edge_sources[remaining]] > 0) & (target_left[edge_targets[remaining]] > 0)
+        ]
+
+    if not accepted:
+        return np.zeros(0, dtype=np.int64)
+    chosen = np.concatenate(accepted)
+    return chosen[np.argsort(-np.asarray(scores)[chosen], kind="stable")]
+
+
+def build_link_plan(
+    pages: list[dict],
+    opportunities: list[dict],
+    max_inlinks_per_target: int = DEFAULT_MAX_INLINKS_PER_TARGET,
+    min_similarity: float = 0.0,
+) -> list[dict]:
+    """
+    Build a ranked, capacity-feasible link plan for a site.
+
+    Args:
+        pages: source pages as dicts with "url", "word_count",
+            "internal_link_count" and optionally "existing_links" (hrefs)
+        opportunities: dicts with "source_url", "target_url", "similarity"
+            (plus any extra fields, passed through to the plan)
+        max_inlinks_per_target: new inlinks any one target may receive
+        min_similarity: ignore opportunities scoring below this
+
+    Returns:
+        Accepted opportunities, best first. Self-links, links the source
+        already has, duplicate pairs and opportunities from unknown pages are
+        skipped.
+    """
+    page_ids = {dedupe_key(page["url"]): i for i, page in enumerate(pages)}
+    source_capacity = np.array(
+        [link_headroom(page.get("word_count", 0), page.get("internal_link_count", 0)) for page in pages],
+        dtype=np.int64,
+    )
+    existing = {
+        (i, dedupe_key(href))
+        for i, page in enumerate(pages)
+        for href in page.get("existing_links") or []
+    }
+
+    target_ids: dict[str, int] = {}
+    best: dict[tuple[int, int], int] = {}
+    for index, opportunity in enumerate(opportunities):
+        source = page_ids.get(dedupe_key(opportunity["source_url"]))
+        target_key = dedupe_key(opportunity["target_url"])
+        if source is None or opportunity["similarity"] < min_similarity:
+            continue
+        if target_key == dedupe_key(opportunity["source_url"]) or (source, target_key) in existing:
+            continue
+        target = target_ids.setdefault(target_key, len(target_ids))
+        previous = best.get((source, target))
+        if previous is None or opportunity["similarity"] > opportunities[previous]["similarity"]:
+            best[(source, target)] = index
+
+    if not best:
+        return []
+    pairs = np.array(list(best), dtype=np.int64)
+    indices = np.array(list(best.values()), dtype=np.int64)
+    scores = np.array([opportunities[i]["similarity"] for i in indices], dtype=np.float64)
+    target_capacity = np.full(len(target_ids), max_inlinks_per_target, dtype=np.int64)
+
+    chosen = plan_links(pairs[:, 0], pairs[:, 1], scores, source_capacity, target_capacity)
+    return [opportunities[i] for i in indices[chosen]]
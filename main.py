@@ -1,5 +1,6 @@
 import asyncio
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -14,7 +15,7 @@ sentry_sdk.init(
 
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
@@ -25,10 +26,15 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.dependencies import get_current_user
+from browser_pool import close_browser_pool
+from http_client import close_http_client
 from database import get_db
 from db_models import BlogPost, User
 
-from embeddings import find_link_opportunities
+from embeddings import find_link_opportunities, match_site
+from fingerprint import NearDuplicateIndex, dedupe_targets
+from link_graph import run_link_graph_flusher, site_key
+from link_plan import build_link_plan
 from models import (
     AnalyzeRequest,
     AnalyzeResponse,
@@ -37,16 +43,41 @@ from models import (
     BulkSummary,
     ConfigResponse,
     FetchTargetRequest,
+    FetchTargetsRequest,
+    FetchTargetsResponse,
     HealthResponse,
+    LinkPlanRequest,
+    LinkPlanResponse,
     LinkMatch,
     MatchLinksRequest,
     MatchLinksResponse,
+    SiteMatchRequest,
+    SiteMatchResponse,
+    SourceLink,
+    SourceMatches,
+    TargetMatches,
+    SiteAnalysisRequest,
     SitemapRequest,
     SitemapResponse,
     TargetPageInfo,
 )
-from scraper import analyze_page, analyze_page_summary, calculate_keyword_relevance, fetch_target_page_content
+from scraper import (
+    analyze_page,
+    analyze_page_summary,
+    calculate_keyword_relevance,
+    fetch_source_contents,
+    fetch_target_infos,
+    get_target_info,
+)
+from pipeline import EMBED_BATCH_PAGES, analyze_site
+from robots import crawl_delay
+from scan_state import ScanEntry, check_page, load_previous_scan, save_scan, scan_config_hash
+from scheduler import SCAN_SCHEDULER_ENABLED, run_scan_scheduler
+from job_events import run_progress_listener
+from work_queue import WORK_QUEUE_ENABLED, run_queue_worker
+from work_scheduler import INTERACTIVE, request_tenant, scheduler, user_tenant
 from sitemap_parser import fetch_sitemap
+from url_canonical import dedupe_key, dedupe_urls
 
 # New SaaS routers
 from auth.router import router as auth_router
@@ -57,18 +88,46 @@ from links.router import router as links_router
 from ai_router.router import router as ai_router
 from internal.router import router as internal_router
 from blog.router import router as blog_router
+from graph.router import router as link_graph_router
+from jobs.router import router as jobs_router
 
 # Configurable limits via environment variables
 MAX_BULK_URLS = int(os.environ.get("MAX_BULK_URLS", "100"))
+MAX_FILTER_TARGETS = 50
+MAX_SITE_MATCH_TARGETS = 5000
+MAX_MATCHES_PER_ITEM = 50
+MAX_PLAN_PAGES = 20000
+MAX_PLAN_OPPORTUNITIES = 500_000
 CRAWL_PAGE_LIMITS = {"free": 10, "starter": 50, "pro": 500}
+BULK_REQUEST_DELAY = 1.0  # seconds between bulk fetches when robots.txt sets no Crawl-delay
 
 # ---------------------------------------------------------------------------
 # App
 # ---------------------------------------------------------------------------
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = [asyncio.create_task(run_link_graph_flusher())]
+    if os.environ.get("DATABASE_URL") and SCAN_SCHEDULER_ENABLED:
+        background.append(asyncio.create_task(run_scan_scheduler()))
+    if os.environ.get("DATABASE_URL"):
+        background.append(asyncio.create_task(run_progress_listener()))
+        if WORK_QUEUE_ENABLED:
+            background.append(asyncio.create_task(run_queue_worker()))
+    yield
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await close_browser_pool()
+    await close_http_client()
+
+
 app = FastAPI(
     title="Internal Link Finder API",
     description="API for analyzing internal links on websites",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 app.state.limiter = limiter
@@ -134,6 +193,8 @@ app.include_router(links_router)
 app.include_router(ai_router)
 app.include_router(internal_router)
 app.include_router(blog_router)
+app.include_router(link_graph_router)
+app.include_router(jobs_router)
 
 
 # ---------------------------------------------------------------------------
@@ -161,11 +222,13 @@ async def get_sitemap(request: SitemapRequest, current_user: User = Depends(get_
     Falls back to crawling if no sitemap found.
     """
     max_crawl_pages = CRAWL_PAGE_LIMITS.get(current_user.plan, 10)
+    tenant = user_tenant(current_user.id, current_user.plan)
     result = await fetch_sitemap(
         str(request.domain),
         request.source_pattern,
         request.target_pattern,
         max_crawl_pages=max_crawl_pages,
+        slot=lambda: scheduler.slot(tenant),
     )
     return SitemapResponse(**result)
 
@@ -176,7 +239,8 @@ async def analyze_url(request: Request, body: AnalyzeRequest):
     """
     Scrape a single URL and return link audit data.
     """
-    return await analyze_page(str(body.url), body.target_pattern)
+    async with scheduler.slot(request_tenant(request), INTERACTIVE):
+        return await analyze_page(str(body.url), body.target_pattern, render=body.render)
 
 
 @limiter.limit("30/minute")
@@ -185,8 +249,31 @@ async def fetch_target(request: Request, body: FetchTargetRequest):
     """
     Fetch a target page and extract its title and keywords for semantic matching.
     Use this to get keywords for relevance scoring in focused search mode.
+    mode="headings" reads only the title and first heading, which is much cheaper.
+    Results are cached per URL (TARGET_INFO_TTL).
+    """
+    async with scheduler.slot(request_tenant(request), INTERACTIVE):
+        return await get_target_info(str(body.url), body.mode)
+
+
+@limiter.limit("10/minute")
+@app.post("/fetch-targets", response_model=FetchTargetsResponse)
+async def fetch_targets(request: Request, body: FetchTargetsRequest):
+    """
+    Batch version of /fetch-target: fetch many target pages concurrently
+    (limited per host) and return their titles and keywords in request order.
+    Results are cached per URL for a while, so repeated lookups are instant.
     """
-    return await fetch_target_page_content(str(body.url))
+    if len(body.urls) > MAX_BULK_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many URLs. Maximum allowed: {MAX_BULK_URLS}, received: {len(body.urls)}"
+        )
+    tenant = request_tenant(request)
+    targets = await fetch_target_infos(
+        [str(url) for url in body.urls], body.mode, slot=lambda: scheduler.slot(tenant)
+    )
+    return FetchTargetsResponse(targets=targets)
 
 
 @limiter.limit("20/minute")
@@ -194,9 +281,12 @@ async def fetch_target(request: Request, body: FetchTargetRequest):
 async def match_links(request: Request, body: MatchLinksRequest):
     """
     Find internal link opportunities using semantic embedding matching.
-    Optionally pre-filters targets by keyword relevance before running embeddings.
+    Duplicate targets (the same page, or near-identical page content) are dropped and,
+    optionally, targets are pre-filtered by keyword relevance before running embeddings.
+    Near-identical content is only detected, best-effort, for targets this server
+    analyzed recently; targets are not fetched for it.
     """
-    targets_as_dicts = [{"url": t.url, "title": t.title} for t in body.targets]
+    targets_as_dicts = dedupe_targets([{"url": t.url, "title": t.title} for t in body.targets])
 
     # Pre-filter: if more targets than max_targets, use keyword relevance to narrow down
     if len(targets_as_dicts) > body.max_targets:
@@ -210,33 +300,128 @@ async def match_links(request: Request, body: MatchLinksRequest):
         scored.sort(key=lambda x: x[0], reverse=True)
         targets_as_dicts = [t for _, t in scored[: body.max_targets]]
 
-    matches = find_link_opportunities(
-        source_content=body.source_content,
-        targets=targets_as_dicts,
-        threshold=body.threshold,
-    )
+    async with scheduler.slot(request_tenant(request), INTERACTIVE):
+        matches = find_link_opportunities(
+            source_content=body.source_content,
+            targets=targets_as_dicts,
+            threshold=body.threshold,
+        )
     return MatchLinksResponse(
         matches=[LinkMatch(**m) for m in matches]
     )
 
 
+@limiter.limit("5/minute")
+@app.post("/match-site", response_model=SiteMatchResponse)
+async def match_site_links(request: Request, body: SiteMatchRequest):
+    """
+    Site-wide version of /match-links: score every source page against every
+    target in one batched computation and return the top opportunities per
+    source and per target.
+
+    Sources without content are fetched and extracted server-side (at most
+    MAX_BULK_URLS sources). Duplicate targets are dropped as in /match-links.
+    """
+    if len(body.sources) > MAX_BULK_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many sources. Maximum allowed: {MAX_BULK_URLS}, received: {len(body.sources)}"
+        )
+    if len(body.targets) > MAX_SITE_MATCH_TARGETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many targets. Maximum allowed: {MAX_SITE_MATCH_TARGETS}, received: {len(body.targets)}"
+        )
+    if not (1 <= body.top_per_source <= MAX_MATCHES_PER_ITEM and 1 <= body.top_per_target <= MAX_MATCHES_PER_ITEM):
+        raise HTTPException(
+            status_code=400,
+            detail=f"top_per_source and top_per_target must be between 1 and {MAX_MATCHES_PER_ITEM}"
+        )
+
+    targets = dedupe_targets([{"url": t.url, "title": t.title} for t in body.targets])
+    tenant = request_tenant(request)
+    sources = await fetch_source_contents(
+        [s.model_dump() for s in body.sources], slot=lambda: scheduler.slot(tenant)
+    )
+    # Charged like the equivalent embedding batches of /analyze-site
+    async with scheduler.slot(tenant, cost=max(1.0, len(sources) / EMBED_BATCH_PAGES)):
+        per_source, per_target = await asyncio.to_thread(
+            match_site,
+            sources,
+            targets,
+            threshold=body.threshold,
+            top_per_source=body.top_per_source,
+            top_per_target=body.top_per_target,
+        )
+    return SiteMatchResponse(
+        sources=[
+            SourceMatches(url=s["url"], matches=[LinkMatch(**m) for m in matches], error=s.get("error"))
+            for s, matches in zip(sources, per_source)
+        ],
+        targets=[
+            TargetMatches(url=t["url"], title=t["title"], sources=[SourceLink(**link) for link in links])
+            for t, links in zip(targets, per_target)
+        ],
+    )
+
+
+@limiter.limit("10/minute")
+@app.post("/link-plan", response_model=LinkPlanResponse)
+async def link_plan(request: Request, body: LinkPlanRequest):
+    """
+    Turn scored link opportunities (e.g. from /match-site) into a site-wide plan.
+
+    Maximises total similarity while keeping every source within the good
+    density band (at most 0.7% links per word, counting its existing links)
+    and giving each target at most max_inlinks_per_target new inlinks.
+    """
+    if len(body.pages) > MAX_PLAN_PAGES or len(body.opportunities) > MAX_PLAN_OPPORTUNITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many pages or opportunities. Maximum allowed: {MAX_PLAN_PAGES} pages, {MAX_PLAN_OPPORTUNITIES} opportunities"
+        )
+    plan = await asyncio.to_thread(
+        build_link_plan,
+        [page.model_dump() for page in body.pages],
+        [opportunity.model_dump() for opportunity in body.opportunities],
+        max_inlinks_per_target=body.max_inlinks_per_target,
+        min_similarity=body.min_similarity,
+    )
+    return LinkPlanResponse(links=plan, total_opportunities=len(body.opportunities))
+
+
 @limiter.limit("10/minute")
 @app.post("/bulk-analyze", response_model=BulkAnalyzeResponse)
 async def bulk_analyze(request: Request, body: BulkAnalyzeRequest):
     """
-    Analyze multiple URLs with a 1-second delay between requests.
+    Analyze multiple URLs, pausing between requests for the host's robots.txt
+    Crawl-delay (1 second if none is declared). Duplicate URL variants are
+    collapsed first, so results are reported per distinct page.
     Classifies pages by link density: low (<0.35%), good (0.35%-0.7%), high (>0.7%).
 
     Optional filters:
     - filter_target_url: Specific page to build links to (fetches and extracts keywords)
+    - filter_target_urls: Several pages to build links to; each result gets a
+      target_relevance score per target, computed in a single pass over its content
     - filter_keyword: Additional keyword to focus on
     - filter_match_type: "exact" or "stemmed" matching
+    - skip_near_duplicates: omit pages whose content near-duplicates an earlier page
+    - incremental: only fetch and analyze pages that changed since this client's
+      previous incremental scan of their domain (by sitemap lastmod, ETag/Last-Modified
+      or content hash); unchanged pages' previous results are returned with unchanged=true
     """
     if len(body.urls) > MAX_BULK_URLS:
         raise HTTPException(
             status_code=400,
             detail=f"Too many URLs. Maximum allowed: {MAX_BULK_URLS}, received: {len(body.urls)}"
         )
+    if len(body.filter_target_urls) > MAX_FILTER_TARGETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many filter targets. Maximum allowed: {MAX_FILTER_TARGETS}, received: {len(body.filter_target_urls)}"
+        )
+
+    tenant = request_tenant(request)
 
     # Build keyword list for relevance scoring
     filter_keywords: list[str] = []
@@ -244,43 +429,98 @@ async def bulk_analyze(request: Request, body: BulkAnalyzeRequest):
 
     # If a target URL is specified, fetch its content and extract keywords
     if body.filter_target_url:
-        target_page_info = await fetch_target_page_content(body.filter_target_url)
+        async with scheduler.slot(tenant):
+            target_page_info = await get_target_info(body.filter_target_url)
         filter_keywords.extend(target_page_info.keywords)
 
     # Add explicit keyword filter if provided
+    keyword_terms: list[str] = []
     if body.filter_keyword:
-        filter_keywords.append(body.filter_keyword)
+        keyword_terms.append(body.filter_keyword)
         words = body.filter_keyword.split()
         if len(words) > 1:
-            filter_keywords.extend(words)
+            keyword_terms.extend(words)
+    filter_keywords.extend(keyword_terms)
+
+    # Keyword sets for each of several targets, scored together per page
+    target_page_infos = await fetch_target_infos(body.filter_target_urls, slot=lambda: scheduler.slot(tenant))
+    target_keyword_sets = [info.keywords + keyword_terms for info in target_page_infos]
+
+    # Collapse duplicate URL variants and known redirects before fetching
+    urls = dedupe_urls([str(url) for url in body.urls])
 
     results = []
     low_density = 0
     good_density = 0
     high_density = 0
     failed = 0
-
-    for url in body.urls:
-        result = await analyze_page_summary(
-            str(url),
-            body.target_pattern,
-            filter_keywords=filter_keywords if filter_keywords else None,
-            filter_match_type=body.filter_match_type,
-        )
-        results.append(result)
-
-        if result.status == "failed":
-            failed += 1
-        elif result.status == "low":
-            low_density += 1
-        elif result.status == "high":
-            high_density += 1
+    near_duplicates = 0
+    unchanged = 0
+    duplicate_index = NearDuplicateIndex()
+
+    # Incremental mode: previous scan state per domain, and this scan's state
+    previous_scans: dict[str, dict[str, ScanEntry]] = {}
+    scan_entries: dict[str, list[ScanEntry]] = {}
+    lastmods = {dedupe_key(url): lastmod for url, lastmod in body.lastmods.items()}
+    settings = [body.target_pattern, filter_keywords, target_keyword_sets, body.filter_match_type]
+    if body.render:
+        # Rendered results differ from HTTP-only ones (and leave earlier hashes as they were)
+        settings.append("render")
+    config_hash = scan_config_hash(*settings)
+
+    for url in urls:
+        entry = carried = None
+        if body.incremental:
+            domain = site_key(url)
+            if domain not in previous_scans:
+                previous_scans[domain] = await load_previous_scan(tenant.key, domain)
+            async with scheduler.slot(tenant):
+                entry, carried = await check_page(
+                    url, lastmods.get(dedupe_key(url)), previous_scans[domain].get(dedupe_key(url)), config_hash
+                )
+            scan_entries.setdefault(domain, []).append(entry)
+
+        if carried is not None:
+            result = carried
+            unchanged += 1
         else:
-            good_density += 1
-
-        # Be polite - 1 second delay between requests
-        if url != body.urls[-1]:
-            await asyncio.sleep(1)
+            async with scheduler.slot(tenant):
+                result = await analyze_page_summary(
+                    url,
+                    body.target_pattern,
+                    filter_keywords=filter_keywords if filter_keywords else None,
+                    filter_match_type=body.filter_match_type,
+                    target_keyword_sets=target_keyword_sets or None,
+                    render=body.render,
+                )
+            if entry is not None and result.status != "failed":
+                entry.result = result.model_dump()
+
+        if result.content_fingerprint:
+            result.duplicate_of = duplicate_index.add(result.url, result.content_fingerprint)
+        if result.duplicate_of:
+            near_duplicates += 1
+
+        if not (result.duplicate_of and body.skip_near_duplicates):
+            results.append(result)
+
+            if result.status == "failed":
+                failed += 1
+            elif result.status == "low":
+                low_density += 1
+            elif result.status == "high":
+                high_density += 1
+            else:
+                good_density += 1
+
+        # Be polite - honour the host's robots.txt Crawl-delay, else wait 1 second
+        # (no wait when the page was skipped without a request)
+        if url != urls[-1] and (entry is None or entry.requested):
+            delay = await crawl_delay(url)
+            await asyncio.sleep(BULK_REQUEST_DELAY if delay is None else delay)
+
+    for domain, entries in scan_entries.items():
+        await save_scan(tenant.key, domain, entries)
 
     return BulkAnalyzeResponse(
         results=results,
@@ -290,11 +530,51 @@ async def bulk_analyze(request: Request, body: BulkAnalyzeRequest):
             good_density=good_density,
             high_density=high_density,
             failed=failed,
+            near_duplicates=near_duplicates,
+            unchanged=unchanged,
         ),
         target_page_info=target_page_info,
+        target_page_infos=target_page_infos,
     )
 
 
+@limiter.limit("5/minute")
+@app.post("/analyze-site")
+async def analyze_site_stream(
+    request: Request,
+    body: SiteAnalysisRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Run discovery, page analysis and link matching for a whole site server-side.
+
+    Replaces the /sitemap -> /bulk-analyze -> /fetch-target -> /match-links
+    round-trips: stages overlap and each page is fetched once. The response is
+    NDJSON, one SiteAnalysisEvent per line, streamed as results are produced:
+    "discovered", "targets", one "page" per source page, then "done".
+    At most MAX_BULK_URLS source pages are analyzed, and their links are
+    recorded in the user's link graph of the site.
+    """
+    tenant = user_tenant(current_user.id, current_user.plan)
+    events = analyze_site(
+        str(body.domain),
+        body.source_pattern,
+        body.target_pattern,
+        max_crawl_pages=CRAWL_PAGE_LIMITS.get(current_user.plan, 10),
+        max_source_pages=MAX_BULK_URLS,
+        threshold=body.threshold,
+        max_matches_per_page=body.max_matches_per_page,
+        slot=lambda: scheduler.slot(tenant),
+        owner=tenant.key,
+    )
+
+    async def ndjson():
+        async for event in events:
+            yield event.model_dump_json(exclude_none=True) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 # ---------------------------------------------------------------------------
 # Sitemap
 # ---------------------------------------------------------------------------
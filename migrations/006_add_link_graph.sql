@@ -0,0 +1,9 @@
+-- 006_add_link_graph.sql
+-- Internal link graph: each scanned page's internal out-links, per domain.
+CREATE TABLE IF NOT EXISTS link_graph_pages (
+    domain     TEXT NOT NULL,
+    url        TEXT NOT NULL,
+    outlinks   JSONB NOT NULL DEFAULT '[]'::jsonb,
+    scanned_at TIMESTAMPTZ DEFAULT now(),
+    CONSTRAINT link_graph_pages_pkey PRIMARY KEY (domain, url)
+);
@@ -0,0 +1,14 @@
+-- 007_add_page_scan_states.sql
+-- Per-page state of the last incremental scan (validators, content hash, result).
+CREATE TABLE IF NOT EXISTS page_scan_states (
+    domain        TEXT NOT NULL,
+    url           TEXT NOT NULL,
+    lastmod       TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    content_hash  TEXT,
+    config_hash   TEXT,
+    result        JSONB,
+    scanned_at    TIMESTAMPTZ DEFAULT now(),
+    CONSTRAINT page_scan_states_pkey PRIMARY KEY (domain, url)
+);
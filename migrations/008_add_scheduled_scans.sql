@@ -0,0 +1,17 @@
+-- 008_add_scheduled_scans.sql
+-- Recurring re-scans of saved analysis sessions, run by the background scheduler.
+CREATE TABLE IF NOT EXISTS scheduled_scans (
+    id          UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id     UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    session_id  UUID NOT NULL REFERENCES analysis_sessions(id) ON DELETE CASCADE,
+    cron        TEXT NOT NULL,
+    enabled     BOOLEAN NOT NULL DEFAULT true,
+    next_run_at TIMESTAMPTZ NOT NULL,
+    last_run_at TIMESTAMPTZ,
+    last_status TEXT,
+    last_error  TEXT,
+    created_at  TIMESTAMPTZ DEFAULT now(),
+    CONSTRAINT scheduled_scans_session_id_unique UNIQUE (session_id)
+);
+
+CREATE INDEX IF NOT EXISTS scheduled_scans_due_idx ON scheduled_scans (next_run_at) WHERE enabled;
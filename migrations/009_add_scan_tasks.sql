@@ -0,0 +1,22 @@
+-- 009_add_scan_tasks.sql
+-- Work queue of per-URL scan tasks, claimed by workers on any node with
+-- SELECT ... FOR UPDATE SKIP LOCKED and re-queued when a worker's lease expires.
+CREATE TABLE IF NOT EXISTS scan_tasks (
+    id               BIGSERIAL PRIMARY KEY,
+    job_id           UUID NOT NULL,
+    user_id          UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    url              TEXT NOT NULL,
+    params           JSONB,
+    status           TEXT NOT NULL DEFAULT 'queued',
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    worker_id        TEXT,
+    lease_expires_at TIMESTAMPTZ,
+    result           JSONB,
+    error            TEXT,
+    created_at       TIMESTAMPTZ DEFAULT now(),
+    updated_at       TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS scan_tasks_job_idx ON scan_tasks (job_id);
+-- Claimable tasks: queued, or running with a lease that may have expired
+CREATE INDEX IF NOT EXISTS scan_tasks_pending_idx ON scan_tasks (id) WHERE status IN ('queued', 'running');
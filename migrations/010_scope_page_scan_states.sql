@@ -0,0 +1,8 @@
+-- 010_scope_page_scan_states.sql
+-- Scan state belongs to whoever ran the scan (a user, or a client IP for
+-- anonymous scans), so one caller's results are never carried into another's.
+-- Existing rows have no owner and are dropped; their pages are re-checked once.
+DELETE FROM page_scan_states;
+ALTER TABLE page_scan_states ADD COLUMN IF NOT EXISTS owner TEXT NOT NULL;
+ALTER TABLE page_scan_states DROP CONSTRAINT IF EXISTS page_scan_states_pkey;
+ALTER TABLE page_scan_states ADD CONSTRAINT page_scan_states_pkey PRIMARY KEY (owner, domain, url);
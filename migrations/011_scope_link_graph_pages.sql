@@ -0,0 +1,10 @@
+-- 011_scope_link_graph_pages.sql
+-- Link graphs belong to the user whose scans built them, pages are keyed by
+-- their dedupe key (the URL kept for display), and out-links are stored as
+-- {"url", "origin"} objects covering every same-site link, not only in-content
+-- ones. Existing rows have no owner and are dropped; scans rebuild them.
+DELETE FROM link_graph_pages;
+ALTER TABLE link_graph_pages ADD COLUMN IF NOT EXISTS owner TEXT NOT NULL;
+ALTER TABLE link_graph_pages ADD COLUMN IF NOT EXISTS page_key TEXT NOT NULL;
+ALTER TABLE link_graph_pages DROP CONSTRAINT IF EXISTS link_graph_pages_pkey;
+ALTER TABLE link_graph_pages ADD CONSTRAINT link_graph_pages_pkey PRIMARY KEY (owner, domain, page_key);
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 from typing import Optional, Literal
 
 
@@ -33,6 +33,7 @@ class SitemapResponse(BaseModel):
 class AnalyzeRequest(BaseModel):
     url: HttpUrl
     target_pattern: str = "/services/"
+    render: bool = False  # Render near-empty (client-rendered) pages in a headless browser
 
 
 class LinkInfo(BaseModel):
@@ -56,7 +57,11 @@ class AnalyzeResponse(BaseModel):
     link_density: float = 0.0
     content_snippet: str = ""
     extracted_content: str = ""
+    content_fingerprint: Optional[str] = None  # 64-bit SimHash (hex) of extracted_content
+    rendered: bool = False  # Analyzed from the headless browser's DOM (render mode)
     error: Optional[str] = None
+    # Every same-site link on the page, template included (for the link graph; not returned)
+    site_links: list[str] = Field(default_factory=list, exclude=True)
 
 
 # Bulk analyze models
@@ -65,8 +70,13 @@ class BulkAnalyzeRequest(BaseModel):
     target_pattern: str = "/services/"
     # Filter options for focused search
     filter_target_url: Optional[str] = None  # Specific page to build links to
+    filter_target_urls: list[str] = []  # Several pages to score each result against
     filter_keyword: Optional[str] = None  # Keyword to focus on
     filter_match_type: Literal["exact", "stemmed"] = "stemmed"  # Match type
+    skip_near_duplicates: bool = False  # Omit pages that near-duplicate an earlier result
+    incremental: bool = False  # Only analyze pages changed since the previous incremental scan
+    lastmods: dict[str, str] = {}  # Sitemap lastmod per URL (from /sitemap), used when incremental
+    render: bool = False  # Render near-empty (client-rendered) pages in a headless browser
 
 
 class PageResult(BaseModel):
@@ -80,6 +90,10 @@ class PageResult(BaseModel):
     status: str = "ok"
     error: Optional[str] = None
     keyword_relevance: Optional[int] = None  # 0-5 relevance score when filter is active
+    target_relevance: Optional[list[int]] = None  # 0-5 score per entry of target_page_infos
+    content_fingerprint: Optional[str] = None
+    duplicate_of: Optional[str] = None  # URL of an earlier near-identical page in the scan
+    unchanged: bool = False  # Carried forward from the previous scan (incremental mode)
 
 
 class BulkSummary(BaseModel):
@@ -88,11 +102,15 @@ class BulkSummary(BaseModel):
     good_density: int
     high_density: int
     failed: int
+    near_duplicates: int = 0
+    unchanged: int = 0
 
 
 # Target page info for focused search
 class FetchTargetRequest(BaseModel):
     url: HttpUrl
+    # "headings" reads only the <head> and first H1/H2 instead of the whole page
+    mode: Literal["full", "headings"] = "full"
 
 
 class TargetPageInfo(BaseModel):
@@ -101,10 +119,20 @@ class TargetPageInfo(BaseModel):
     keywords: list[str] = []  # Extracted keywords from target page content
 
 
+class FetchTargetsRequest(BaseModel):
+    urls: list[HttpUrl]
+    mode: Literal["full", "headings"] = "full"
+
+
+class FetchTargetsResponse(BaseModel):
+    targets: list[TargetPageInfo]
+
+
 class BulkAnalyzeResponse(BaseModel):
     results: list[PageResult]
     summary: BulkSummary
     target_page_info: Optional[TargetPageInfo] = None  # Info about the target page when filter is active
+    target_page_infos: list[TargetPageInfo] = []  # Targets scored in PageResult.target_relevance
 
 
 # Health check
@@ -143,3 +171,93 @@ class LinkMatch(BaseModel):
 
 class MatchLinksResponse(BaseModel):
     matches: list[LinkMatch]
+
+
+# Site-wide matching: every source against every target in one request
+class MatchSource(BaseModel):
+    url: str
+    content: Optional[str] = None  # Fetched and extracted server-side when omitted
+
+
+class SiteMatchRequest(BaseModel):
+    sources: list[MatchSource]
+    targets: list[MatchTarget]
+    threshold: float = 0.7
+    top_per_source: int = 10
+    top_per_target: int = 10
+
+
+class SourceLink(BaseModel):
+    source_url: str
+    similarity: float
+    matched_text: str
+    start_idx: int
+    end_idx: int
+
+
+class SourceMatches(BaseModel):
+    url: str
+    matches: list[LinkMatch]
+    error: Optional[str] = None  # Set when the source page could not be fetched
+
+
+class TargetMatches(BaseModel):
+    url: str
+    title: str
+    sources: list[SourceLink]
+
+
+class SiteMatchResponse(BaseModel):
+    sources: list[SourceMatches]
+    targets: list[TargetMatches]
+
+
+# End-to-end site analysis (discover -> fetch -> extract -> embed -> match)
+class SiteAnalysisRequest(BaseModel):
+    domain: HttpUrl
+    source_pattern: str = "/blog/"
+    target_pattern: str = "/services/"
+    threshold: float = 0.7
+    max_matches_per_page: int = 10
+
+
+class SiteAnalysisEvent(BaseModel):
+    """One line of the /analyze-site NDJSON stream."""
+    event: Literal["discovered", "targets", "page", "done"]
+    source_pages: Optional[int] = None  # discovered
+    target_pages: Optional[int] = None  # discovered
+    discovery_method: Optional[str] = None  # discovered
+    sitemap_url: Optional[str] = None  # discovered
+    targets: Optional[list[MatchTarget]] = None  # targets: de-duplicated targets used for matching
+    result: Optional[PageResult] = None  # page
+    matches: Optional[list[LinkMatch]] = None  # page
+    summary: Optional[BulkSummary] = None  # done
+
+
+# Site-wide link plan
+class PlanPage(BaseModel):
+    url: str
+    word_count: int = 0
+    internal_link_count: int = 0
+    existing_links: list[str] = []  # hrefs the page already links to
+
+
+class PlanOpportunity(BaseModel):
+    source_url: str
+    target_url: str
+    similarity: float
+    matched_text: Optional[str] = None
+    start_idx: Optional[int] = None
+    end_idx: Optional[int] = None
+
+
+class LinkPlanRequest(BaseModel):
+    pages: list[PlanPage]  # Source pages; their density headroom caps new links
+    opportunities: list[PlanOpportunity]
+    max_inlinks_per_target: int = 5
+    min_similarity: float = 0.0
+
+
+class LinkPlanResponse(BaseModel):
+    links: list[PlanOpportunity]  # Accepted links, best first
+    total_opportunities: int
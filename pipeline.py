@@ -0,0 +1,223 @@
+"""End-to-end site analysis: discover -> fetch/extract -> embed -> match.
+
+The stages run concurrently, joined by bounded queues, so pages are fetched
+and parsed while earlier pages are being embedded, and a slow stage applies
+back-pressure instead of buffering the whole site. Each page is fetched once
+per run: target titles come from a cheap title/heading read, and pages that
+are both source and target are downloaded once and parsed from the cache for
+both roles. Events are yielded as soon as each page has been matched.
+"""
+
+import asyncio
+import os
+from contextlib import nullcontext
+from typing import AsyncIterator, Callable
+from urllib.parse import urlparse
+
+import numpy as np
+
+from embeddings import best_window_matches, embed_texts, sliding_window_chunks
+from fingerprint import dedupe_targets
+from host_limiter import HostThrottle
+from models import AnalyzeResponse, BulkSummary, LinkMatch, MatchTarget, SiteAnalysisEvent
+from robots import crawl_delay
+from scraper import analyze_page, fetch_html, get_target_info, summarize_analysis
+from sitemap_parser import fetch_sitemap
+from url_canonical import dedupe_key, dedupe_urls
+from work_scheduler import Slot
+
+PIPELINE_FETCH_CONCURRENCY = int(os.environ.get("PIPELINE_FETCH_CONCURRENCY", "4"))
+# Minimum spacing between request starts to one host (robots Crawl-delay wins if longer).
+PIPELINE_HOST_DELAY = 0.25
+# Analyzed pages / finished events buffered between stages.
+PIPELINE_QUEUE_SIZE = 16
+# Pages whose windows are embedded together in one model call.
+EMBED_BATCH_PAGES = 8
+MAX_PIPELINE_TARGETS = 1000
+
+_DONE = object()
+
+Embedder = Callable[[list[str]], np.ndarray]
+
+
+async def _target_info(url: str, also_source: bool):
+    if not also_source:
+        return await get_target_info(url, mode="headings")
+    # The page will be analyzed as a source too: download it in full once and
+    # keep the HTML so analyze_page parses it from the cache.
+    try:
+        await fetch_html(url, keep=True)
+    except Exception:
+        pass
+    return await get_target_info(url, mode="full")
+
+
+async def _prepare_targets(
+    target_urls: list[str],
+    source_keys: set[str],
+    embed: Embedder,
+    slot: Slot = nullcontext,
+) -> tuple[list[dict], np.ndarray]:
+    semaphore = asyncio.Semaphore(PIPELINE_FETCH_CONCURRENCY)
+
+    async def fetch_one(url: str):
+        async with semaphore, slot():
+            return await _target_info(url, dedupe_key(url) in source_keys)
+
+    infos = await asyncio.gather(*(fetch_one(url) for url in target_urls))
+    targets = dedupe_targets([{"url": info.url, "title": info.title} for info in infos if info.title])
+    embeddings = None
+    if targets:
+        async with slot():
+            embeddings = await asyncio.to_thread(embed, [t["title"] for t in targets])
+    return targets, embeddings
+
+
+def _match_batch(
+    pages: list[AnalyzeResponse],
+    targets: list[dict],
+    target_embeddings: np.ndarray | None,
+    embed: Embedder,
+    threshold: float,
+    max_matches: int,
+) -> list[SiteAnalysisEvent]:
+    """Embed every window of a batch of pages in one call and match each page."""
+    page_chunks = [
+        sliding_window_chunks(page.extracted_content)
+        if not page.error and page.extracted_content.strip() and targets else []
+        for page in pages
+    ]
+    texts = [chunk[0] for chunks in page_chunks for chunk in chunks]
+    window_embeddings = embed(texts) if texts else None
+
+    events = []
+    offset = 0
+    for page, chunks in zip(pages, page_chunks):
+        matches = []
+        if chunks:
+            page_embeddings = window_embeddings[offset:offset + len(chunks)]
+            offset += len(chunks)
+            matches = best_window_matches(chunks, page_embeddings, targets, target_embeddings, threshold)
+            # Don't suggest a page link to itself
+            matches = [m for m in matches if dedupe_key(m["target_url"]) != dedupe_key(page.url)]
+        events.append(SiteAnalysisEvent(
+            event="page",
+            result=summarize_analysis(page),
+            matches=[LinkMatch(**m) for m in matches[:max_matches]],
+        ))
+    return events
+
+
+async def analyze_site(
+    domain: str,
+    source_pattern: str,
+    target_pattern: str,
+    max_crawl_pages: int = 50,
+    max_source_pages: int = 100,
+    threshold: float = 0.7,
+    max_matches_per_page: int = 10,
+    embed: Embedder = embed_texts,
+    slot: Slot = nullcontext,
+    owner: str | None = None,
+) -> AsyncIterator[SiteAnalysisEvent]:
+    """
+    Run the full analysis for a site, yielding events as they are produced:
+    "discovered" (page counts), "targets" (what sources are matched against),
+    one "page" per source page (density summary plus link suggestions), then
+    "done" with the density summary for the run.
+
+    ``slot`` is entered around each discovery request, each target and page
+    fetch and each embedding batch, so a scheduler can share capacity
+    between runs. With ``owner``, analyzed pages are recorded in that user's
+    link graph (see analyze_page).
+    """
+    discovered = await fetch_sitemap(
+        domain, source_pattern, target_pattern, max_crawl_pages=max_crawl_pages, slot=slot
+    )
+    source_urls = dedupe_urls([page.url for page in discovered["source_pages"]])[:max_source_pages]
+    target_urls = dedupe_urls([page.url for page in discovered["target_pages"]])[:MAX_PIPELINE_TARGETS]
+    yield SiteAnalysisEvent(
+        event="discovered",
+        source_pages=len(source_urls),
+        target_pages=len(target_urls),
+        discovery_method=discovered["discovery_method"],
+        sitemap_url=discovered["sitemap_url"],
+    )
+
+    source_keys = {dedupe_key(url) for url in source_urls}
+    targets, target_embeddings = await _prepare_targets(target_urls, source_keys, embed, slot)
+    yield SiteAnalysisEvent(event="targets", targets=[MatchTarget(**t) for t in targets])
+
+    throttle = HostThrottle(max(PIPELINE_HOST_DELAY, await crawl_delay(domain) or 0.0))
+    pages: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    events: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    pending_urls = iter(source_urls)
+
+    async def fetch_worker() -> None:
+        # Workers share one iterator, so each URL is taken exactly once
+        for url in pending_urls:
+            await throttle.wait(urlparse(url).hostname or "")
+            async with slot():
+                page = await analyze_page(url, target_pattern, owner=owner)
+            await pages.put(page)
+
+    # Each stage ends its output with _DONE, also on failure so the next stage
+    # wakes up; on cancellation nothing is waiting for it.
+    async def fetch_stage() -> None:
+        try:
+            await asyncio.gather(*(fetch_worker() for _ in range(PIPELINE_FETCH_CONCURRENCY)))
+        except Exception:
+            await pages.put(_DONE)
+            raise
+        await pages.put(_DONE)
+
+    async def embed_stage() -> None:
+        try:
+            done = False
+            while not done:
+                batch = [await pages.get()]
+                while len(batch) < EMBED_BATCH_PAGES and not pages.empty():
+                    batch.append(pages.get_nowait())
+                if batch[-1] is _DONE:
+                    done = True
+                    batch.pop()
+                if batch:
+                    async with slot():
+                        matched = await asyncio.to_thread(
+                            _match_batch, batch, targets, target_embeddings, embed,
+                            threshold, max_matches_per_page,
+                        )
+                    for event in matched:
+                        await events.put(event)
+        except Exception:
+            await events.put(_DONE)
+            raise
+        await events.put(_DONE)
+
+    stages = [asyncio.create_task(fetch_stage()), asyncio.create_task(embed_stage())]
+    counts = {"low": 0, "good": 0, "high": 0, "failed": 0}
+    try:
+        while (event := await events.get()) is not _DONE:
+            counts[event.result.status] += 1
+            yield event
+        # Surface a stage failure rather than reporting a short run as complete.
+        # The embed stage goes first: if it failed, the fetch stage may be
+        # blocked on a full queue.
+        for stage in reversed(stages):
+            await stage
+    finally:
+        # Client went away or a stage failed: stop the remaining work
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+
+    yield SiteAnalysisEvent(
+        event="done",
+        summary=BulkSummary(
+            total_scanned=sum(counts.values()),
+            low_density=counts["low"],
+            good_density=counts["good"],
+            high_density=counts["high"],
+            failed=counts["failed"],
+        ),
+    )
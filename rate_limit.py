@@ -1,4 +1,6 @@
 """Shared rate limiter with reverse-proxy-aware client IP extraction."""
+import os
+
 from fastapi import Request
 from slowapi import Limiter
 
@@ -11,4 +13,24 @@ def _get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
+# Reverse proxies in front of the API that append the peer they saw to
+# X-Forwarded-For (Railway's edge proxy: 1). 0 trusts no forwarded header.
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "1"))
+
+
+def trusted_client_ip(request: Request) -> str:
+    """
+    Client IP as recorded by our own proxies, which a client cannot forge.
+
+    Clients can put anything at the start of X-Forwarded-For; only the
+    entries our TRUSTED_PROXY_HOPS proxies appended (counted from the right)
+    are reliable.
+    """
+    if TRUSTED_PROXY_HOPS > 0:
+        hops = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
 limiter = Limiter(key_func=_get_client_ip)
@@ -0,0 +1,166 @@
+"""Per-host circuit breakers and a bounded retry budget for outbound fetches.
+
+A host's breaker opens after BREAKER_FAILURE_THRESHOLD consecutive failures
+(timeouts, connection errors, 502/503/504). While open, requests to the host
+fail immediately with HostUnavailable instead of each waiting out the page
+timeout. After BREAKER_OPEN_SECONDS the breaker lets a single probe request
+through (half-open): success closes it, failure opens it again.
+
+Transient failures (the above, plus 429) are retried up to MAX_RETRIES times
+with full-jitter exponential backoff, but only while the process-wide retry
+budget allows: every first attempt earns RETRY_BUDGET_RATIO of a retry, so
+retries stay a bounded fraction of traffic and cannot snowball during an
+outage.
+"""
+
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, TypeVar
+from urllib.parse import urlparse
+
+import httpx
+
+T = TypeVar("T")
+
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_OPEN_SECONDS = 30.0
+MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MAX = 20.0
+MAX_TRACKED_HOSTS = 4096
+
+# Statuses that mean the host is struggling, and those worth retrying
+FAILURE_STATUSES = frozenset({502, 503, 504})
+RETRY_STATUSES = FAILURE_STATUSES | {429}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class HostUnavailable(httpx.RequestError):
+    """Raised without a request while a host's circuit breaker is open."""
+
+
+def _host_failure(exc: BaseException) -> Optional[bool]:
+    """True if ``exc`` says the host is failing, False if it answered, None if unknown."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in FAILURE_STATUSES
+    if isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return True
+    return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, HostUnavailable):
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUSES
+    return isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.threshold = threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state, one probe at a time."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, failed: Optional[bool]) -> None:
+        """Record a request's outcome (None: it says nothing about the host)."""
+        if self._probing:
+            self._probing = False
+            if failed is None:
+                return  # inconclusive probe: let the next request probe
+        if failed is None:
+            return
+        if not failed:
+            self.state = CLOSED
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Token bucket: requests deposit ``ratio`` tokens, retries withdraw one."""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, maximum: float = RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = maximum / 2
+
+    def deposit(self) -> None:
+        self.tokens = min(self.tokens + self.ratio, self.maximum)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+retry_budget = RetryBudget()
+_breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+
+
+def host_breaker(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker()
+        if len(_breakers) > MAX_TRACKED_HOSTS:
+            _breakers.popitem(last=False)
+    _breakers.move_to_end(host)
+    return breaker
+
+
+async def guarded(url: str, operation: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run a request to ``url``'s host through its circuit breaker, retrying
+    transient failures within the retry budget.
+
+    Raises HostUnavailable while the breaker is open, otherwise the last
+    attempt's exception.
+    """
+    breaker = host_breaker((urlparse(url).hostname or "").lower())
+    retry_budget.deposit()
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise HostUnavailable(f"{urlparse(url).hostname} is failing; not retrying until it recovers")
+        try:
+            result = await operation()
+        except asyncio.CancelledError:
+            breaker.record(None)
+            raise
+        except Exception as exc:
+            breaker.record(_host_failure(exc))
+            if not is_transient(exc) or attempt >= MAX_RETRIES or not retry_budget.withdraw():
+                raise
+            attempt += 1
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        breaker.record(False)
+        return result
@@ -0,0 +1,187 @@
+"""robots.txt fetching, caching and rule matching.
+
+Each host's robots.txt is fetched at most once per ROBOTS_TTL through the
+shared HTTP client; concurrent lookups for the same host share one request.
+Rules for our user agent (or ``*``) are compiled into regexes and matched with
+longest-match-wins semantics (RFC 9309), and Crawl-delay is exposed so fetch
+schedulers can pace requests per host. A robots.txt that cannot be fetched
+(server error or unreachable host) means complete disallow, re-checked after
+ROBOTS_ERROR_TTL.
+"""
+
+import logging
+import os
+import re
+from urllib.parse import urlparse
+
+import httpx
+
+from cache import TTLCache
+from http_client import get_http_client
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+ROBOTS_AGENT = "internallinkfinder"
+ROBOTS_TTL = float(os.environ.get("ROBOTS_TTL", "3600"))
+# Unreachable robots.txt is treated as disallow-all, and re-checked sooner.
+ROBOTS_ERROR_TTL = 300.0
+ROBOTS_TIMEOUT = 10.0
+ROBOTS_MAX_BYTES = 512 * 1024
+# Never wait longer than this between requests, whatever Crawl-delay says.
+MAX_CRAWL_DELAY = 10.0
+
+
+def _compile_pattern(pattern: str) -> re.Pattern:
+    anchored = pattern.endswith("$")
+    if anchored:
+        pattern = pattern[:-1]
+    regex = ".*".join(re.escape(part) for part in pattern.split("*"))
+    return re.compile(regex + ("$" if anchored else ""))
+
+
+class RobotsRules:
+    """Compiled allow/disallow rules for one host."""
+
+    def __init__(
+        self,
+        rules: list[tuple[str, bool]] | None = None,
+        crawl_delay: float | None = None,
+        sitemaps: list[str] | None = None,
+    ):
+        # Longest pattern first; on equal length Allow wins over Disallow.
+        ordered = sorted(rules or [], key=lambda r: (len(r[0]), r[1]), reverse=True)
+        self._rules = [(_compile_pattern(path), allow) for path, allow in ordered]
+        self.crawl_delay = crawl_delay
+        self.sitemaps = sitemaps or []
+
+    def can_fetch(self, url: str) -> bool:
+        parsed = urlparse(url)
+        path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        for regex, allow in self._rules:
+            if regex.match(path):
+                return allow
+        return True
+
+
+def _product_token(value: str) -> str:
+    # "InternalLinkFinder/1.0" names the same crawler as "internallinkfinder"
+    return value.split("/", 1)[0].strip().lower()
+
+
+def parse_robots_txt(text: str, user_agent: str = ROBOTS_AGENT) -> RobotsRules:
+    """
+    Parse robots.txt, keeping the group for ``user_agent`` or else ``*``.
+
+    ``user_agent`` is our product token; a group applies when its
+    User-agent value is that token, compared case-insensitively.
+    """
+    groups: dict[str, list[tuple[str, bool]]] = {}
+    delays: dict[str, float] = {}
+    sitemaps: list[str] = []
+
+    current_agents: list[str] = []
+    in_rules = False
+    for raw_line in text.splitlines():
+        line = raw_line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        field, value = (part.strip() for part in line.split(":", 1))
+        field = field.lower()
+
+        if field == "user-agent":
+            # Consecutive User-agent lines share the group that follows them.
+            if in_rules:
+                current_agents = []
+                in_rules = False
+            current_agents.append(_product_token(value))
+            continue
+        if field == "sitemap":
+            if value:
+                sitemaps.append(value)
+            continue
+        if field not in ("allow", "disallow", "crawl-delay"):
+            continue
+
+        in_rules = True
+        for agent in current_agents:
+            if field == "crawl-delay":
+                try:
+                    delays[agent] = float(value)
+                except ValueError:
+                    pass
+            elif value:
+                groups.setdefault(agent, []).append((value, field == "allow"))
+            else:
+                groups.setdefault(agent, [])
+
+    agent = _product_token(user_agent)
+    if agent not in groups and agent not in delays:
+        agent = "*"
+    return RobotsRules(groups.get(agent, []), delays.get(agent), sitemaps)
+
+
+_cache = TTLCache(ttl=ROBOTS_TTL, max_entries=4096)
+_flights = SingleFlight()
+
+
+def _origin(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}"
+
+
+def _disallow_all() -> RobotsRules:
+    return RobotsRules([("/", False)])
+
+
+async def _fetch_robots(origin: str) -> RobotsRules:
+    body = bytearray()
+    try:
+        async with get_http_client().stream("GET", f"{origin}/robots.txt", timeout=ROBOTS_TIMEOUT) as response:
+            if response.status_code == 200:
+                # Anything past the size limit is ignored, so don't download it
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= ROBOTS_MAX_BYTES:
+                        break
+    except httpx.HTTPError:
+        logger.info("robots.txt unreachable for %s, disallowing all", origin)
+        rules = _disallow_all()
+        _cache.set(origin, rules, ttl=ROBOTS_ERROR_TTL)
+        return rules
+
+    if response.status_code == 200:
+        text = bytes(body[:ROBOTS_MAX_BYTES]).decode(response.encoding or "utf-8", errors="replace")
+        rules = parse_robots_txt(text)
+        _cache.set(origin, rules)
+    elif 400 <= response.status_code < 500:
+        # No robots.txt: everything is allowed.
+        rules = RobotsRules()
+        _cache.set(origin, rules)
+    else:
+        # Server error: assume complete disallow (RFC 9309, 2.3.1.4)
+        rules = _disallow_all()
+        _cache.set(origin, rules, ttl=ROBOTS_ERROR_TTL)
+    return rules
+
+
+async def get_robots(url: str) -> RobotsRules:
+    """Return the (cached) robots rules for the host serving ``url``."""
+    origin = _origin(url)
+    rules = _cache.get(origin)
+    if rules is not None:
+        return rules
+    return await _flights.do(origin, lambda: _fetch_robots(origin))
+
+
+async def can_fetch(url: str) -> bool:
+    """Whether robots.txt allows us to fetch ``url``."""
+    return (await get_robots(url)).can_fetch(url)
+
+
+async def crawl_delay(url: str) -> float | None:
+    """The host's Crawl-delay in seconds (capped), or None if it declares none."""
+    delay = (await get_robots(url)).crawl_delay
+    if delay is None:
+        return None
+    return min(max(delay, 0.0), MAX_CRAWL_DELAY)
@@ -0,0 +1,209 @@
+"""Incremental re-scans: skip pages unchanged since the domain's previous scan.
+
+State is kept per owner (the scanning user, or the client IP of an anonymous
+scan), so nobody is served results another caller recorded.
+
+For every page an incremental scan records the sitemap lastmod, the ETag and
+Last-Modified validators and a hash of the page's text and links, together
+with the page's result. On the next scan a page counts as unchanged, and its
+previous result is carried forward, when:
+
+1. its sitemap lastmod equals the previous one (no request at all), or
+2. a conditional GET answers 304 Not Modified, or
+3. the downloaded page hashes the same as before (e.g. a server without
+   validators, or markup churn that does not change text or links).
+
+Changed pages' HTML is already in the discovery cache, so analyzing them
+costs no further download. State is stored in the ``page_scan_states`` table,
+or in memory when no database is configured.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import lxml.html
+from lxml import etree
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from cache import TTLCache
+from database import async_session_factory, persistence_enabled
+from db_models import PageScanState
+from link_graph import site_key
+from models import PageResult
+from scraper import fetch_if_modified
+from url_canonical import dedupe_key
+
+logger = logging.getLogger(__name__)
+
+# Without a database: per-owner and domain scan state kept in memory, least recently used dropped
+MEMORY_STATE_TTL = 7 * 24 * 3600.0
+MAX_MEMORY_DOMAINS = 256
+
+_memory_states = TTLCache(ttl=MEMORY_STATE_TTL, max_entries=MAX_MEMORY_DOMAINS)
+
+
+@dataclass
+class ScanEntry:
+    url: str
+    lastmod: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    config_hash: Optional[str] = None  # scan settings the result was computed with
+    result: Optional[dict[str, Any]] = None  # PageResult of the last analysis
+    requested: bool = False  # whether checking the page made an HTTP request (not stored)
+
+
+def scan_config_hash(*settings: Any) -> str:
+    """Hash of the scan settings a result depends on (patterns, keyword filters)."""
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def page_content_hash(html: str) -> str:
+    """Hash of a page's visible text and link targets, ignoring markup churn."""
+    try:
+        document = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return hashlib.sha256(html.encode()).hexdigest()
+    etree.strip_elements(document, "script", "style", "noscript", etree.Comment, with_tail=False)
+    text = " ".join(document.text_content().split())
+    hrefs = "\n".join(document.xpath("//a/@href"))
+    return hashlib.sha256(f"{text}\n{hrefs}".encode()).hexdigest()
+
+
+async def load_previous_scan(owner: str, domain: str) -> dict[str, ScanEntry]:
+    """
+    ``owner``'s previous scan state for the domain, keyed by dedupe_key(url).
+
+    If the database cannot be read the scan starts afresh (empty state).
+    """
+    domain = site_key(domain)
+    if not persistence_enabled():
+        return dict(_memory_states.get((owner, domain), {}))
+    try:
+        async with async_session_factory() as db:
+            rows = (await db.execute(
+                select(PageScanState).where(PageScanState.owner == owner, PageScanState.domain == domain)
+            )).scalars().all()
+    except Exception:
+        logger.warning("Could not load previous scan state for %s", domain, exc_info=True)
+        return {}
+    return {
+        dedupe_key(row.url): ScanEntry(
+            url=row.url,
+            lastmod=row.lastmod,
+            etag=row.etag,
+            last_modified=row.last_modified,
+            content_hash=row.content_hash,
+            config_hash=row.config_hash,
+            result=row.result,
+        )
+        for row in rows
+    }
+
+
+async def save_scan(owner: str, domain: str, entries: list[ScanEntry]) -> None:
+    """
+    Store (upsert) ``owner``'s scan state for the pages of this scan.
+
+    A database failure is logged and the state dropped: the scan's results
+    stand, and the next incremental scan just re-checks those pages.
+    """
+    domain = site_key(domain)
+    entries = [entry for entry in entries if entry.result is not None]
+    if not entries:
+        return
+    if not persistence_enabled():
+        states = _memory_states.get((owner, domain)) or {}
+        for entry in entries:
+            states[dedupe_key(entry.url)] = entry
+        _memory_states.set((owner, domain), states)
+        return
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "owner": owner,
+            "domain": domain,
+            "url": entry.url,
+            "lastmod": entry.lastmod,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "content_hash": entry.content_hash,
+            "config_hash": entry.config_hash,
+            "result": entry.result,
+            "scanned_at": now,
+        }
+        for entry in entries
+    ]
+    try:
+        async with async_session_factory() as db:
+            for start in range(0, len(rows), 1000):
+                statement = insert(PageScanState).values(rows[start:start + 1000])
+                await db.execute(statement.on_conflict_do_update(
+                    index_elements=["owner", "domain", "url"],
+                    set_={
+                        column: statement.excluded[column]
+                        for column in (
+                            "lastmod", "etag", "last_modified", "content_hash", "config_hash", "result", "scanned_at",
+                        )
+                    },
+                ))
+            await db.commit()
+    except Exception:
+        logger.warning("Could not save scan state for %s", domain, exc_info=True)
+
+
+async def check_page(
+    url: str,
+    lastmod: Optional[str],
+    previous: Optional[ScanEntry],
+    config_hash: Optional[str] = None,
+) -> tuple[ScanEntry, Optional[PageResult]]:
+    """
+    Decide whether ``url`` changed since ``previous``.
+
+    Returns the page's new scan entry and, if it is unchanged, the carried
+    forward result (marked unchanged). For a changed page the result is None
+    and the entry's result must be filled in once the page is analyzed.
+    A previous result computed with different scan settings is not reused.
+    """
+    entry = ScanEntry(url=url, lastmod=lastmod, config_hash=config_hash)
+    if previous is None or previous.result is None or previous.config_hash != config_hash:
+        previous = None
+
+    if previous and lastmod and previous.lastmod == lastmod:
+        entry.etag, entry.last_modified = previous.etag, previous.last_modified
+        entry.content_hash, entry.result = previous.content_hash, previous.result
+        return entry, _carried(previous)
+
+    entry.requested = True
+    try:
+        fetched = await fetch_if_modified(
+            url,
+            etag=previous.etag if previous else None,
+            last_modified=previous.last_modified if previous else None,
+        )
+    except Exception:
+        # Let the analysis fetch again and report the error
+        return entry, None
+
+    entry.etag, entry.last_modified = fetched.etag, fetched.last_modified
+    if fetched.status == 304 and previous:
+        entry.content_hash, entry.result = previous.content_hash, previous.result
+        return entry, _carried(previous)
+
+    entry.content_hash = page_content_hash(fetched.html)
+    if previous and previous.content_hash == entry.content_hash:
+        entry.result = previous.result
+        return entry, _carried(previous)
+    return entry, None
+
+
+def _carried(previous: ScanEntry) -> PageResult:
+    return PageResult(**{**previous.result, "unchanged": True})
@@ -0,0 +1,201 @@
+"""Recurring scans of saved analysis sessions, run by a background worker.
+
+A ScheduledScan attaches a cron expression to an AnalysisSession. The worker
+started in the app lifespan polls for due scans, but only starts them inside
+the off-peak SCAN_WINDOW (UTC); a scan that falls due outside it waits for the
+next window. Every node runs the worker: due scans are claimed with
+``FOR UPDATE SKIP LOCKED``, so each run happens on exactly one node, and each
+node runs at most SCHEDULED_SCAN_CONCURRENCY scans at a time.
+
+Scans are incremental (see scan_state): only pages that changed since the
+previous scan are fetched and analyzed. Results are written into the session
+in the same shape the frontend saves.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, time, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import select
+
+from billing.dependencies import url_limit_for
+from cron import CronSchedule
+from database import async_session_factory
+from db_models import AnalysisSession, ScheduledScan, User
+from models import BulkSummary
+from robots import crawl_delay
+from scan_state import check_page, load_previous_scan, save_scan, scan_config_hash
+from scraper import analyze_page_summary
+from sitemap_parser import fetch_sitemap
+from url_canonical import dedupe_key
+from work_scheduler import scheduler, user_tenant
+
+logger = logging.getLogger(__name__)
+
+# Off-peak hours (UTC) in which scheduled scans may start, "HH:MM-HH:MM"
+SCAN_WINDOW = os.environ.get("SCAN_WINDOW", "01:00-06:00")
+SCHEDULED_SCAN_CONCURRENCY = int(os.environ.get("SCHEDULED_SCAN_CONCURRENCY", "2"))
+SCAN_SCHEDULER_ENABLED = os.environ.get("SCAN_SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_POLL_INTERVAL = 60.0
+MIN_SCAN_INTERVAL = timedelta(hours=1)
+DEFAULT_SCAN_DELAY = 1.0  # seconds between page fetches when robots.txt sets no Crawl-delay
+
+
+def parse_window(text: str) -> tuple[time, time]:
+    start, end = (time.fromisoformat(part.strip()) for part in text.split("-", 1))
+    return start, end
+
+
+def in_scan_window(moment: datetime, window: str = SCAN_WINDOW) -> bool:
+    """Whether ``moment`` (UTC) is inside the window; windows may wrap midnight."""
+    start, end = parse_window(window)
+    now = moment.time().replace(tzinfo=None)
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+def validate_cron(expression: str) -> CronSchedule:
+    """Parse a schedule, rejecting ones that would run more than hourly."""
+    schedule = CronSchedule(expression)
+    first = schedule.next_after(datetime.now(timezone.utc))
+    for _ in range(24):
+        following = schedule.next_after(first)
+        if following - first < MIN_SCAN_INTERVAL:
+            raise ValueError("scheduled scans can run at most once an hour")
+        first = following
+    return schedule
+
+
+async def scan_session(domain: str, config: dict | None, user_id: Any, plan: str) -> dict[str, Any]:
+    """Re-run discovery and an incremental density scan for a session's site."""
+    config = config or {}
+    source_pattern = config.get("sourcePattern", "/blog/")
+    target_pattern = config.get("targetPattern", "/services/")
+    limit = url_limit_for(plan)
+    tenant = user_tenant(user_id, plan)
+
+    discovered = await fetch_sitemap(
+        domain, source_pattern, target_pattern, max_crawl_pages=limit, slot=lambda: scheduler.slot(tenant)
+    )
+    pages = discovered["source_pages"][:limit]
+
+    previous = await load_previous_scan(tenant.key, domain)
+    # Same settings hash as an unfiltered /bulk-analyze
+    config_hash = scan_config_hash(target_pattern, [], [], "stemmed")
+    entries = []
+    results = []
+    for page in pages:
+        async with scheduler.slot(tenant):
+            entry, result = await check_page(page.url, page.lastmod, previous.get(dedupe_key(page.url)), config_hash)
+            if result is None:
+                result = await analyze_page_summary(page.url, target_pattern, owner=tenant.key)
+                if result.status != "failed":
+                    entry.result = result.model_dump()
+        entries.append(entry)
+        results.append({**result.model_dump(), "lastmod": page.lastmod})
+
+        if entry.requested and page is not pages[-1]:
+            delay = await crawl_delay(page.url)
+            await asyncio.sleep(DEFAULT_SCAN_DELAY if delay is None else delay)
+    await save_scan(tenant.key, domain, entries)
+
+    statuses = [r["status"] for r in results]
+    summary = BulkSummary(
+        total_scanned=len(results),
+        low_density=statuses.count("low"),
+        good_density=statuses.count("good"),
+        high_density=statuses.count("high"),
+        failed=statuses.count("failed"),
+        unchanged=sum(1 for r in results if r["unchanged"]),
+    )
+    return {
+        "sourcePages": [p.model_dump() for p in discovered["source_pages"]],
+        "targetPages": [p.model_dump() for p in discovered["target_pages"]],
+        "results": results,
+        "summary": summary.model_dump(),
+        "scannedAt": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def claim_due_scans(limit: int) -> list[dict]:
+    """Claim up to ``limit`` due scans, advancing their next run time."""
+    now = datetime.now(timezone.utc)
+    async with async_session_factory() as db:
+        rows = (await db.execute(
+            select(ScheduledScan, AnalysisSession.domain, AnalysisSession.config, User.plan)
+            .join(AnalysisSession, ScheduledScan.session_id == AnalysisSession.id)
+            .join(User, ScheduledScan.user_id == User.id)
+            .where(ScheduledScan.enabled.is_(True), ScheduledScan.next_run_at <= now)
+            .order_by(ScheduledScan.next_run_at)
+            .limit(limit)
+            .with_for_update(of=ScheduledScan, skip_locked=True)
+        )).all()
+        claimed = []
+        for scan, domain, config, plan in rows:
+            scan.next_run_at = CronSchedule(scan.cron).next_after(now)
+            scan.last_status = "running"
+            claimed.append({
+                "id": scan.id, "session_id": scan.session_id, "user_id": scan.user_id,
+                "domain": domain, "config": config, "plan": plan,
+            })
+        await db.commit()
+    return claimed
+
+
+async def run_claimed_scan(job: dict) -> None:
+    """
+    Run one claimed scan and record its outcome (and results) in the database.
+
+    The outcome is recorded even if the scan is cancelled (e.g. on shutdown),
+    so a scan never stays "running".
+    """
+    status, error, results = "failed", "Scan was interrupted", None
+    try:
+        if not job["domain"]:
+            raise ValueError("session has no domain")
+        results = await scan_session(job["domain"], job["config"], job["user_id"], job["plan"])
+        status, error = "ok", None
+    except Exception as exc:
+        logger.warning("Scheduled scan %s failed", job["id"], exc_info=True)
+        status, error = "failed", str(exc)[:500]
+    finally:
+        await _record_scan_outcome(job, status, error, results)
+
+
+async def _record_scan_outcome(job: dict, status: str, error: str | None, results: dict | None) -> None:
+    async with async_session_factory() as db:
+        scan = await db.get(ScheduledScan, job["id"])
+        if scan is not None:
+            scan.last_run_at = datetime.now(timezone.utc)
+            scan.last_status = status
+            scan.last_error = error
+        if results is not None:
+            session = await db.get(AnalysisSession, job["session_id"])
+            if session is not None:
+                session.results = results
+        await db.commit()
+
+
+async def run_scan_scheduler(poll_interval: float = SCHEDULER_POLL_INTERVAL) -> None:
+    """Background task: start due scans inside the scan window, a few at a time."""
+    running: set[asyncio.Task] = set()
+    try:
+        while True:
+            free = SCHEDULED_SCAN_CONCURRENCY - len(running)
+            if free > 0 and in_scan_window(datetime.now(timezone.utc)):
+                try:
+                    for job in await claim_due_scans(free):
+                        task = asyncio.create_task(run_claimed_scan(job))
+                        running.add(task)
+                        task.add_done_callback(running.discard)
+                except Exception:
+                    logger.warning("Could not claim scheduled scans", exc_info=True)
+            await asyncio.sleep(poll_interval)
+    finally:
+        # Interrupted scans run again at their next scheduled time
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
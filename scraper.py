@@ -1,13 +1,46 @@
+import asyncio
+import bisect
 import httpx
+import os
 import re
+from contextlib import nullcontext
+from typing import NamedTuple
 from bs4 import BeautifulSoup
+from lxml import etree
 from urllib.parse import urljoin, urlparse
 import trafilatura
+from browser_pool import get_browser_pool
+from cache import TTLCache, discovered_html
+from fingerprint import content_fingerprint, remember_fingerprint
+from host_limiter import host_slot
+from http_client import get_http_client
+from link_graph import record_outlinks, site_key
 from models import LinkInfo, InternalLinksInfo, AnalyzeResponse, PageResult, TargetPageInfo
+from resilience import HostUnavailable, guarded
+from singleflight import SingleFlight
+from url_canonical import dedupe_key, registry as canonical_registry
+from work_scheduler import Slot
 
-USER_AGENT = "InternalLinkFinder/1.0 (SEO Analysis Tool)"
 PAGE_TIMEOUT = 10.0
 
+# Title/headings mode: stop reading after this many bytes.
+HEADINGS_MAX_BYTES = 256 * 1024
+
+# Batch target fetching: overall concurrency (per-host concurrency adapts to
+# each host, see host_limiter), and how long fetched target info is reused.
+TARGET_BATCH_CONCURRENCY = 10
+TARGET_INFO_TTL = float(os.environ.get("TARGET_INFO_TTL", "900"))
+
+# Render mode: pages with fewer extracted words than this over plain HTTP are
+# rendered in the shared headless browser pool, at most RENDER_CONCURRENCY at
+# a time and within RENDER_BUDGET seconds each; rendered DOMs are reused for
+# RENDERED_HTML_TTL seconds.
+RENDER_MIN_WORDS = 50
+RENDER_CONCURRENCY = int(os.environ.get("RENDER_CONCURRENCY", "2"))
+RENDER_BUDGET = float(os.environ.get("RENDER_BUDGET", "20"))
+RENDERED_HTML_TTL = float(os.environ.get("RENDERED_HTML_TTL", "3600"))
+RENDER_FAILURE_TTL = 300.0
+
 STOP_WORDS = frozenset({
     'this', 'that', 'with', 'from', 'your', 'have', 'will', 'what', 'when',
     'where', 'which', 'their', 'there', 'about', 'would', 'could', 'should',
@@ -16,6 +49,89 @@ STOP_WORDS = frozenset({
     'even', 'much', 'each', 'well', 'back', 'after', 'before',
 })
 
+# Shares one in-flight fetch/parse between concurrent requests for the same URL
+_flights = SingleFlight()
+
+_target_info_cache = TTLCache(ttl=TARGET_INFO_TTL, max_entries=10_000)
+_rendered_html_cache = TTLCache(ttl=RENDERED_HTML_TTL, max_entries=500, max_bytes=64 * 1024 * 1024, sizeof=len)
+_render_semaphore = asyncio.Semaphore(RENDER_CONCURRENCY)
+
+
+async def _download_html(url: str) -> str:
+    async def attempt() -> httpx.Response:
+        async with host_slot(url):
+            response = await get_http_client().get(url, timeout=PAGE_TIMEOUT)
+            response.raise_for_status()
+            return response
+
+    response = await guarded(url, attempt)
+    canonical_registry.record_redirect(url, str(response.url))
+    return response.text
+
+
+async def fetch_html(url: str, keep: bool = False) -> str:
+    """
+    Return a page's HTML, downloading it at most once for concurrent callers.
+
+    HTML captured by the fallback crawl moments earlier is reused as-is, and
+    URLs known to redirect are fetched at their final location directly.
+    With keep=True the HTML is also kept in that cache, for a caller that
+    knows the page will be parsed again shortly.
+    Raises httpx errors (timeouts, HTTP status, request errors) to the caller.
+    """
+    url = canonical_registry.resolve(url)
+    html = discovered_html.get(dedupe_key(url))
+    if html is not None:
+        return html
+    html = await _flights.do(("fetch", dedupe_key(url)), lambda: _download_html(url))
+    if keep:
+        discovered_html.set(dedupe_key(canonical_registry.resolve(url)), html)
+    return html
+
+
+class ConditionalFetch(NamedTuple):
+    status: int  # 200, or 304 when the page is unchanged since the validators
+    html: str | None
+    etag: str | None
+    last_modified: str | None
+
+
+async def fetch_if_modified(
+    url: str,
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> ConditionalFetch:
+    """
+    Conditional GET with If-None-Match / If-Modified-Since.
+
+    A changed page's HTML is kept in the discovery cache, so analyzing it
+    straight afterwards does not download it again.
+    Raises httpx errors (timeouts, HTTP status, request errors) to the caller.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    async def attempt() -> httpx.Response:
+        async with host_slot(url):
+            response = await get_http_client().get(url, headers=headers, timeout=PAGE_TIMEOUT)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+    response = await guarded(url, attempt)
+    if response.status_code == 304:
+        return ConditionalFetch(304, None, etag, last_modified)
+    canonical_registry.record_redirect(url, str(response.url))
+    discovered_html.set(dedupe_key(str(response.url)), response.text)
+    return ConditionalFetch(
+        200,
+        response.text,
+        response.headers.get("etag"),
+        response.headers.get("last-modified"),
+    )
+
 
 def get_word_stems(text: str) -> set[str]:
     """
@@ -35,6 +151,79 @@ def get_word_stems(text: str) -> set[str]:
     return stems
 
 
+def _relevance_score(total_matches: int) -> int:
+    # Convert to 0-5 scale
+    # 0 matches = 0, 1-2 = 1, 3-5 = 2, 6-10 = 3, 11-20 = 4, 21+ = 5
+    if total_matches == 0:
+        return 0
+    elif total_matches <= 2:
+        return 1
+    elif total_matches <= 5:
+        return 2
+    elif total_matches <= 10:
+        return 3
+    elif total_matches <= 20:
+        return 4
+    else:
+        return 5
+
+
+class KeywordScorer:
+    """
+    Scores keyword relevance against one piece of content.
+
+    The content is tokenized once, so scoring many keyword sets (e.g. one per
+    target page) costs a dictionary lookup and a binary search per keyword stem
+    rather than a regex pass over the whole content.
+    """
+
+    def __init__(self, content: str):
+        self.content = content or ""
+        self._content_lower: str | None = None
+        self._content_stems: set[str] | None = None
+        self._words: list[str] = []
+        self._cumulative: list[int] = [0]
+
+    def _index(self) -> None:
+        if self._content_stems is not None:
+            return
+        self._content_lower = self.content.lower()
+        self._content_stems = get_word_stems(self.content)
+        counts: dict[str, int] = {}
+        for word in re.findall(r'\w+', self._content_lower):
+            counts[word] = counts.get(word, 0) + 1
+        self._words = sorted(counts)
+        for word in self._words:
+            self._cumulative.append(self._cumulative[-1] + counts[word])
+
+    def _count_prefix(self, prefix: str) -> int:
+        """Number of words in the content starting with prefix."""
+        lo = bisect.bisect_left(self._words, prefix)
+        hi = bisect.bisect_left(self._words, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        return self._cumulative[hi] - self._cumulative[lo]
+
+    def count_matches(self, keywords: list[str], match_type: str = "stemmed") -> int:
+        self._index()
+        total_matches = 0
+        if match_type == "exact":
+            # Exact match - case insensitive
+            for keyword in keywords:
+                total_matches += self._content_lower.count(keyword.lower())
+        else:
+            # Stemmed match: count words starting with any keyword stem present in content
+            for keyword in keywords:
+                for stem in get_word_stems(keyword):
+                    if stem in self._content_stems:
+                        total_matches += self._count_prefix(stem)
+        return total_matches
+
+    def relevance(self, keywords: list[str], match_type: str = "stemmed") -> int:
+        """Relevance score (0-5) of the content for the given keywords."""
+        if not keywords or not self.content:
+            return 0
+        return _relevance_score(self.count_matches(keywords, match_type))
+
+
 def calculate_keyword_relevance(
     content: str,
     keywords: list[str],
@@ -51,46 +240,7 @@ def calculate_keyword_relevance(
     Returns:
         Relevance score from 0-5
     """
-    if not keywords or not content:
-        return 0
-
-    content_lower = content.lower()
-    total_matches = 0
-
-    if match_type == "exact":
-        # Exact match - case insensitive
-        for keyword in keywords:
-            keyword_lower = keyword.lower()
-            # Count occurrences
-            matches = content_lower.count(keyword_lower)
-            total_matches += matches
-    else:
-        # Stemmed match
-        content_stems = get_word_stems(content)
-        for keyword in keywords:
-            keyword_stems = get_word_stems(keyword)
-            # Check if any keyword stem appears in content stems
-            for stem in keyword_stems:
-                if stem in content_stems:
-                    # Count how many times the stem pattern appears
-                    pattern = re.compile(rf'\b{re.escape(stem)}\w*\b', re.IGNORECASE)
-                    matches = len(pattern.findall(content))
-                    total_matches += matches
-
-    # Convert to 0-5 scale
-    # 0 matches = 0, 1-2 = 1, 3-5 = 2, 6-10 = 3, 11-20 = 4, 21+ = 5
-    if total_matches == 0:
-        return 0
-    elif total_matches <= 2:
-        return 1
-    elif total_matches <= 5:
-        return 2
-    elif total_matches <= 10:
-        return 3
-    elif total_matches <= 20:
-        return 4
-    else:
-        return 5
+    return KeywordScorer(content).relevance(keywords, match_type)
 
 
 async def fetch_target_page_content(url: str) -> TargetPageInfo:
@@ -104,16 +254,15 @@ async def fetch_target_page_content(url: str) -> TargetPageInfo:
         TargetPageInfo with url, title, and extracted keywords
     """
     url_str = str(url)
+    return await _flights.do(
+        ("target", dedupe_key(url_str)),
+        lambda: _fetch_target_page_content(url_str),
+    )
+
 
+async def _fetch_target_page_content(url_str: str) -> TargetPageInfo:
     try:
-        async with httpx.AsyncClient(
-            timeout=PAGE_TIMEOUT,
-            headers={"User-Agent": USER_AGENT},
-            follow_redirects=True,
-        ) as client:
-            response = await client.get(url_str)
-            response.raise_for_status()
-            html = response.text
+        html = await fetch_html(url_str)
     except Exception:
         return TargetPageInfo(url=url_str, title=None, keywords=[])
 
@@ -130,16 +279,22 @@ async def fetch_target_page_content(url: str) -> TargetPageInfo:
         if h1_tag:
             title = h1_tag.get_text(strip=True)
 
-    # Extract main content
-    extracted_content = trafilatura.extract(
-        html,
-        output_format='txt',
-        include_links=False,
-        include_images=False,
-        include_tables=True,
-    ) or ""
+    headings = [tag.get_text(strip=True) for tag in soup.find_all(['h1', 'h2'], limit=5)]
+
+    return TargetPageInfo(
+        url=url_str,
+        title=title,
+        keywords=extract_target_keywords(title, headings),
+    )
 
-    # Extract keywords from title and content
+
+def extract_target_keywords(title: str | None, headings: list[str]) -> list[str]:
+    """
+    Build a target page's keyword list from its title and H1/H2 headings.
+
+    Title words come first (high priority), then heading words; stop words and
+    words shorter than 4 letters are dropped. Returns at most 20 keywords.
+    """
     keywords = []
 
     # Add title words (high priority)
@@ -148,8 +303,7 @@ async def fetch_target_page_content(url: str) -> TargetPageInfo:
         keywords.extend([w for w in title_words if w not in STOP_WORDS])
 
     # Add H1/H2 words from content (medium priority)
-    for tag in soup.find_all(['h1', 'h2'], limit=5):
-        heading_text = tag.get_text(strip=True)
+    for heading_text in headings:
         heading_words = re.findall(r'\b[a-zA-Z]{4,}\b', heading_text.lower())
         keywords.extend([w for w in heading_words if w not in STOP_WORDS])
 
@@ -161,30 +315,213 @@ async def fetch_target_page_content(url: str) -> TargetPageInfo:
             seen.add(kw)
             unique_keywords.append(kw)
 
+    return unique_keywords[:20]  # Limit to top 20 keywords
+
+
+async def _stream_title_and_headings(url: str, include_headings: bool) -> tuple[str | None, list[str]]:
+    """
+    Stream a page through an incremental HTML parser and stop as soon as the
+    title (and, if wanted, the first H1/H2) has been parsed.
+    """
+    return await guarded(url, lambda: _stream_title_and_headings_once(url, include_headings))
+
+
+async def _stream_title_and_headings_once(url: str, include_headings: bool) -> tuple[str | None, list[str]]:
+    parser = etree.HTMLPullParser(events=("end",))
+    title = None
+    headings: list[str] = []
+    received = 0
+
+    client = get_http_client()
+    async with host_slot(url), client.stream("GET", url, timeout=PAGE_TIMEOUT) as response:
+        response.raise_for_status()
+        canonical_registry.record_redirect(url, str(response.url))
+        async for chunk in response.aiter_bytes():
+            parser.feed(chunk)
+            received += len(chunk)
+            done = False
+            for _, element in parser.read_events():
+                tag = element.tag if isinstance(element.tag, str) else ""
+                if tag == "title" and title is None:
+                    title = "".join(element.itertext()).strip() or None
+                elif tag == "head" and title and not include_headings:
+                    done = True
+                elif tag in ("h1", "h2"):
+                    text = "".join(element.itertext()).strip()
+                    if text:
+                        headings.append(text)
+                        done = True
+                if done:
+                    break
+            if done or received >= HEADINGS_MAX_BYTES:
+                break
+
+    if not title and headings:
+        title = headings[0]
+    return title, headings
+
+
+async def fetch_target_headings(url: str, include_headings: bool = True) -> TargetPageInfo:
+    """
+    Lightweight variant of fetch_target_page_content for building target catalogues.
+
+    Reads only as much of the page as needed for its <title> and first H1/H2
+    (at most HEADINGS_MAX_BYTES) instead of downloading and extracting the whole
+    page. Keywords come from the title and that heading.
+    """
+    url_str = str(url)
+    return await _flights.do(
+        ("headings", dedupe_key(url_str), include_headings),
+        lambda: _fetch_target_headings(url_str, include_headings),
+    )
+
+
+async def _fetch_target_headings(url_str: str, include_headings: bool) -> TargetPageInfo:
+    try:
+        title, headings = await _stream_title_and_headings(
+            canonical_registry.resolve(url_str), include_headings
+        )
+    except Exception:
+        return TargetPageInfo(url=url_str, title=None, keywords=[])
     return TargetPageInfo(
         url=url_str,
         title=title,
-        keywords=unique_keywords[:20]  # Limit to top 20 keywords
+        keywords=extract_target_keywords(title, headings),
     )
 
 
-async def analyze_page(url: str, target_pattern: str) -> AnalyzeResponse:
+async def get_target_info(url: str, mode: str = "full") -> TargetPageInfo:
+    """
+    Return a target page's title and keywords, cached per URL for TARGET_INFO_TTL.
+
+    mode is "full" (fetch_target_page_content) or "headings" (fetch_target_headings).
+    Fetches run under the host's adaptive concurrency limit; failed lookups are not cached.
+    """
+    url_str = str(url)
+    cache_key = (mode, dedupe_key(url_str))
+    cached = _target_info_cache.get(cache_key)
+    if cached is not None:
+        return cached.model_copy(update={"url": url_str})
+
+    if mode == "headings":
+        info = await fetch_target_headings(url_str)
+    else:
+        info = await fetch_target_page_content(url_str)
+
+    if info.title or info.keywords:
+        _target_info_cache.set(cache_key, info)
+    return info
+
+
+async def fetch_target_infos(
+    urls: list[str],
+    mode: str = "full",
+    concurrency: int = TARGET_BATCH_CONCURRENCY,
+    slot: Slot = nullcontext,
+) -> list[TargetPageInfo]:
+    """
+    Fetch title/keywords for many target URLs concurrently, preserving order.
+    ``slot`` is held around each fetch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(url: str) -> TargetPageInfo:
+        async with semaphore, slot():
+            return await get_target_info(url, mode)
+
+    return list(await asyncio.gather(*(fetch_one(str(url)) for url in urls)))
+
+
+async def fetch_source_contents(
+    sources: list[dict],
+    concurrency: int = TARGET_BATCH_CONCURRENCY,
+    slot: Slot = nullcontext,
+) -> list[dict]:
+    """
+    Fill in extracted content for source dicts ({"url", "content"}) that lack it.
+
+    Pages are fetched concurrently (limited per host), each inside ``slot``; a
+    source that fails gets empty content and an "error" key. Order is preserved.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fill(source: dict) -> dict:
+        if source.get("content"):
+            return source
+        async with semaphore, slot():
+            result = await analyze_page(source["url"], "")
+        return {**source, "content": result.extracted_content, "error": result.error}
+
+    return list(await asyncio.gather(*(fill(source) for source in sources)))
+
+
+async def render_html(url: str) -> str | None:
+    """
+    Return a page's DOM as rendered by the shared headless browser pool.
+
+    At most RENDER_CONCURRENCY renders run at once, and a render (including
+    the wait for its turn) gives up after RENDER_BUDGET seconds. Rendered
+    DOMs are cached for RENDERED_HTML_TTL; failed renders are remembered
+    briefly so a broken page is not re-rendered on every request.
+    """
+    key = dedupe_key(url)
+    cached = _rendered_html_cache.get(key)
+    if cached is not None:
+        return cached or None
+
+    async def render() -> str | None:
+        async def limited() -> str | None:
+            async with _render_semaphore:
+                return await get_browser_pool().render(url, key=urlparse(url).hostname or "default")
+
+        try:
+            html = await asyncio.wait_for(limited(), RENDER_BUDGET)
+        except asyncio.TimeoutError:
+            html = None
+        if html:
+            _rendered_html_cache.set(key, html)
+        else:
+            _rendered_html_cache.set(key, "", ttl=RENDER_FAILURE_TTL)
+        return html
+
+    return await _flights.do(("render", key), render)
+
+
+async def analyze_page(
+    url: str, target_pattern: str, render: bool = False, owner: str | None = None
+) -> AnalyzeResponse:
     """
     Scrape a single URL and return link audit data.
+
+    With render=True, a page whose HTTP response yields a near-empty
+    extraction (fewer than RENDER_MIN_WORDS words, as on client-rendered
+    sites) is rendered in a headless browser and analyzed from its DOM.
+    Pages with real server-side content never touch the browser.
+
+    When ``owner`` (a signed-in user's tenant key) is given, the page's links
+    are recorded in that user's link graph of the domain.
+
+    Concurrent calls for the same URL and target pattern share one fetch and parse.
     """
     url_str = str(url)
-    parsed_url = urlparse(url_str)
-    base_domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
+    result = await _flights.do(
+        ("analyze", dedupe_key(url_str), target_pattern, render),
+        lambda: _analyze_page(url_str, target_pattern, render),
+    )
+    if owner is not None and result.error is None:
+        record_outlinks(owner, url_str, result.site_links, [link.href for link in result.internal_links.links])
+    return result
 
+
+async def _analyze_page(url_str: str, target_pattern: str, render: bool = False) -> AnalyzeResponse:
     try:
-        async with httpx.AsyncClient(
-            timeout=PAGE_TIMEOUT,
-            headers={"User-Agent": USER_AGENT},
-            follow_redirects=True,
-        ) as client:
-            response = await client.get(url_str)
-            response.raise_for_status()
-            html = response.text
+        html = await fetch_html(url_str)
+    except HostUnavailable:
+        return AnalyzeResponse(
+            url=url_str,
+            internal_links=InternalLinksInfo(total=0, to_target_pages=0, links=[]),
+            error="host_unavailable",
+        )
     except httpx.TimeoutException:
         return AnalyzeResponse(
             url=url_str,
@@ -204,9 +541,41 @@ async def analyze_page(url: str, target_pattern: str) -> AnalyzeResponse:
             error=f"request_error: {str(e)}",
         )
 
+    result = _parse_page(url_str, html, target_pattern)
+    if render and result.word_count < RENDER_MIN_WORDS:
+        rendered_html = await render_html(url_str)
+        if rendered_html:
+            rendered = _parse_page(url_str, rendered_html, target_pattern)
+            if rendered.word_count > result.word_count:
+                result = rendered
+                result.rendered = True
+
+    remember_fingerprint(url_str, result.content_fingerprint)
+    return result
+
+
+def _parse_page(url_str: str, html: str, target_pattern: str) -> AnalyzeResponse:
+    """Extract title, main content and links from a page's HTML."""
+    parsed_url = urlparse(url_str)
+
     # Parse HTML
     soup = BeautifulSoup(html, "lxml")
 
+    # Remember the declared canonical so later scans can collapse aliases
+    canonical_tag = soup.find("link", rel="canonical", href=True)
+    if canonical_tag:
+        canonical_registry.record_canonical(url_str, canonical_tag["href"])
+
+    # Every same-site link, navigation and footers included, for the link graph
+    site = site_key(url_str)
+    site_links = []
+    for a_tag in soup.find_all("a", href=True):
+        href = a_tag["href"]
+        if href and not href.startswith(("#", "javascript:")):
+            absolute_url = urljoin(url_str, href)
+            if site_key(absolute_url) == site:
+                site_links.append(absolute_url)
+
     # Extract title
     title = None
     title_tag = soup.find("title")
@@ -249,6 +618,9 @@ async def analyze_page(url: str, target_pattern: str) -> AnalyzeResponse:
     # Count words
     word_count = len(extracted_content.split()) if extracted_content else 0
 
+    # Fingerprint the content for near-duplicate detection
+    fingerprint = content_fingerprint(extracted_content) if extracted_content else None
+
     # Find all links within the extracted main content only
     internal_links: list[LinkInfo] = []
     external_link_count = 0
@@ -302,6 +674,8 @@ async def analyze_page(url: str, target_pattern: str) -> AnalyzeResponse:
         link_density=round(link_density, 2),
         content_snippet=content_snippet,
         extracted_content=extracted_content,
+        content_fingerprint=fingerprint,
+        site_links=site_links,
     )
 
 
@@ -309,7 +683,10 @@ async def analyze_page_summary(
     url: str,
     target_pattern: str,
     filter_keywords: list[str] | None = None,
-    filter_match_type: str = "stemmed"
+    filter_match_type: str = "stemmed",
+    target_keyword_sets: list[list[str]] | None = None,
+    render: bool = False,
+    owner: str | None = None,
 ) -> PageResult:
     """
     Analyze a page and return a summary result for bulk operations.
@@ -319,10 +696,23 @@ async def analyze_page_summary(
         target_pattern: Pattern for target pages
         filter_keywords: Optional keywords for relevance scoring
         filter_match_type: "exact" or "stemmed" for keyword matching
+        target_keyword_sets: Optional keyword list per focus target; scored in
+            one pass over the page into PageResult.target_relevance
+        render: Render near-empty pages in a headless browser (see analyze_page)
+        owner: Record the page's links in this user's link graph (see analyze_page)
     """
-    import math
+    result = await analyze_page(url, target_pattern, render=render, owner=owner)
+    return summarize_analysis(result, filter_keywords, filter_match_type, target_keyword_sets)
+
 
-    result = await analyze_page(url, target_pattern)
+def summarize_analysis(
+    result: AnalyzeResponse,
+    filter_keywords: list[str] | None = None,
+    filter_match_type: str = "stemmed",
+    target_keyword_sets: list[list[str]] | None = None,
+) -> PageResult:
+    """Classify an analyze_page result by link density (see analyze_page_summary)."""
+    import math
 
     if result.error:
         return PageResult(
@@ -332,13 +722,16 @@ async def analyze_page_summary(
         )
 
     # Calculate keyword relevance if filter is active
+    scorer = KeywordScorer(result.extracted_content)
     keyword_relevance = None
     if filter_keywords:
-        keyword_relevance = calculate_keyword_relevance(
-            result.extracted_content,
-            filter_keywords,
-            filter_match_type
-        )
+        keyword_relevance = scorer.relevance(filter_keywords, filter_match_type)
+
+    target_relevance = None
+    if target_keyword_sets:
+        target_relevance = [
+            scorer.relevance(keywords, filter_match_type) for keywords in target_keyword_sets
+        ]
 
     # Density thresholds
     LOW_THRESHOLD = 0.35
@@ -384,4 +777,6 @@ async def analyze_page_summary(
         links_available=links_available,
         status=status,
         keyword_relevance=keyword_relevance,
+        target_relevance=target_relevance,
+        content_fingerprint=result.content_fingerprint,
     )
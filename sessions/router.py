@@ -10,7 +10,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from billing.dependencies import require_starter_or_pro
 from database import get_db
-from db_models import AnalysisSession, User
+from db_models import AnalysisSession, ScheduledScan, User
+from scheduler import validate_cron
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
@@ -54,6 +55,21 @@ class SessionDetail(BaseModel):
     updated_at: datetime
 
 
+class ScheduleRequest(BaseModel):
+    cron: str = "@nightly"
+    enabled: bool = True
+
+
+class ScheduleDetail(BaseModel):
+    session_id: str
+    cron: str
+    enabled: bool
+    next_run_at: datetime
+    last_run_at: Optional[datetime]
+    last_status: Optional[str]
+    last_error: Optional[str]
+
+
 def _url_count_from_results(results: Any) -> int:
     """Extract URL count from session results."""
     if isinstance(results, dict):
@@ -234,3 +250,91 @@ async def delete_session(
 
     await db.delete(session)
     await db.flush()
+
+
+# ---------------------------------------------------------------------------
+# /sessions/{session_id}/schedule — recurring re-scans
+# ---------------------------------------------------------------------------
+
+
+def _schedule_to_detail(scan: ScheduledScan) -> ScheduleDetail:
+    return ScheduleDetail(
+        session_id=str(scan.session_id),
+        cron=scan.cron,
+        enabled=scan.enabled,
+        next_run_at=scan.next_run_at,
+        last_run_at=scan.last_run_at,
+        last_status=scan.last_status,
+        last_error=scan.last_error,
+    )
+
+
+async def _get_schedule(session_id: str, user: User, db: AsyncSession) -> tuple[AnalysisSession, Optional[ScheduledScan]]:
+    try:
+        sid = uuid.UUID(session_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found.")
+
+    result = await db.execute(
+        select(AnalysisSession, ScheduledScan)
+        .outerjoin(ScheduledScan, ScheduledScan.session_id == AnalysisSession.id)
+        .where(
+            AnalysisSession.id == sid,
+            AnalysisSession.user_id == user.id,
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found.")
+    return row[0], row[1]
+
+
+@router.get("/{session_id}/schedule", response_model=ScheduleDetail)
+async def get_schedule(
+    session_id: str,
+    current_user: User = Depends(require_starter_or_pro),
+    db: AsyncSession = Depends(get_db),
+) -> ScheduleDetail:
+    _, scan = await _get_schedule(session_id, current_user, db)
+    if scan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session has no schedule.")
+    return _schedule_to_detail(scan)
+
+
+@router.put("/{session_id}/schedule", response_model=ScheduleDetail)
+async def set_schedule(
+    session_id: str,
+    request_body: ScheduleRequest,
+    current_user: User = Depends(require_starter_or_pro),
+    db: AsyncSession = Depends(get_db),
+) -> ScheduleDetail:
+    session, scan = await _get_schedule(session_id, current_user, db)
+    if not session.domain:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Session has no domain to scan.")
+    try:
+        schedule = validate_cron(request_body.cron)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid schedule: {exc}")
+
+    if scan is None:
+        scan = ScheduledScan(user_id=current_user.id, session_id=session.id)
+        db.add(scan)
+    scan.cron = schedule.expression
+    scan.enabled = request_body.enabled
+    scan.next_run_at = schedule.next_after(datetime.now(timezone.utc))
+    await db.flush()
+    await db.refresh(scan)
+    return _schedule_to_detail(scan)
+
+
+@router.delete("/{session_id}/schedule", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_schedule(
+    session_id: str,
+    current_user: User = Depends(require_starter_or_pro),
+    db: AsyncSession = Depends(get_db),
+) -> None:
+    _, scan = await _get_schedule(session_id, current_user, db)
+    if scan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session has no schedule.")
+    await db.delete(scan)
+    await db.flush()
@@ -1,36 +1,38 @@
 import gzip
+from contextlib import nullcontext
+
 import httpx
 from bs4 import BeautifulSoup
+from http_client import outbound_transport
 from models import PageInfo
+from robots import get_robots
+from url_canonical import dedupe_key
+from work_scheduler import Slot
 
 USER_AGENT = "InternalLinkFinder/1.0 (SEO Analysis Tool)"
 SITEMAP_TIMEOUT = 30.0
 
 
-async def check_robots_txt(client: httpx.AsyncClient, domain: str) -> list[str]:
+async def check_robots_txt(domain: str) -> list[str]:
     """
-    Fetch robots.txt and extract any Sitemap: directives.
-    Returns a list of declared sitemap URLs.
+    Return the Sitemap: URLs declared in the domain's robots.txt.
+    Uses the shared, cached robots.txt service.
     """
-    urls = []
-    try:
-        response = await client.get(f"{domain}/robots.txt")
-        if response.status_code == 200:
-            for line in response.text.splitlines():
-                stripped = line.strip()
-                if stripped.lower().startswith("sitemap:"):
-                    sitemap_url = stripped[8:].strip()
-                    if sitemap_url:
-                        urls.append(sitemap_url)
-    except httpx.RequestError:
-        pass
-    return urls
+    rules = await get_robots(domain)
+    return list(rules.sitemaps)
 
 
-async def fetch_sitemap(domain: str, source_pattern: str, target_pattern: str, max_crawl_pages: int = 50) -> dict:
+async def fetch_sitemap(
+    domain: str,
+    source_pattern: str,
+    target_pattern: str,
+    max_crawl_pages: int = 50,
+    slot: Slot = nullcontext,
+) -> dict:
     """
     Fetch and parse a site's sitemap to get all URLs.
     Returns categorized lists of source and target pages.
+    ``slot`` is held around each sitemap request and crawled page.
     """
     domain = domain.rstrip("/")
     sitemap_url = None
@@ -43,9 +45,10 @@ async def fetch_sitemap(domain: str, source_pattern: str, target_pattern: str, m
             "Accept-Encoding": "gzip, deflate",
         },
         follow_redirects=True,
+        transport=outbound_transport(),
     ) as client:
         # Check robots.txt first for declared sitemap URLs
-        robots_sitemaps = await check_robots_txt(client, domain)
+        robots_sitemaps = await check_robots_txt(domain)
 
         # Try robots.txt declared URLs first, then common fallback locations
         sitemap_locations = robots_sitemaps + [
@@ -58,7 +61,8 @@ async def fetch_sitemap(domain: str, source_pattern: str, target_pattern: str, m
 
         for url in sitemap_locations:
             try:
-                response = await client.get(url)
+                async with slot():
+                    response = await client.get(url)
                 if response.status_code == 200:
                     content_type = response.headers.get("content-type", "")
                     # Check if response is XML (either by content-type or if URL ends in .xml)
@@ -66,7 +70,7 @@ async def fetch_sitemap(domain: str, source_pattern: str, target_pattern: str, m
                         sitemap_url = url
                         xml_content = get_xml_content(response)
                         if xml_content:
-                            all_urls = await parse_sitemap(client, xml_content, domain)
+                            all_urls = await parse_sitemap(client, xml_content, domain, slot)
                             break
             except httpx.RequestError:
                 continue
@@ -79,10 +83,16 @@ async def fetch_sitemap(domain: str, source_pattern: str, target_pattern: str, m
             from fallback_crawler import crawl_site
 
             discovery_method = "crawl"
-            all_urls = await crawl_site(domain, max_crawl_pages)
+            all_urls = await crawl_site(domain, max_crawl_pages, source_pattern, target_pattern, slot=slot)
         except Exception:
             pass  # Return empty results rather than 500
 
+    # Collapse URL variants (trailing slashes, tracking params, http/https)
+    unique_urls: dict[str, PageInfo] = {}
+    for page in all_urls:
+        unique_urls.setdefault(dedupe_key(page.url), page)
+    all_urls = list(unique_urls.values())
+
     # Filter URLs by patterns
     source_pages = [
         page for page in all_urls if source_pattern.lower() in page.url.lower()
@@ -123,7 +133,7 @@ def get_xml_content(response: httpx.Response) -> str | None:
 
 
 async def parse_sitemap(
-    client: httpx.AsyncClient, xml_content: str, domain: str
+    client: httpx.AsyncClient, xml_content: str, domain: str, slot: Slot = nullcontext
 ) -> list[PageInfo]:
     """
     Parse sitemap XML content. Handles both regular sitemaps and sitemap indexes.
@@ -139,12 +149,13 @@ async def parse_sitemap(
             loc = sitemap_tag.find("loc")
             if loc and loc.text:
                 try:
-                    child_response = await client.get(loc.text)
+                    async with slot():
+                        child_response = await client.get(loc.text)
                     if child_response.status_code == 200:
                         child_content = get_xml_content(child_response)
                         if child_content:
                             child_urls = await parse_sitemap(
-                                client, child_content, domain
+                                client, child_content, domain, slot
                             )
                             urls.extend(child_urls)
                 except httpx.RequestError:
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from browser_pool import BrowserPool, _BrowserSlot
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_round_robin_by_key():
+    """A key with many queued requests alternates with other keys."""
+    pool = BrowserPool(size=1)
+    slot = await pool._acquire("big")
+
+    order: list[str] = []
+
+    async def waiter(key: str):
+        acquired = await pool._acquire(key)
+        order.append(key)
+        pool._release(acquired)
+
+    tasks = [asyncio.create_task(waiter("big")) for _ in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(waiter("small")))
+    await asyncio.sleep(0)
+
+    pool._release(slot)
+    await asyncio.gather(*tasks)
+    assert order == ["big", "small", "big", "big"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    pool = BrowserPool(size=1)
+    slot = await pool._acquire("a")
+    task = asyncio.create_task(pool._acquire("b"))
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    pool._release(slot)
+    assert await asyncio.wait_for(pool._acquire("c"), timeout=1) is slot
+
+
+@pytest.mark.asyncio
+async def test_failed_launch_pauses_the_pool(monkeypatch):
+    launches = 0
+
+    async def failing_start(self):
+        nonlocal launches
+        launches += 1
+        raise RuntimeError("no chromium")
+
+    monkeypatch.setattr(_BrowserSlot, "start", failing_start)
+    pool = BrowserPool(size=1)
+    slot = await pool._acquire("a")
+    with pytest.raises(RuntimeError):
+        await pool._prepare(slot)
+    pool._release(slot)
+
+    assert await pool.render("https://example.com/") is None
+    assert launches == 1
@@ -0,0 +1,30 @@
+import time
+
+from cache import TTLCache
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = TTLCache(ttl=10)
+    now = time.monotonic()
+    cache.set("a", "value")
+    assert cache.get("a") == "value"
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_size_bound_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, max_bytes=10, sizeof=len)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.get("a")
+    cache.set("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+
+
+def test_oversized_values_are_not_stored():
+    cache = TTLCache(ttl=60, max_bytes=3, sizeof=len)
+    cache.set("a", "too long")
+    assert cache.get("a") is None
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import scheduler
+from cron import CronSchedule
+from scheduler import in_scan_window, run_claimed_scan, validate_cron
+
+
+def at(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_next_after_steps_and_rollover():
+    schedule = CronSchedule("*/15 9-17 * * *")
+    assert schedule.next_after(at(2026, 3, 2, 9, 7)) == at(2026, 3, 2, 9, 15)
+    assert schedule.next_after(at(2026, 3, 2, 17, 45)) == at(2026, 3, 3, 9, 0)
+    assert CronSchedule("@monthly").next_after(at(2026, 12, 15, 8, 0)) == at(2027, 1, 1, 0, 0)
+
+
+def test_day_fields_match_either_when_both_restricted():
+    schedule = CronSchedule("0 2 13 * 5")
+    # Tuesday 2026-10-20 -> Friday 23rd comes before the 13th of November
+    assert schedule.next_after(at(2026, 10, 20)) == at(2026, 10, 23, 2, 0)
+    assert CronSchedule("0 0 * * 7").next_after(at(2026, 10, 19)) == at(2026, 10, 25, 0, 0)
+
+
+def test_invalid_expressions():
+    for expression in ("* * *", "61 * * * *", "0 0 31 2 *", "*/0 * * * *"):
+        with pytest.raises(ValueError):
+            CronSchedule(expression).next_after(at(2026, 1, 1))
+    with pytest.raises(ValueError):
+        validate_cron("*/30 * * * *")
+    assert validate_cron("@nightly").expression == "@nightly"
+
+
+def test_scan_window_wraps_midnight():
+    assert in_scan_window(at(2026, 1, 1, 2, 30), "01:00-06:00")
+    assert not in_scan_window(at(2026, 1, 1, 6, 0), "01:00-06:00")
+    assert in_scan_window(at(2026, 1, 1, 23, 0), "22:00-04:00")
+    assert not in_scan_window(at(2026, 1, 1, 12, 0), "22:00-04:00")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_scan_records_a_final_status(monkeypatch):
+    recorded = []
+
+    async def scan_session(*args):
+        raise asyncio.CancelledError
+
+    async def record(job, status, error, results):
+        recorded.append((status, error, results))
+
+    monkeypatch.setattr(scheduler, "scan_session", scan_session)
+    monkeypatch.setattr(scheduler, "_record_scan_outcome", record)
+    job = {"id": 1, "session_id": 2, "user_id": 3, "domain": "example.com", "config": None, "plan": "free"}
+    with pytest.raises(asyncio.CancelledError):
+        await run_claimed_scan(job)
+    assert recorded == [("failed", "Scan was interrupted", None)]
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import dns.asyncresolver
+import dns.resolver
+import httpx
+import pytest
+
+from dns_cache import CachedDNSTransport, DNSCache, system_resolve
+from http_client import outbound_transport
+
+
+class FakeResolver:
+    def __init__(self, ttl=60.0, fail=False):
+        self.ttl, self.fail, self.calls = ttl, fail, []
+
+    async def __call__(self, host):
+        self.calls.append(host)
+        await asyncio.sleep(0)
+        if self.fail:
+            raise OSError(f"cannot resolve {host}")
+        return ["192.0.2.1", "2001:db8::1"], self.ttl
+
+
+@pytest.mark.asyncio
+async def test_answers_are_cached_for_their_ttl(monkeypatch):
+    resolver = FakeResolver(ttl=60)
+    cache = DNSCache(resolve=resolver)
+    results = await asyncio.gather(*(cache.resolve("Example.com") for _ in range(5)))
+    assert results[0] == ["192.0.2.1", "2001:db8::1"]
+    assert resolver.calls == ["example.com"]  # concurrent lookups share one query
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 30)
+    await cache.resolve("example.com")
+    assert len(resolver.calls) == 1
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    await cache.resolve("example.com")
+    assert len(resolver.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_are_cached_briefly(monkeypatch):
+    resolver = FakeResolver(fail=True)
+    cache = DNSCache(resolve=resolver, negative_ttl=10)
+    for _ in range(3):
+        with pytest.raises(OSError):
+            await cache.resolve("gone.example")
+    assert len(resolver.calls) == 1
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    with pytest.raises(OSError):
+        await cache.resolve("gone.example")
+    assert len(resolver.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_ip_literals_and_size_bound():
+    resolver = FakeResolver()
+    cache = DNSCache(resolve=resolver, max_entries=2)
+    assert await cache.resolve("10.0.0.1") == ["10.0.0.1"]
+    for host in ("a.example", "b.example", "c.example", "a.example"):
+        await cache.resolve(host)
+    assert resolver.calls == ["a.example", "b.example", "c.example", "a.example"]
+
+
+@pytest.mark.asyncio
+async def test_unresolvable_names_surface_as_connect_errors():
+    # dnspython rejects a 70-byte label before querying; this must not escape as a DNS exception
+    host = "a" * 70 + ".example.com"
+    async with httpx.AsyncClient(transport=CachedDNSTransport()) as client:
+        with pytest.raises(httpx.ConnectError):
+            await client.get(f"http://{host}/")
+
+
+@pytest.mark.asyncio
+async def test_nxdomain_is_final(monkeypatch):
+    class Resolver:
+        async def resolve(self, host, rdtype, lifetime=None):
+            raise dns.resolver.NXDOMAIN()
+
+    async def getaddrinfo(*args, **kwargs):
+        raise AssertionError("NXDOMAIN must not fall back to getaddrinfo")
+
+    monkeypatch.setattr(dns.asyncresolver, "get_default_resolver", lambda: Resolver())
+    monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+    with pytest.raises(OSError, match="no such domain"):
+        await system_resolve("gone.example.com")
+
+
+def test_proxy_environment_keeps_the_standard_transport(monkeypatch):
+    monkeypatch.setenv("HTTPS_PROXY", "http://proxy.internal:3128")
+    assert outbound_transport() is None
+    monkeypatch.delenv("HTTPS_PROXY")
+    for name in ("HTTP_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy"):
+        monkeypatch.delenv(name, raising=False)
+    assert isinstance(outbound_transport(), CachedDNSTransport)
@@ -84,3 +84,56 @@ def test_find_link_opportunities_respects_threshold():
     ]
     matches = find_link_opportunities(source_content, targets, threshold=0.7)
     assert len(matches) == 0
+
+
+def _bag_of_words(texts):
+    import numpy as np
+
+    vocab = ["audi", "lease", "bmw", "hire", "garden", "soil", "tyre"]
+    rows = np.array([[t.lower().count(w) for w in vocab] for t in texts], dtype=np.float32)
+    return rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-9)
+
+
+def test_match_site_blockwise_matches_brute_force(monkeypatch):
+    """Per-source and per-target top matches agree with a brute-force scan, across blocks."""
+    import random
+
+    import embeddings
+    from embeddings import match_site
+
+    monkeypatch.setattr(embeddings, "SITE_MATCH_BLOCK_WINDOWS", 3)
+    monkeypatch.setattr(embeddings, "SITE_MATCH_BLOCK_TARGETS", 2)
+    words = ["audi", "lease", "bmw", "hire", "garden", "soil", "tyre", "the", "and"]
+    rng = random.Random(7)
+    sources = [
+        {"url": f"/blog/{i}", "content": " ".join(rng.choice(words) for _ in range(rng.randint(5, 40)))}
+        for i in range(6)
+    ]
+    sources.append({"url": "/blog/empty", "content": ""})
+    targets = [
+        {"url": "/audi", "title": "Audi lease"},
+        {"url": "/bmw", "title": "BMW hire"},
+        {"url": "/garden", "title": "Garden soil"},
+        {"url": "/tyre", "title": "Tyre"},
+        {"url": "/blog/0", "title": "Audi garden"},
+    ]
+    per_source, per_target = match_site(
+        sources, targets, threshold=0.3, top_per_source=2, top_per_target=3,
+        window_size=10, overlap=3, embed=_bag_of_words,
+    )
+
+    best = {}
+    for s in sources:
+        chunks = sliding_window_chunks(s["content"], 10, 3) if s["content"] else []
+        for t in targets:
+            if chunks and t["url"] != s["url"]:
+                scores = _bag_of_words([c[0] for c in chunks]) @ _bag_of_words([t["title"]])[0]
+                best[s["url"], t["url"]] = round(float(scores.max()), 4)
+
+    for s, matches in zip(sources, per_source):
+        expected = sorted((v for (su, _), v in best.items() if su == s["url"] and v >= 0.3), reverse=True)[:2]
+        assert [m["similarity"] for m in matches] == expected
+    for t, links in zip(targets, per_target):
+        expected = sorted((v for (_, tu), v in best.items() if tu == t["url"] and v >= 0.3), reverse=True)[:3]
+        assert [link["similarity"] for link in links] == expected
+        assert all(link["source_url"] != t["url"] for link in links)
@@ -0,0 +1,96 @@
+import httpx
+import pytest
+
+import fallback_crawler
+from cache import discovered_html
+from robots import RobotsRules
+from url_canonical import dedupe_key
+from fallback_crawler import _Frontier, crawl_site, extract_links, score_link
+
+
+def _page(links: list[str]) -> str:
+    anchors = "".join(f'<a href="{href}">link</a>' for href in links)
+    words = " ".join(f"word{i}" for i in range(80))
+    return f"<html><body><p>{words}</p>{anchors}</body></html>"
+
+
+SITE = {
+    "/": _page(["/blog/", "/services/", "/about", "https://other.com/x"]),
+    "/blog/": _page(["/blog/post-1", "/blog/post-2", "/", "/logo.png"]),
+    "/services/": _page(["/services/seo", "/", "/blog/"]),
+    "/about": _page(["/", "/blog/", "/services/"]),
+    "/blog/post-1": _page(["/", "/blog/", "/services/seo"]),
+    "/blog/post-2": _page(["/", "/blog/", "/blog/post-1"]),
+    "/services/seo": _page(["/", "/services/", "/blog/"]),
+}
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    html = SITE.get(request.url.path)
+    if html is None:
+        return httpx.Response(404)
+    return httpx.Response(200, text=html, headers={"content-type": "text/html"})
+
+
+@pytest.fixture
+def mock_site(monkeypatch):
+    monkeypatch.setattr(fallback_crawler, "HOST_DELAY", 0.0)
+    monkeypatch.setattr(fallback_crawler, "outbound_transport", lambda: httpx.MockTransport(_handler))
+    monkeypatch.setattr(fallback_crawler, "get_robots", _allow_all)
+    monkeypatch.setattr(fallback_crawler, "crawl_delay", _no_delay)
+
+
+async def _allow_all(url):
+    return RobotsRules()
+
+
+async def _no_delay(url):
+    return None
+
+
+def test_extract_links_filters_to_same_host():
+    html = _page(["/a", "#top", "mailto:x@example.com", "https://other.com/b", "/file.pdf", "/c#frag"])
+    links, word_count = extract_links(html, "https://example.com/", "example.com")
+    assert links == ["https://example.com/a", "https://example.com/c"]
+    assert word_count >= 80
+
+
+@pytest.mark.asyncio
+async def test_crawl_site_discovers_pages_over_http(mock_site):
+    pages = await crawl_site("https://example.com/", max_pages=50)
+    urls = {p.url for p in pages}
+    assert urls == {f"https://example.com{path}" for path in SITE}
+    assert all(p.lastmod is None for p in pages)
+    assert discovered_html.get(dedupe_key("https://example.com/blog/post-1")) == SITE["/blog/post-1"]
+
+
+@pytest.mark.asyncio
+async def test_crawl_site_respects_max_pages(mock_site):
+    pages = await crawl_site("https://example.com/", max_pages=3)
+    assert len(pages) == 3
+
+
+def test_score_link_prefers_pattern_matches_and_hubs():
+    patterns = ["/blog/", "/services/"]
+    match = score_link("https://example.com/blog/post-1", 1, patterns)
+    hub = score_link("https://example.com/blog", 1, patterns)
+    other = score_link("https://example.com/about", 1, patterns)
+    assert match > hub > other
+    assert score_link("https://example.com/blog/post-1", 3, patterns) < match
+
+
+def test_frontier_pops_highest_score_first_and_stays_bounded():
+    frontier = _Frontier(max_size=4)
+    for i, score in enumerate([1.0, 5.0, 3.0, 9.0, 2.0]):
+        frontier.push(f"https://example.com/{i}", 1, score)
+    assert len(frontier) <= 4
+    assert frontier.pop()[0] == "https://example.com/3"
+
+
+@pytest.mark.asyncio
+async def test_crawl_site_spends_budget_on_matching_pages(mock_site, monkeypatch):
+    monkeypatch.setattr(fallback_crawler, "CRAWL_CONCURRENCY", 1)
+    pages = await crawl_site("https://example.com/", max_pages=4, source_pattern="/blog/")
+    urls = [p.url for p in pages]
+    assert urls[0] == "https://example.com/"
+    assert sum("/blog/" in u for u in urls) == 3
@@ -0,0 +1,56 @@
+from fingerprint import NearDuplicateIndex, content_fingerprint, dedupe_targets, remember_fingerprint, similarity
+
+ARTICLE = " ".join(
+    f"Our guide number {i} explains how internal links spread authority across a site."
+    for i in range(40)
+)
+
+
+def test_near_identical_pages_have_close_fingerprints():
+    a = content_fingerprint(ARTICLE + " Page 1 of the archive.")
+    b = content_fingerprint(ARTICLE + " Page 2 of the archive.")
+    c = content_fingerprint("Completely different text about car leasing deals and monthly rates " * 20)
+    assert len(a) == 16
+    assert similarity(a, b) >= 0.95
+    assert similarity(a, c) < 0.8
+    assert content_fingerprint("") is None
+
+
+def test_index_groups_near_duplicates_under_first_page():
+    index = NearDuplicateIndex()
+    a = content_fingerprint(ARTICLE + " Tag: seo")
+    b = content_fingerprint(ARTICLE + " Tag: links")
+    c = content_fingerprint("Completely different text about car leasing deals and monthly rates " * 20)
+    assert index.add("/tag/seo", a) is None
+    assert index.add("/tag/links", b) == "/tag/seo"
+    assert index.add("/leasing", c) is None
+
+
+def test_dedupe_targets_drops_duplicate_pages_but_not_shared_titles():
+    remember_fingerprint("https://example.com/london", content_fingerprint(ARTICLE + " London"))
+    remember_fingerprint("https://example.com/leeds", content_fingerprint(ARTICLE + " Leeds"))
+    targets = [
+        {"url": "https://example.com/london", "title": "Our services in London"},
+        {"url": "https://example.com/leeds", "title": "Our services in Leeds"},
+        {"url": "https://example.com/seo", "title": "SEO Audits"},
+        {"url": "https://example.com/seo-2", "title": "SEO audits!"},
+        {"url": "http://example.com/seo/", "title": "SEO Audits"},
+    ]
+    assert [t["url"] for t in dedupe_targets(targets)] == [
+        "https://example.com/london",
+        "https://example.com/seo",
+        "https://example.com/seo-2",
+    ]
+
+
+def test_dedupe_targets_keeps_pages_without_a_fingerprint():
+    # Never analyzed here: near-identical content cannot be detected, only same-page URLs
+    targets = [
+        {"url": "https://cold.example.com/london", "title": "Our services in London"},
+        {"url": "https://cold.example.com/leeds", "title": "Our services in London"},
+        {"url": "https://cold.example.com/london/?utm_source=x", "title": "Our services in London"},
+    ]
+    assert [t["url"] for t in dedupe_targets(targets)] == [
+        "https://cold.example.com/london",
+        "https://cold.example.com/leeds",
+    ]
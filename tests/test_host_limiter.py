@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import host_limiter
+from host_limiter import HostLimit, host_slot, retry_after_seconds
+
+
+def test_additive_increase_multiplicative_decrease():
+    limit = HostLimit(initial=2, maximum=8)
+    for _ in range(20):
+        limit.on_success(0.1)
+    assert 5 < limit.limit <= 8
+
+    before = limit.limit
+    limit.on_overload()
+    limit.on_overload()  # same round trip: counted once
+    assert limit.limit == pytest.approx(before / 2)
+
+
+def test_rising_latency_counts_as_congestion():
+    limit = HostLimit(initial=4)
+    for _ in range(5):
+        limit.on_success(0.1)
+    before = limit.limit
+    for _ in range(10):
+        limit.on_success(1.0)
+    assert limit.limit < before
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds("30") == 30
+    assert retry_after_seconds("100000") == host_limiter.MAX_RETRY_AFTER
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) == 10
+    assert retry_after_seconds("soon") is None
+
+
+@pytest.mark.asyncio
+async def test_limit_caps_concurrency():
+    limit = HostLimit(initial=2)
+    running, peak = 0, 0
+
+    async def request():
+        nonlocal running, peak
+        await limit.acquire()
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        limit.release()
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert peak == 2 and limit.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_overload_response_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(host_limiter, "_limits", host_limiter.OrderedDict())
+    transport = httpx.MockTransport(lambda request: httpx.Response(429, headers={"retry-after": "1"}))
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            async with host_slot("https://busy.example/a"):
+                (await client.get("https://busy.example/a")).raise_for_status()
+
+    limit = host_limiter.host_limit("busy.example")
+    assert limit.limit == 1
+    started = time.monotonic()
+    async with host_slot("https://busy.example/b"):
+        pass
+    assert time.monotonic() - started >= 0.9
@@ -0,0 +1,34 @@
+import json
+import uuid
+
+import pytest
+
+from job_events import _dispatch, _subscribers, progress_stream, subscribe
+
+
+def counts(queued=0, running=0, done=0, failed=0):
+    return {"queued": queued, "running": running, "done": done, "failed": failed, "total": queued + running + done + failed}
+
+
+@pytest.mark.asyncio
+async def test_stream_relays_notifications_until_finished():
+    job_id = uuid.uuid4()
+    queue = subscribe(job_id)
+    _dispatch(json.dumps({"job_id": str(job_id), **counts(running=1, done=1), "tasks": [{"url": "a", "status": "done"}]}))
+    _dispatch(json.dumps({"job_id": str(uuid.uuid4()), **counts(done=5)}))  # another job
+    _dispatch(json.dumps({"job_id": str(job_id), **counts(done=1, failed=1), "tasks": [{"url": "b", "status": "failed"}]}))
+
+    chunks = [chunk async for chunk in progress_stream(job_id, queue, counts(running=2))]
+
+    events = [(chunk.split("\n")[0], json.loads(chunk.split("\n")[1][6:])) for chunk in chunks]
+    assert [name for name, _ in events] == ["event: progress", "event: progress", "event: done"]
+    assert events[1][1]["tasks"] == [{"url": "a", "status": "done"}]
+    assert events[2][1]["failed"] == 1
+    assert str(job_id) not in _subscribers
+
+
+@pytest.mark.asyncio
+async def test_finished_job_streams_done_immediately():
+    job_id = uuid.uuid4()
+    chunks = [chunk async for chunk in progress_stream(job_id, subscribe(job_id), counts(done=3))]
+    assert len(chunks) == 1 and chunks[0].startswith("event: done")
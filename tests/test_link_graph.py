@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+
+import link_graph
+from link_graph import LinkGraph, get_graph, record_outlinks
+
+SITE = {
+    "https://ex.com/": ["/blog", "/services"],
+    "https://ex.com/blog": ["/blog/a", "/blog/b", "/"],
+    "https://ex.com/services": ["/services/seo", "/"],
+    "https://ex.com/blog/a": ["/services/seo", "https://other.com/x"],
+    "https://ex.com/blog/b": ["/blog/a"],
+    "https://ex.com/services/seo": [],
+    "https://ex.com/landing": ["/services/seo"],
+}
+
+
+def _graph() -> LinkGraph:
+    graph = LinkGraph("ex.com")
+    for url, hrefs in SITE.items():
+        graph.set_outlinks(url, [f"https://www.ex.com{h}" if h.startswith("/") else h for h in hrefs])
+    return graph
+
+
+def test_degrees_orphans_and_click_depth():
+    graph = _graph()
+    seo = graph.find("https://ex.com/services/seo/")
+    assert graph.inlink_counts()[seo] == 3
+    assert graph.outlink_counts()[graph.find("https://ex.com/blog/a")] == 1  # external link dropped
+    assert graph.orphans() == ["https://ex.com/landing"]
+    depths = {url: graph.click_depths()[graph.find(url)] for url in SITE}
+    assert depths == {
+        "https://ex.com/": 0, "https://ex.com/blog": 1, "https://ex.com/services": 1,
+        "https://ex.com/blog/a": 2, "https://ex.com/blog/b": 2, "https://ex.com/services/seo": 2,
+        "https://ex.com/landing": -1,
+    }
+
+
+def test_pagerank_matches_dense_power_iteration():
+    graph = _graph()
+    adjacency = graph.adjacency().toarray()
+    n = len(adjacency)
+    out = adjacency.sum(axis=1)
+    transition = np.where(out[:, None] > 0, adjacency / np.maximum(out, 1)[:, None], 1.0 / n)
+    google = 0.85 * transition + 0.15 / n
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(200):
+        ranks = ranks @ google
+    np.testing.assert_allclose(graph.pagerank(), ranks, atol=1e-5)
+    assert graph.top_pages(1)[0]["url"] == "https://ex.com/services/seo"
+
+
+def test_rescan_replaces_outlinks():
+    graph = _graph()
+    graph.set_outlinks("https://ex.com/landing", [])
+    graph.set_outlinks("https://ex.com/", ["https://ex.com/landing"])
+    assert graph.orphans() == ["https://ex.com/blog", "https://ex.com/services"]
+    assert graph.click_depths()[graph.find("https://ex.com/landing")] == 1
+    assert graph.click_depths()[graph.find("https://ex.com/blog")] == -1
+
+
+def test_incremental_updates_match_a_fresh_build():
+    rng = np.random.default_rng(5)
+    urls = ["https://ex.com/"] + [f"https://ex.com/p{i}" for i in range(300)]
+    pages = {url: [urls[j] for j in rng.integers(0, len(urls), 8)] for url in urls[:200]}
+    graph = LinkGraph("ex.com")
+    for url, hrefs in pages.items():
+        graph.set_outlinks(url, hrefs)
+    graph.pagerank()
+    full_iterations = graph.pagerank_iterations
+
+    # Re-scan a few pages (one of them new) and compare against a graph built from scratch
+    for url in [urls[3], urls[50], urls[250]]:
+        pages[url] = [urls[j] for j in rng.integers(0, len(urls), 8)]
+        graph.set_outlinks(url, pages[url])
+    fresh = LinkGraph("ex.com")
+    for url, hrefs in pages.items():
+        fresh.set_outlinks(url, hrefs)
+    order = [fresh.find(url) for url in graph.urls]
+
+    adjacency = graph.adjacency()
+    expected = fresh.adjacency()[order][:, order]
+    assert (adjacency != expected).nnz == 0
+    np.testing.assert_array_equal(graph.inlink_counts(), np.bincount(adjacency.indices, minlength=len(graph)))
+    np.testing.assert_array_equal(graph.outlink_counts(), np.diff(adjacency.indptr))
+    np.testing.assert_allclose(graph.pagerank(), fresh.pagerank()[order], atol=1e-5)
+    assert graph.pagerank_iterations < full_iterations
+
+
+@pytest.mark.asyncio
+async def test_recorded_pages_are_grouped_by_domain(monkeypatch):
+    monkeypatch.setattr(link_graph, "_graphs", type(link_graph._graphs)())
+    monkeypatch.setattr(link_graph, "_dirty", {})
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    record_outlinks("user:a", "https://www.shop.com/", ["https://shop.com/a"])
+    record_outlinks("user:a", "https://blog.com/", ["https://blog.com/x"])
+    graph = await get_graph("user:a", "shop.com")
+    assert graph.outlinks("https://shop.com") == ["https://shop.com/a"]
+    assert link_graph._dirty == {}  # nothing to persist without a database
+
+
+@pytest.mark.asyncio
+async def test_each_user_has_their_own_graph(monkeypatch):
+    monkeypatch.setattr(link_graph, "_graphs", type(link_graph._graphs)())
+    monkeypatch.setattr(link_graph, "_dirty", {})
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    record_outlinks("user:a", "https://shop.com/", ["https://shop.com/a"])
+    assert len(await get_graph("user:a", "shop.com")) == 2
+    assert len(await get_graph("user:b", "shop.com")) == 0
+
+
+def test_links_are_tagged_by_origin():
+    graph = LinkGraph("ex.com")
+    graph.set_outlinks("https://ex.com/", ["https://ex.com/about", "https://ex.com/blog/a"], ["https://ex.com/blog/a"])
+    graph.set_outlinks("https://ex.com/blog/a", ["https://ex.com/about"], ["https://ex.com/blog/b"])
+    assert graph.tagged_outlinks("https://ex.com/") == [
+        {"url": "https://ex.com/about", "origin": "template"},
+        {"url": "https://ex.com/blog/a", "origin": "content"},
+    ]
+    about = graph.page_metrics(graph.find("https://ex.com/about"))
+    assert about["inlinks"] == 2 and about["content_inlinks"] == 0
+    post = graph.page_metrics(graph.find("https://ex.com/blog/a"))
+    assert post["content_inlinks"] == 1 and post["outlinks"] == 2 and post["content_outlinks"] == 1
+
+    # Moving a link out of the content updates the content counts only
+    assert graph.set_outlinks("https://ex.com/", ["https://ex.com/about", "https://ex.com/blog/a"])
+    assert graph.page_metrics(graph.find("https://ex.com/blog/a"))["content_inlinks"] == 0
+    assert graph.inlink_counts()[graph.find("https://ex.com/blog/a")] == 1
+
+
+def test_graphs_are_evicted_lru_without_persistence(monkeypatch):
+    monkeypatch.setattr(link_graph, "_graphs", type(link_graph._graphs)())
+    monkeypatch.setattr(link_graph, "_dirty", {})
+    monkeypatch.setattr(link_graph, "MAX_GRAPHS", 2)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    for site in ("a.com", "b.com", "c.com", "d.com"):
+        record_outlinks("user:a", f"https://{site}/", [f"https://{site}/x"])
+    assert list(link_graph._graphs) == [("user:a", "c.com"), ("user:a", "d.com")]
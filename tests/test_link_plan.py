@@ -0,0 +1,54 @@
+import numpy as np
+
+from link_plan import build_link_plan, link_headroom, plan_links
+
+
+def test_link_headroom_uses_top_of_density_band():
+    assert link_headroom(1000, 2) == 5
+    assert link_headroom(1000, 9) == 0
+    assert link_headroom(100, 0) == 0
+
+
+def test_plan_links_respects_capacities_and_prefers_best_edges():
+    rng = np.random.default_rng(3)
+    sources = rng.integers(0, 40, 2000)
+    targets = rng.integers(0, 30, 2000)
+    scores = rng.random(2000)
+    source_capacity = rng.integers(0, 6, 40)
+    target_capacity = rng.integers(1, 4, 30)
+
+    chosen = plan_links(sources, targets, scores, source_capacity, target_capacity)
+
+    assert np.all(np.bincount(sources[chosen], minlength=40) <= source_capacity)
+    assert np.all(np.bincount(targets[chosen], minlength=30) <= target_capacity)
+    assert np.all(np.diff(scores[chosen]) <= 0)
+    # Maximal: every rejected edge is blocked by a full source or target
+    used_sources = np.bincount(sources[chosen], minlength=40)
+    used_targets = np.bincount(targets[chosen], minlength=30)
+    rejected = np.setdiff1d(np.arange(2000), chosen)
+    assert np.all(
+        (used_sources[sources[rejected]] >= source_capacity[sources[rejected]])
+        | (used_targets[targets[rejected]] >= target_capacity[targets[rejected]])
+    )
+
+
+def test_build_link_plan_skips_existing_self_and_duplicate_links():
+    pages = [
+        {"url": "https://ex.com/a", "word_count": 300, "internal_link_count": 0, "existing_links": ["https://ex.com/x"]},
+        {"url": "https://ex.com/b/", "word_count": 300, "internal_link_count": 2},
+    ]
+    opportunities = [
+        {"source_url": "https://ex.com/a", "target_url": "https://ex.com/x", "similarity": 0.99},
+        {"source_url": "https://ex.com/a", "target_url": "https://ex.com/a", "similarity": 0.98},
+        {"source_url": "https://ex.com/a", "target_url": "https://ex.com/y", "similarity": 0.8},
+        {"source_url": "https://ex.com/a", "target_url": "https://ex.com/y", "similarity": 0.9},
+        {"source_url": "https://ex.com/b", "target_url": "https://ex.com/y", "similarity": 0.85},
+        {"source_url": "https://ex.com/b", "target_url": "https://ex.com/z", "similarity": 0.7},
+    ]
+
+    plan = build_link_plan(pages, opportunities, max_inlinks_per_target=1)
+
+    # a has room for 2 links, b (2 existing links) for none; /y accepts one inlink
+    assert [(p["source_url"], p["target_url"], p["similarity"]) for p in plan] == [
+        ("https://ex.com/a", "https://ex.com/y", 0.9),
+    ]
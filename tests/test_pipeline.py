@@ -0,0 +1,94 @@
+import collections
+
+import httpx
+import numpy as np
+import pytest
+
+import http_client
+import pipeline
+import scraper
+from models import PageInfo
+
+VOCAB = ["audi", "lease", "bmw", "hire", "garden"]
+
+
+def _embed(texts: list[str]) -> np.ndarray:
+    """Bag-of-words embedding over a tiny vocabulary, L2-normalised."""
+    rows = np.array([[text.lower().count(word) for word in VOCAB] for text in texts], dtype=np.float32)
+    return rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-9)
+
+
+def _html(title: str, body: str) -> str:
+    paragraph = " ".join([body] * 20)
+    return f"<html><head><title>{title}</title></head><body><article><h1>{title}</h1><p>{paragraph}</p></article></body></html>"
+
+
+PAGES = {
+    "https://example.com/blog/audi": _html("Audi news", "Our audi lease offers are popular with drivers this year."),
+    "https://example.com/blog/garden": _html("Garden tips", "Planting a garden in spring takes patience and good soil."),
+    "https://example.com/services/audi-lease": _html("Audi Lease", "Audi lease deals for every driver, audi lease made simple."),
+    "https://example.com/services/bmw-hire": _html("BMW Hire", "Flexible bmw hire on short and long contracts for drivers."),
+}
+
+
+@pytest.fixture
+def site(monkeypatch):
+    downloads = collections.Counter()
+
+    async def download(url: str) -> str:
+        downloads[url] += 1
+        return PAGES[url]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        downloads[url] += 1
+        if url in PAGES:
+            return httpx.Response(200, text=PAGES[url], headers={"content-type": "text/html"})
+        return httpx.Response(404)
+
+    async def sitemap(domain, source_pattern, target_pattern, max_crawl_pages=50, slot=None):
+        pages = [PageInfo(url=url) for url in PAGES]
+        return {
+            "source_pages": [p for p in pages if source_pattern in p.url],
+            "target_pages": [p for p in pages if target_pattern in p.url],
+            "total_found": len(pages),
+            "sitemap_url": f"{domain}/sitemap.xml",
+            "discovery_method": "sitemap",
+        }
+
+    monkeypatch.setattr(scraper, "_download_html", download)
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(pipeline, "fetch_sitemap", sitemap)
+    monkeypatch.setattr(pipeline, "PIPELINE_HOST_DELAY", 0.0)
+    return downloads
+
+
+async def _run(**kwargs) -> list:
+    return [event async for event in pipeline.analyze_site("https://example.com", embed=_embed, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_analyze_site_streams_matches_per_page(site):
+    events = await _run(source_pattern="/blog/", target_pattern="/services/", threshold=0.5)
+
+    assert [e.event for e in events] == ["discovered", "targets", "page", "page", "done"]
+    assert [t.title for t in events[1].targets] == ["Audi Lease", "BMW Hire"]
+    pages = {e.result.url: e for e in events[2:4]}
+    assert [m.target_url for m in pages["https://example.com/blog/audi"].matches] == [
+        "https://example.com/services/audi-lease"
+    ]
+    assert pages["https://example.com/blog/garden"].matches == []
+    assert events[-1].summary.total_scanned == 2
+
+
+@pytest.mark.asyncio
+async def test_analyze_site_fetches_each_page_once(site):
+    # Every page is both a source and a target
+    events = await _run(source_pattern="example.com", target_pattern="example.com", threshold=0.5)
+
+    assert sum(e.event == "page" for e in events) == len(PAGES)
+    assert {url: site[url] for url in PAGES} == {url: 1 for url in PAGES}
+    # Pages are never suggested as links to themselves
+    for event in events:
+        if event.event == "page":
+            assert all(m.target_url != event.result.url for m in event.matches)
@@ -0,0 +1,77 @@
+import httpx
+import pytest
+
+import resilience
+from resilience import HALF_OPEN, OPEN, CircuitBreaker, HostUnavailable, RetryBudget, guarded
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", resilience.OrderedDict())
+    monkeypatch.setattr(resilience, "retry_budget", RetryBudget())
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+
+
+def failing(status: int, calls: list):
+    async def operation():
+        calls.append(status)
+        request = httpx.Request("GET", "https://down.example/")
+        raise httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+    return operation
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_then_succeed():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise httpx.ConnectTimeout("slow")
+        return "ok"
+
+    assert await guarded("https://flaky.example/a", flaky) == "ok"
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    calls = []
+    with pytest.raises(httpx.HTTPStatusError):
+        await guarded("https://site.example/missing", failing(404, calls))
+    assert calls == [404]
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_fails_fast(monkeypatch):
+    calls = []
+    monkeypatch.setattr(resilience, "MAX_RETRIES", 0)
+    for _ in range(resilience.BREAKER_FAILURE_THRESHOLD):
+        with pytest.raises(httpx.HTTPStatusError):
+            await guarded("https://down.example/page", failing(503, calls))
+
+    with pytest.raises(HostUnavailable):
+        await guarded("https://down.example/other", failing(503, calls))
+    assert len(calls) == resilience.BREAKER_FAILURE_THRESHOLD
+    assert resilience.host_breaker("down.example").state == OPEN
+
+
+def test_half_open_allows_one_probe():
+    breaker = CircuitBreaker(threshold=1, open_seconds=0)
+    breaker.record(True)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # probe in flight
+    breaker.record(True)
+    assert breaker.state == OPEN
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.allow() and breaker.failures == 0
+
+
+def test_retry_budget_is_bounded():
+    budget = RetryBudget(ratio=0.5, maximum=2)
+    budget.tokens = 0
+    assert not budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.withdraw() and budget.withdraw() and not budget.withdraw()
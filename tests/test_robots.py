@@ -0,0 +1,89 @@
+import httpx
+import pytest
+
+import robots
+from robots import RobotsRules, get_robots, parse_robots_txt
+
+ROBOTS_TXT = """
+# Example
+User-agent: Googlebot
+Disallow: /
+
+User-agent: *
+Disallow: /admin/
+Disallow: /*.pdf$
+Allow: /admin/public/
+Crawl-delay: 2.5
+
+User-agent: InternalLinkFinder
+User-agent: OtherBot
+Disallow: /private
+Crawl-delay: 0.5
+
+Sitemap: https://example.com/sitemap.xml
+"""
+
+
+def test_specific_agent_group_wins_over_wildcard():
+    rules = parse_robots_txt(ROBOTS_TXT)
+    assert rules.crawl_delay == 0.5
+    assert not rules.can_fetch("https://example.com/private/page")
+    assert rules.can_fetch("https://example.com/admin/")
+    assert rules.sitemaps == ["https://example.com/sitemap.xml"]
+
+
+def test_wildcard_group_longest_match_and_anchors():
+    rules = parse_robots_txt(ROBOTS_TXT, user_agent="SomeOtherCrawler")
+    assert rules.crawl_delay == 2.5
+    assert not rules.can_fetch("https://example.com/admin/settings")
+    assert rules.can_fetch("https://example.com/admin/public/page")
+    assert not rules.can_fetch("https://example.com/files/report.pdf")
+    assert rules.can_fetch("https://example.com/files/report.pdf?download=1")
+    assert rules.can_fetch("https://example.com/blog/")
+
+
+def test_empty_rules_allow_everything():
+    assert RobotsRules().can_fetch("https://example.com/anything")
+    assert parse_robots_txt("User-agent: *\nDisallow:\n").can_fetch("https://example.com/x")
+
+
+def test_groups_match_the_product_token_only():
+    text = "User-agent: seo\nDisallow: /\n\nUser-agent: a\nDisallow: /\n\nUser-agent: *\nDisallow: /tmp\n"
+    rules = parse_robots_txt(text)
+    assert rules.can_fetch("https://example.com/page")
+    assert not rules.can_fetch("https://example.com/tmp/x")
+    assert not parse_robots_txt("User-agent: InternalLinkFinder/1.0\nDisallow: /\n").can_fetch("https://example.com/")
+
+
+@pytest.mark.asyncio
+async def test_server_errors_disallow_everything(monkeypatch):
+    monkeypatch.setattr(
+        robots, "get_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503))),
+    )
+    rules = await get_robots("https://down.example.com/page")
+    assert not rules.can_fetch("https://down.example.com/page")
+
+
+class _EndlessRobots(httpx.AsyncByteStream):
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def __aiter__(self):
+        yield b"User-agent: *\nDisallow: /private\n"
+        while self.bytes_sent < 10 * robots.ROBOTS_MAX_BYTES:
+            self.bytes_sent += 4096
+            yield b"#" * 4095 + b"\n"
+
+
+@pytest.mark.asyncio
+async def test_oversized_robots_txt_is_not_downloaded_past_the_limit(monkeypatch):
+    body = _EndlessRobots()
+    monkeypatch.setattr(
+        robots, "get_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, stream=body))),
+    )
+    rules = await get_robots("https://huge.example.com/page")
+    assert not rules.can_fetch("https://huge.example.com/private/x")
+    assert rules.can_fetch("https://huge.example.com/page")
+    assert body.bytes_sent < 2 * robots.ROBOTS_MAX_BYTES
@@ -0,0 +1,78 @@
+import httpx
+import pytest
+
+import http_client
+import scan_state
+from scan_state import ScanEntry, check_page, load_previous_scan, page_content_hash, save_scan
+
+URL = "https://example.com/blog/post"
+RESULT = {"url": URL, "title": "Post", "word_count": 500, "status": "good"}
+
+
+def test_content_hash_ignores_scripts_and_comments():
+    page = "<html><body><p>Hello</p><a href='/x'>x</a></body></html>"
+    noisy = "<html><head><script>var nonce='123'</script></head><body><!-- built 10:02 --><p>Hello</p><a href='/x'>x</a></body></html>"
+    assert page_content_hash(page) == page_content_hash(noisy)
+    assert page_content_hash(page) != page_content_hash(page.replace("/x", "/y"))
+
+
+@pytest.fixture
+def server(monkeypatch):
+    state = {"html": "<p>Hello</p>", "etag": '"v1"', "requests": []}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == state["etag"]:
+            return httpx.Response(304)
+        return httpx.Response(200, text=state["html"], headers={"etag": state["etag"]})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return state
+
+
+@pytest.mark.asyncio
+async def test_check_page_detects_unchanged_pages(server):
+    entry, carried = await check_page(URL, "2024-01-01", None)
+    assert carried is None and entry.etag == '"v1"' and server["requests"] == [None]
+    entry.result = RESULT
+
+    # Same sitemap lastmod: carried forward without a request
+    same, carried = await check_page(URL, "2024-01-01", entry)
+    assert carried.unchanged and carried.title == "Post" and len(server["requests"]) == 1
+
+    # New lastmod but the server says 304
+    revalidated, carried = await check_page(URL, "2024-02-01", entry)
+    assert carried.unchanged and server["requests"][-1] == '"v1"'
+
+    # New ETag, same text: the content hash matches
+    server.update(html="<script>x()</script><p>Hello</p>", etag='"v2"')
+    rehashed, carried = await check_page(URL, None, revalidated)
+    assert carried.unchanged and rehashed.etag == '"v2"'
+
+    # Real change, or different scan settings: analyze again
+    server.update(html="<p>Hello again</p>", etag='"v3"')
+    _, carried = await check_page(URL, None, rehashed)
+    assert carried is None
+    _, carried = await check_page(URL, "2024-01-01", entry, config_hash="other")
+    assert carried is None
+
+
+@pytest.mark.asyncio
+async def test_scan_state_round_trips_in_memory(monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    await save_scan("user:a", "https://www.example.com", [ScanEntry(url=URL, etag='"v1"', result=RESULT), ScanEntry(url=URL + "/2")])
+    previous = await load_previous_scan("user:a", "example.com")
+    assert list(previous) == ["example.com/blog/post"]
+    assert previous["example.com/blog/post"].etag == '"v1"'
+    assert await load_previous_scan("user:b", "example.com") == {}
+
+
+@pytest.mark.asyncio
+async def test_database_errors_do_not_fail_the_scan(monkeypatch):
+    def unavailable():
+        raise OSError("database is down")
+
+    monkeypatch.setenv("DATABASE_URL", "postgresql://scans@db.invalid/scans")
+    monkeypatch.setattr(scan_state, "async_session_factory", unavailable)
+    assert await load_previous_scan("user:a", "example.com") == {}
+    await save_scan("user:a", "example.com", [ScanEntry(url=URL, result=RESULT)])
@@ -0,0 +1,181 @@
+import contextlib
+
+import httpx
+import pytest
+
+import http_client
+import scraper
+from scraper import (
+    KeywordScorer,
+    analyze_page,
+    calculate_keyword_relevance,
+    extract_target_keywords,
+    fetch_target_infos,
+    get_target_info,
+)
+
+PAGE = (
+    b"<html><head><title>Audi Lease Deals | Cars</title></head>"
+    b"<body><h1>Audi A3 leasing offers</h1>" + b"<p>filler text</p>" * 50_000 + b"</body></html>"
+)
+
+
+class _ChunkedBody(httpx.AsyncByteStream):
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def __aiter__(self):
+        for i in range(0, len(PAGE), 4096):
+            self.bytes_sent += 4096
+            yield PAGE[i:i + 4096]
+
+
+@pytest.fixture
+def streamed_page(monkeypatch):
+    body = _ChunkedBody()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=body, headers={"content-type": "text/html"})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return body
+
+
+def test_extract_target_keywords_orders_title_first_and_drops_stop_words():
+    keywords = extract_target_keywords("Audi Lease Deals", ["About your Audi leasing options"])
+    assert keywords == ["audi", "lease", "deals", "leasing", "options"]
+
+
+def test_keyword_scorer_scores_several_targets_from_one_index():
+    content = "Leasing an Audi? Our Audi lease deals beat most leases. Carpets not included."
+    scorer = KeywordScorer(content)
+    assert scorer.count_matches(["audi lease"], "stemmed") == 4  # audi x2, lease, leases
+    assert scorer.count_matches(["car"], "exact") == 1
+    assert [scorer.relevance(kws, "stemmed") for kws in (["audi"], ["bmw"], ["lease", "deals"])] == [1, 0, 2]
+    assert calculate_keyword_relevance(content, ["audi", "lease"]) == scorer.relevance(["audi", "lease"])
+
+
+@pytest.mark.asyncio
+async def test_headings_mode_stops_reading_after_first_heading(streamed_page):
+    infos = await fetch_target_infos(["https://example.com/audi", "https://example.com/audi-2"], mode="headings")
+    assert [i.title for i in infos] == ["Audi Lease Deals | Cars"] * 2
+    assert infos[0].keywords == ["audi", "lease", "deals", "cars", "leasing", "offers"]
+    assert streamed_page.bytes_sent < len(PAGE) // 10
+
+
+@pytest.mark.asyncio
+async def test_target_info_is_cached_per_url(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url)
+        return httpx.Response(200, content=PAGE[:200], headers={"content-type": "text/html"})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    first = await get_target_info("https://example.com/cached/", mode="headings")
+    second = await get_target_info("https://EXAMPLE.com/cached?utm_source=x", mode="headings")
+    assert len(requests) == 1
+    assert second.title == first.title == "Audi Lease Deals | Cars"
+    assert second.url == "https://EXAMPLE.com/cached?utm_source=x"
+
+
+SHELL_PAGE = '<html><head><title>App</title></head><body><div id="root"></div></body></html>'
+RENDERED_PAGE = (
+    "<html><head><title>App</title></head><body><article><h1>Leasing guide</h1>"
+    + "".join(f"<p>Step {i}: what to know about leasing car number {i} this year.</p>" for i in range(20))
+    + '<p>See our <a href="/services/leasing">leasing service</a>.</p></article></body></html>'
+)
+
+
+class _FakeBrowserPool:
+    def __init__(self, html):
+        self.html = html
+        self.rendered = []
+
+    async def render(self, url, key="default"):
+        self.rendered.append((url, key))
+        return self.html
+
+
+@pytest.fixture
+def browser(monkeypatch):
+    pool = _FakeBrowserPool(RENDERED_PAGE)
+    monkeypatch.setattr(scraper, "get_browser_pool", lambda: pool)
+    monkeypatch.setattr(scraper, "_rendered_html_cache", scraper.TTLCache(ttl=60))
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_render_mode_renders_near_empty_pages_once(monkeypatch, browser):
+    async def fetch_html(url, keep=False):
+        return SHELL_PAGE
+
+    monkeypatch.setattr(scraper, "fetch_html", fetch_html)
+
+    plain = await analyze_page("https://spa.example.com/guide", "/services/")
+    assert plain.word_count == 0 and not plain.rendered
+    assert browser.rendered == []
+
+    result = await analyze_page("https://spa.example.com/guide", "/services/", render=True)
+    assert result.rendered
+    assert result.word_count > 100
+    assert result.internal_links.to_target_pages == 1
+    assert browser.rendered == [("https://spa.example.com/guide", "spa.example.com")]
+
+    await analyze_page("https://spa.example.com/guide", "/blog/", render=True)
+    assert len(browser.rendered) == 1  # rendered DOM reused
+
+
+@pytest.mark.asyncio
+async def test_render_mode_keeps_server_rendered_pages_on_http(monkeypatch, browser):
+    async def fetch_html(url, keep=False):
+        return RENDERED_PAGE
+
+    monkeypatch.setattr(scraper, "fetch_html", fetch_html)
+    result = await analyze_page("https://ssr.example.com/guide", "/services/", render=True)
+    assert not result.rendered and result.word_count > 100
+    assert browser.rendered == []
+
+
+@pytest.mark.asyncio
+async def test_batch_fetches_hold_one_slot_per_page(monkeypatch):
+    held = []
+
+    @contextlib.asynccontextmanager
+    async def slot():
+        held.append(1)
+        yield
+
+    async def get_target_info(url, mode="full"):
+        return scraper.TargetPageInfo(url=url, title=url, keywords=[])
+
+    monkeypatch.setattr(scraper, "get_target_info", get_target_info)
+    urls = [f"https://example.com/{i}" for i in range(5)]
+    infos = await fetch_target_infos(urls, slot=slot)
+    assert [i.url for i in infos] == urls
+    assert len(held) == 5
+
+
+@pytest.mark.asyncio
+async def test_signed_in_scans_record_all_site_links(monkeypatch):
+    page = RENDERED_PAGE.replace(
+        "<body>", '<body><nav><a href="/">Home</a><a href="https://other.com/">Partner</a></nav>'
+    )
+
+    async def fetch_html(url, keep=False):
+        return page
+
+    recorded = []
+    monkeypatch.setattr(scraper, "fetch_html", fetch_html)
+    monkeypatch.setattr(scraper, "record_outlinks", lambda *args: recorded.append(args))
+
+    result = await analyze_page("https://site.example.com/guide", "/services/")
+    assert recorded == [] and "site_links" not in result.model_dump()
+
+    await analyze_page("https://site.example.com/guide", "/services/", owner="user:a")
+    assert recorded == [(
+        "user:a",
+        "https://site.example.com/guide",
+        ["https://site.example.com/", "https://site.example.com/services/leasing"],
+        ["https://site.example.com/services/leasing"],
+    )]
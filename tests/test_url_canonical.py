@@ -0,0 +1,48 @@
+from url_canonical import CanonicalRegistry, canonicalize_url, dedupe_key, dedupe_urls, registry, strip_tracking
+
+
+def test_canonicalize_url_normalizes_variants():
+    assert canonicalize_url("HTTPS://Example.COM:443/Blog/?utm_source=x&b=2&a=1#top") == (
+        "https://example.com/Blog?a=1&b=2"
+    )
+    assert canonicalize_url("http://example.com") == "http://example.com/"
+
+
+def test_dedupe_key_ignores_scheme_and_trailing_slash():
+    assert dedupe_key("http://example.com/blog/") == dedupe_key("https://EXAMPLE.com/blog?fbclid=1")
+
+
+def test_dedupe_urls_keeps_first_variant_without_tracking():
+    urls = [
+        "https://example.com/blog/post?utm_medium=email",
+        "https://example.com/blog/post/",
+        "http://example.com/blog/post",
+        "https://example.com/other",
+    ]
+    assert dedupe_urls(urls) == ["https://example.com/blog/post", "https://example.com/other"]
+
+
+def test_registry_follows_redirects_and_canonicals():
+    reg = CanonicalRegistry()
+    reg.record_redirect("http://example.com/old", "https://example.com/new/")
+    assert reg.resolve("http://example.com/old/") == "https://example.com/new/"
+
+    reg.record_canonical("https://example.com/new/?page=1", "/new/")
+    reg.record_canonical("https://example.com/x", "https://other.com/x")
+    assert reg.resolve("https://example.com/new/?page=1", follow_canonical=True) == "https://example.com/new/"
+    assert reg.resolve("https://example.com/new/?page=1") == "https://example.com/new/?page=1"
+    assert reg.resolve("https://example.com/x", follow_canonical=True) == "https://example.com/x"
+
+
+def test_dedupe_urls_collapses_known_redirects():
+    registry.record_redirect("https://example.com/moved", "https://example.com/target")
+    assert dedupe_urls(["https://example.com/moved", "https://example.com/target"]) == [
+        "https://example.com/target"
+    ]
+
+
+def test_strip_tracking_keeps_other_parameters_verbatim():
+    assert strip_tracking("https://example.com/a?id&utm_source=x&q=a%20b&UTM_Medium=y#top") == (
+        "https://example.com/a?id&q=a%20b"
+    )
+    assert strip_tracking("https://example.com/a?fbclid=1") == "https://example.com/a"
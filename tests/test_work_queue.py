@@ -0,0 +1,154 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import work_queue
+from host_limiter import HostThrottle
+from models import PageResult
+from work_queue import TASK_MAX_ATTEMPTS, ClaimedTask, TaskOutcome, claim_tasks, complete_tasks, process_task
+
+
+def task(attempts: int) -> ClaimedTask:
+    return ClaimedTask(id=1, job_id=uuid.uuid4(), url="https://example.com/a", params={"target_pattern": "/x/"}, attempts=attempts)
+
+
+class FakeResult:
+    def __init__(self, rows=(), rowcount=0):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Records the SQL it is given (compiled for Postgres) and returns canned results."""
+
+    def __init__(self, *results: FakeResult):
+        self.results = list(results)
+        self.statements = []
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.statements.append(statement.compile(dialect=postgresql.dialect()))
+        return self.results.pop(0)
+
+    async def commit(self):
+        self.committed = True
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+
+    async def publish(db, finished):
+        events.append(finished)
+
+    monkeypatch.setattr(work_queue, "publish_progress", publish)
+    return events
+
+
+def use_session(monkeypatch, session: FakeSession) -> None:
+    monkeypatch.setattr(work_queue, "async_session_factory", lambda: session)
+
+
+@pytest.mark.asyncio
+async def test_process_task_returns_result(monkeypatch):
+    async def analyze(url, target_pattern, owner=None):
+        return PageResult(url=url, word_count=10, status=target_pattern)
+
+    monkeypatch.setattr(work_queue, "analyze_page_summary", analyze)
+    outcome = await process_task(task(1), HostThrottle(0))
+    assert outcome.error is None and outcome.result["status"] == "/x/"
+
+
+@pytest.mark.asyncio
+async def test_process_task_retries_until_max_attempts(monkeypatch):
+    async def analyze(url, target_pattern, owner=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(work_queue, "analyze_page_summary", analyze)
+    first = await process_task(task(1), HostThrottle(0))
+    last = await process_task(task(TASK_MAX_ATTEMPTS), HostThrottle(0))
+    assert first.retry and first.error == "boom"
+    assert not last.retry and last.error == "boom"
+
+
+@pytest.mark.asyncio
+async def test_claim_tasks_skips_locked_rows_and_reclaims_expired_leases(monkeypatch, published):
+    job_id = uuid.uuid4()
+    claimed = [
+        SimpleNamespace(id=7, job_id=job_id, url="https://example.com/b", params=None, attempts=2, user_id=None, plan=None),
+        SimpleNamespace(id=3, job_id=job_id, url="https://example.com/a", params={"target_pattern": "/x/"}, attempts=1, user_id=None, plan="pro"),
+    ]
+    session = FakeSession(FakeResult(), FakeResult(claimed))
+    use_session(monkeypatch, session)
+
+    tasks = await claim_tasks(5, worker_id="node-a:1", lease_seconds=60)
+
+    claim = session.statements[1]
+    sql = str(claim)
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "scan_tasks.status = %(status_1)s::VARCHAR OR scan_tasks.status = %(status_2)s::VARCHAR AND scan_tasks.lease_expires_at < now()" in sql
+    assert "attempts=(scan_tasks.attempts + %(attempts_1)s::INTEGER)" in sql
+    assert claim.params["status_1"] == "queued" and claim.params["status_2"] == "running"
+    assert claim.params["worker_id"] == "node-a:1" and claim.params["param_1"] == 5
+    assert [t.id for t in tasks] == [3, 7]
+    assert tasks[0].plan == "pro" and tasks[1].plan == "free" and tasks[1].params == {}
+    assert session.committed and published == [{}]
+
+
+@pytest.mark.asyncio
+async def test_claim_tasks_fails_tasks_past_max_attempts(monkeypatch, published):
+    job_id = uuid.uuid4()
+    abandoned = [SimpleNamespace(job_id=job_id, url="https://example.com/a")]
+    session = FakeSession(FakeResult(abandoned), FakeResult())
+    use_session(monkeypatch, session)
+
+    assert await claim_tasks(5) == []
+
+    expire = session.statements[0]
+    assert "scan_tasks.attempts >= %(attempts_1)s::INTEGER" in str(expire)
+    assert expire.params["attempts_1"] == TASK_MAX_ATTEMPTS and expire.params["status"] == "failed"
+    assert published == [{job_id: [{"url": "https://example.com/a", "status": "failed"}]}]
+
+
+@pytest.mark.asyncio
+async def test_complete_tasks_only_writes_tasks_this_worker_holds(monkeypatch, published):
+    job_id = uuid.uuid4()
+    outcomes = [
+        TaskOutcome(id=1, job_id=job_id, url="https://example.com/a", result={"url": "https://example.com/a"}),
+        TaskOutcome(id=2, job_id=job_id, url="https://example.com/b", error="boom"),
+    ]
+    # Task 2's lease expired and another worker claimed it
+    session = FakeSession(FakeResult(rowcount=1), FakeResult(rowcount=0))
+    use_session(monkeypatch, session)
+
+    assert await complete_tasks(outcomes, worker_id="node-a:1") == 1
+
+    for statement in session.statements:
+        assert "scan_tasks.worker_id = %(worker_id_1)s::VARCHAR AND scan_tasks.status = %(status_1)s::VARCHAR" in str(statement)
+        assert statement.params["worker_id_1"] == "node-a:1" and statement.params["status_1"] == "running"
+    assert published == [{job_id: [{"url": "https://example.com/a", "status": "done"}]}]
+
+
+@pytest.mark.asyncio
+async def test_complete_tasks_requeues_retries_without_a_worker(monkeypatch, published):
+    outcome = TaskOutcome(id=1, job_id=uuid.uuid4(), url="https://example.com/a", error="boom", retry=True)
+    session = FakeSession(FakeResult(rowcount=1))
+    use_session(monkeypatch, session)
+
+    assert await complete_tasks([outcome]) == 1
+
+    requeue = session.statements[0]
+    assert requeue.params["status"] == "queued"
+    assert requeue.params["worker_id"] is None and requeue.params["lease_expires_at"] is None
+    assert published == [{}]
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from work_scheduler import BATCH, INTERACTIVE, FairScheduler, Tenant
+
+FREE = Tenant("user:free", "free")
+PRO = Tenant("user:pro", "pro")
+
+
+async def run_jobs(scheduler, jobs, order):
+    """Start jobs (tenant, kind, name) while the scheduler is busy, then release it."""
+    gate = asyncio.Event()
+    blocker_tenant = Tenant("user:blocker", "pro")
+
+    async def blocker():
+        async with scheduler.slot(blocker_tenant, INTERACTIVE):
+            await gate.wait()
+
+    async def job(tenant, kind, name):
+        async with scheduler.slot(tenant, kind):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    blocking = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(job(*spec)) for spec in jobs]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(blocking, *tasks)
+
+
+@pytest.mark.asyncio
+async def test_interactive_work_goes_first():
+    order = []
+    jobs = [(PRO, BATCH, f"batch{i}") for i in range(3)] + [(FREE, INTERACTIVE, "page")]
+    await run_jobs(FairScheduler(slots=1, reserved_interactive=0), jobs, order)
+    assert order[0] == "page"
+
+
+@pytest.mark.asyncio
+async def test_weighted_share_across_tenants():
+    order = []
+    jobs = [(PRO, BATCH, "pro") for _ in range(10)] + [(FREE, BATCH, "free") for _ in range(10)]
+    await run_jobs(FairScheduler(slots=1, reserved_interactive=0), jobs, order)
+    # While both are backlogged, Pro gets four slots for each Free slot
+    assert order[:10].count("pro") == 8
+    assert sorted(order) == sorted(name for _, _, name in jobs)
+
+
+@pytest.mark.asyncio
+async def test_per_tenant_cap_and_reserved_slots():
+    scheduler = FairScheduler(slots=4, reserved_interactive=1)
+    gate = asyncio.Event()
+
+    async def hold(tenant, kind):
+        async with scheduler.slot(tenant, kind):
+            await gate.wait()
+
+    tasks = [asyncio.create_task(hold(FREE, BATCH)) for _ in range(3)]
+    tasks += [asyncio.create_task(hold(PRO, BATCH)) for _ in range(3)]
+    await asyncio.sleep(0)
+    # Free is capped at 2; batch work leaves one slot for interactive work
+    assert scheduler.active == 3 and scheduler.waiting(BATCH) == 3
+
+    tasks.append(asyncio.create_task(hold(FREE, INTERACTIVE)))
+    await asyncio.sleep(0)
+    assert scheduler.active == 3  # Free is still at its cap
+
+    tasks.append(asyncio.create_task(hold(PRO, INTERACTIVE)))
+    await asyncio.sleep(0)
+    assert scheduler.active == 4
+
+    tasks[0].cancel()
+    gate.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert scheduler.active == 0 and scheduler.waiting() == 0
+
+
+@pytest.mark.asyncio
+async def test_idle_tenants_are_forgotten(monkeypatch):
+    scheduler = FairScheduler(slots=2, reserved_interactive=0)
+    for i in range(1000):
+        async with scheduler.slot(Tenant(f"ip:{i}")):
+            pass
+    assert scheduler._tenants == {}
+
+    # Under constant load, idle tenants still ahead of virtual time are capped
+    monkeypatch.setattr("work_scheduler.MAX_IDLE_TENANTS", 10)
+    gate = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot(PRO):
+            await gate.wait()
+
+    busy = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    for i in range(100):
+        async with scheduler.slot(Tenant(f"ip:{i}")):
+            pass
+    assert len(scheduler._tenants) <= 11
+    gate.set()
+    await busy
+    assert scheduler._tenants == {}
@@ -0,0 +1,136 @@
+"""URL canonicalisation and de-duplication before fetching.
+
+Sitemaps and bulk URL lists often name one page several ways (trailing
+slash, tracking parameters, host case, http vs https, a redirecting URL and
+its destination). These helpers collapse such variants so each page is fetched
+once, and remember redirects and ``<link rel=canonical>`` targets seen while
+fetching so later scans go straight to the final URL.
+"""
+
+from urllib.parse import parse_qsl, unquote_plus, urlencode, urljoin, urlparse
+
+from cache import TTLCache
+
+TRACKING_PARAMS = frozenset({
+    "gclid", "dclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "igshid", "ref_src", "srsltid",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+REDIRECT_TTL = 24 * 3600.0
+_MAX_HOPS = 5
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL: lowercase scheme/host, no default port, fragment,
+    tracking parameters or trailing slash, and sorted query parameters."""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    netloc = host
+    if parsed.port and parsed.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parsed.port}"
+
+    path = parsed.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    params = [
+        (name, value)
+        for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ]
+    query = urlencode(sorted(params))
+    return parsed._replace(
+        scheme=scheme, netloc=netloc, path=path, params="", query=query, fragment=""
+    ).geturl()
+
+
+def strip_tracking(url: str) -> str:
+    """Remove the fragment and tracking parameters, leaving the URL otherwise as-is.
+
+    Remaining query parameters are kept byte-for-byte (encoding, order, bare
+    names), since servers may treat e.g. ``?id`` and ``?id=`` differently.
+    """
+    parsed = urlparse(url.strip())
+    query = "&".join(
+        segment
+        for segment in parsed.query.split("&")
+        if not _is_tracking_param(unquote_plus(segment.split("=", 1)[0]))
+    )
+    return parsed._replace(query=query, fragment="").geturl()
+
+
+def dedupe_key(url: str) -> str:
+    """Identity of a page for de-duplication: the canonical URL without its scheme."""
+    canonical = canonicalize_url(url)
+    return canonical.split("://", 1)[-1]
+
+
+def _same_site(a: str, b: str) -> bool:
+    host_a = (urlparse(a).hostname or "").lower().removeprefix("www.")
+    host_b = (urlparse(b).hostname or "").lower().removeprefix("www.")
+    return host_a == host_b
+
+
+class CanonicalRegistry:
+    """Remembers where URLs redirect to and which canonical URL pages declare."""
+
+    def __init__(self, ttl: float = REDIRECT_TTL, max_entries: int = 50_000):
+        self._redirects = TTLCache(ttl=ttl, max_entries=max_entries)
+        self._canonicals = TTLCache(ttl=ttl, max_entries=max_entries)
+
+    def record_redirect(self, requested: str, final: str) -> None:
+        if requested != final:
+            self._redirects.set(dedupe_key(requested), final)
+
+    def record_canonical(self, page_url: str, href: str) -> None:
+        canonical = urljoin(page_url, href.strip())
+        if not canonical.startswith(("http://", "https://")) or not _same_site(page_url, canonical):
+            return
+        if dedupe_key(canonical) != dedupe_key(page_url):
+            self._canonicals.set(dedupe_key(page_url), canonical)
+
+    def resolve(self, url: str, follow_canonical: bool = False) -> str:
+        """Return the URL to use for ``url`` after known redirects (and canonicals)."""
+        seen = set()
+        current = url
+        for _ in range(_MAX_HOPS):
+            key = dedupe_key(current)
+            if key in seen:
+                break
+            seen.add(key)
+            target = self._redirects.get(key)
+            if target is None and follow_canonical:
+                target = self._canonicals.get(key)
+            if target is None:
+                break
+            current = target
+        return current
+
+
+registry = CanonicalRegistry()
+
+
+def dedupe_urls(urls: list[str]) -> list[str]:
+    """Collapse URL variants and known redirect/canonical aliases, keeping order.
+
+    Returns the URL to fetch for each distinct page, with known redirects
+    applied and tracking parameters removed.
+    """
+    unique: list[str] = []
+    seen: set[str] = set()
+    for url in urls:
+        resolved = strip_tracking(registry.resolve(url, follow_canonical=True))
+        key = dedupe_key(resolved)
+        if key not in seen:
+            seen.add(key)
+            unique.append(resolved)
+    return unique
@@ -0,0 +1,218 @@
+"""Postgres work queue of per-URL scan tasks, shared by every API node.
+
+A job is a set of scan_tasks rows, one per URL. Workers on any node claim
+tasks in batches with ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent
+claims never block on or double-claim a row, and each claim takes a lease.
+Results are written back only while the worker still holds the lease; tasks
+whose lease expires (the worker died or stalled) are claimed again, up to
+TASK_MAX_ATTEMPTS times. A large scan therefore spreads across all nodes and
+survives losing one. Finished tasks are announced to clients through
+job_events.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import async_session_factory
+from db_models import ScanTask, User
+from host_limiter import HostThrottle
+from job_events import publish_progress
+from scraper import analyze_page_summary
+from work_scheduler import scheduler, user_tenant
+
+logger = logging.getLogger(__name__)
+
+TASK_LEASE_SECONDS = int(os.environ.get("TASK_LEASE_SECONDS", "300"))
+TASK_CLAIM_BATCH = int(os.environ.get("TASK_CLAIM_BATCH", "8"))
+WORK_QUEUE_ENABLED = os.environ.get("WORK_QUEUE_ENABLED", "true").lower() == "true"
+TASK_MAX_ATTEMPTS = 3
+QUEUE_POLL_INTERVAL = 2.0
+QUEUE_HOST_DELAY = 1.0  # seconds between this node's requests to one host
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class ClaimedTask:
+    id: int
+    job_id: uuid.UUID
+    url: str
+    params: dict[str, Any]
+    attempts: int
+    user_id: Optional[uuid.UUID] = None
+    plan: str = "free"
+
+
+@dataclass
+class TaskOutcome:
+    id: int
+    job_id: uuid.UUID
+    url: str
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    retry: bool = False  # put the task back in the queue instead of failing it
+
+
+# ---------------------------------------------------------------------------
+# API side
+# ---------------------------------------------------------------------------
+
+
+async def enqueue_job(db: AsyncSession, user_id: uuid.UUID, urls: list[str], params: dict[str, Any]) -> uuid.UUID:
+    """Queue one task per URL under a new job id."""
+    job_id = uuid.uuid4()
+    rows = [{"job_id": job_id, "user_id": user_id, "url": url, "params": params} for url in urls]
+    for start in range(0, len(rows), 1000):
+        await db.execute(insert(ScanTask).values(rows[start:start + 1000]))
+    return job_id
+
+
+async def job_tasks(db: AsyncSession, job_id: uuid.UUID, user_id: uuid.UUID) -> list[ScanTask]:
+    """A user's tasks for a job, in the order they were queued."""
+    result = await db.execute(
+        select(ScanTask)
+        .where(ScanTask.job_id == job_id, ScanTask.user_id == user_id)
+        .order_by(ScanTask.id)
+    )
+    return list(result.scalars().all())
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+
+async def claim_tasks(
+    limit: int,
+    worker_id: str = WORKER_ID,
+    lease_seconds: int = TASK_LEASE_SECONDS,
+) -> list[ClaimedTask]:
+    """
+    Claim up to ``limit`` queued (or lease-expired) tasks for this worker.
+
+    Expired tasks that have used up their attempts are failed instead, and
+    their jobs' progress is published on commit.
+    """
+    expired = and_(ScanTask.status == "running", ScanTask.lease_expires_at < func.now())
+    async with async_session_factory() as db:
+        # Tasks that keep losing their worker are given up on, not retried forever
+        abandoned = (await db.execute(
+            update(ScanTask)
+            .where(expired, ScanTask.attempts >= TASK_MAX_ATTEMPTS)
+            .values(status="failed", error="Lease expired too many times", updated_at=func.now())
+            .returning(ScanTask.job_id, ScanTask.url)
+            .execution_options(synchronize_session=False)
+        )).all()
+        finished: dict[uuid.UUID, list[dict[str, Any]]] = {}
+        for row in abandoned:
+            finished.setdefault(row.job_id, []).append({"url": row.url, "status": "failed"})
+        claimable = (
+            select(ScanTask.id)
+            .where(or_(ScanTask.status == "queued", expired))
+            .order_by(ScanTask.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = (await db.execute(
+            update(ScanTask)
+            .where(ScanTask.id.in_(claimable.scalar_subquery()))
+            .values(
+                status="running",
+                worker_id=worker_id,
+                attempts=ScanTask.attempts + 1,
+                lease_expires_at=func.now() + timedelta(seconds=lease_seconds),
+                updated_at=func.now(),
+            )
+            .returning(
+                ScanTask.id, ScanTask.job_id, ScanTask.url, ScanTask.params, ScanTask.attempts, ScanTask.user_id,
+                select(User.plan).where(User.id == ScanTask.user_id).scalar_subquery().label("plan"),
+            )
+            .execution_options(synchronize_session=False)
+        )).all()
+        await publish_progress(db, finished)
+        await db.commit()
+    return [
+        ClaimedTask(
+            id=row.id, job_id=row.job_id, url=row.url, params=row.params or {}, attempts=row.attempts,
+            user_id=row.user_id, plan=row.plan or "free",
+        )
+        for row in sorted(rows, key=lambda row: row.id)
+    ]
+
+
+async def complete_tasks(outcomes: list[TaskOutcome], worker_id: str = WORKER_ID) -> int:
+    """
+    Write results back for tasks this worker still holds.
+
+    A task whose lease expired and was claimed by another worker is left to
+    that worker. Progress of the affected jobs is published on commit.
+    Returns the number of tasks updated.
+    """
+    updated = 0
+    finished: dict[uuid.UUID, list[dict[str, Any]]] = {}
+    async with async_session_factory() as db:
+        for outcome in outcomes:
+            if outcome.retry:
+                values = {"status": "queued", "error": outcome.error, "worker_id": None, "lease_expires_at": None}
+            elif outcome.error is not None:
+                values = {"status": "failed", "error": outcome.error}
+            else:
+                values = {"status": "done", "result": outcome.result, "error": None}
+            result = await db.execute(
+                update(ScanTask)
+                .where(ScanTask.id == outcome.id, ScanTask.worker_id == worker_id, ScanTask.status == "running")
+                .values(**values, updated_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+            if result.rowcount and values["status"] != "queued":
+                finished.setdefault(outcome.job_id, []).append({"url": outcome.url, "status": values["status"]})
+        await publish_progress(db, finished)
+        await db.commit()
+    return updated
+
+
+async def process_task(task: ClaimedTask, throttle: HostThrottle) -> TaskOutcome:
+    """Fetch and analyze one task's URL."""
+    await throttle.wait(urlparse(task.url).hostname or "")
+    tenant = user_tenant(task.user_id, task.plan)
+    try:
+        async with scheduler.slot(tenant):
+            result = await analyze_page_summary(
+                task.url, task.params.get("target_pattern", "/services/"), owner=tenant.key
+            )
+    except Exception as exc:
+        return TaskOutcome(
+            id=task.id, job_id=task.job_id, url=task.url,
+            error=str(exc)[:500], retry=task.attempts < TASK_MAX_ATTEMPTS,
+        )
+    return TaskOutcome(id=task.id, job_id=task.job_id, url=task.url, result=result.model_dump())
+
+
+async def run_queue_worker(batch_size: int = TASK_CLAIM_BATCH, poll_interval: float = QUEUE_POLL_INTERVAL) -> None:
+    """Background task: claim, process and complete batches of tasks."""
+    throttle = HostThrottle(QUEUE_HOST_DELAY)
+    while True:
+        try:
+            tasks = await claim_tasks(batch_size)
+        except Exception:
+            logger.warning("Could not claim scan tasks", exc_info=True)
+            tasks = []
+        if not tasks:
+            await asyncio.sleep(poll_interval)
+            continue
+        outcomes = await asyncio.gather(*(process_task(task, throttle) for task in tasks))
+        try:
+            await complete_tasks(outcomes)
+        except Exception:
+            # The leases run out and the tasks are claimed again
+            logger.warning("Could not write back scan task results", exc_info=True)
@@ -0,0 +1,205 @@
+"""Plan-aware fair scheduling of expensive work (page fetches, parsing, embeddings).
+
+Every expensive operation runs inside ``scheduler.slot(tenant, kind)``. The
+node has WORK_SCHEDULER_SLOTS slots; when one frees up the next waiter is
+chosen by:
+
+1. Class: interactive (single-page) work goes ahead of batch work, and batch
+   work never takes the last INTERACTIVE_RESERVED_SLOTS slots, so an
+   /analyze call finds a free slot even while bulk scans fill the rest.
+2. Per-tenant caps: a tenant (a user, or a client IP for anonymous calls)
+   never holds more than its plan's PLAN_CONCURRENCY slots.
+3. Weighted fair queuing: within a class, tenants are served by start-time
+   fair queuing with their plan's PLAN_WEIGHTS, so a backlogged Pro user gets
+   four times a Free user's share of slots, but never all of them.
+
+Operations wait for a slot, not for each other: politeness delays and the
+like should happen outside the slot. Multi-page helpers (discovery, batch
+target fetches) take a ``Slot`` factory and hold one slot per request, so a
+large batch is charged for every page it fetches.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict, deque
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi import Request
+
+from rate_limit import trusted_client_ip
+
+WORK_SCHEDULER_SLOTS = int(os.environ.get("WORK_SCHEDULER_SLOTS", "16"))
+INTERACTIVE_RESERVED_SLOTS = int(os.environ.get("INTERACTIVE_RESERVED_SLOTS", "4"))
+# Idle tenants whose fair-share debt is remembered; the oldest are forgotten first
+MAX_IDLE_TENANTS = 4096
+
+# Plans are priority classes: their share of contended slots, and their cap
+PLAN_WEIGHTS = {"free": 1.0, "starter": 2.0, "pro": 4.0}
+PLAN_CONCURRENCY = {"free": 2, "starter": 4, "pro": 8}
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+_KINDS = (INTERACTIVE, BATCH)
+
+# Returns a context manager held around each expensive step
+Slot = Callable[[], AbstractAsyncContextManager]
+
+
+@dataclass(frozen=True)
+class Tenant:
+    key: str
+    plan: str = "free"
+
+
+def user_tenant(user_id: object, plan: Optional[str]) -> Tenant:
+    return Tenant(f"user:{user_id}", plan or "free")
+
+
+def request_tenant(request: Request) -> Tenant:
+    """Tenant for an anonymous call: its client IP, on the Free plan's terms."""
+    return Tenant(f"ip:{trusted_client_ip(request)}")
+
+
+@dataclass
+class _TenantState:
+    plan: str
+    active: int = 0
+    finish: dict[str, float] = field(default_factory=lambda: dict.fromkeys(_KINDS, 0.0))
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    cost: float
+
+
+class FairScheduler:
+    """Grants a fixed number of slots by class, per-tenant cap and fair share."""
+
+    def __init__(self, slots: int = WORK_SCHEDULER_SLOTS, reserved_interactive: int = INTERACTIVE_RESERVED_SLOTS):
+        self.slots = slots
+        self.batch_slots = max(slots - reserved_interactive, 1)
+        self.active = 0
+        self._active_batch = 0
+        self._virtual = dict.fromkeys(_KINDS, 0.0)
+        self._tenants: dict[str, _TenantState] = {}
+        # Idle tenants kept only because their finish tags are ahead of virtual time
+        self._idle: "OrderedDict[str, None]" = OrderedDict()
+        self._queues: dict[str, dict[str, deque[_Waiter]]] = {kind: {} for kind in _KINDS}
+
+    def waiting(self, kind: Optional[str] = None) -> int:
+        kinds = _KINDS if kind is None else (kind,)
+        return sum(len(queue) for k in kinds for queue in self._queues[k].values())
+
+    @asynccontextmanager
+    async def slot(self, tenant: Tenant, kind: str = BATCH, cost: float = 1.0) -> AsyncIterator[None]:
+        """Hold one slot for ``tenant`` while the block runs."""
+        state = self._tenants.get(tenant.key)
+        if state is None:
+            state = self._tenants[tenant.key] = _TenantState(tenant.plan)
+        state.plan = tenant.plan
+        self._idle.pop(tenant.key, None)
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), cost)
+        self._queues[kind].setdefault(tenant.key, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(tenant.key, kind)
+            else:
+                self._remove(kind, tenant.key, waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release(tenant.key, kind)
+
+    def _remove(self, kind: str, key: str, waiter: _Waiter) -> None:
+        queue = self._queues[kind].get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[kind][key]
+        self._forget_if_idle(key)
+
+    def _release(self, key: str, kind: str) -> None:
+        self.active -= 1
+        if kind == BATCH:
+            self._active_batch -= 1
+        self._tenants[key].active -= 1
+        self._forget_if_idle(key)
+        self._dispatch()
+
+    def _forget_if_idle(self, key: str) -> None:
+        state = self._tenants.get(key)
+        if state is None or state.active or any(key in self._queues[kind] for kind in _KINDS):
+            return
+        if self.active == 0 and not self.waiting():
+            # Nothing is backlogged, so nobody is owed service: start afresh
+            self._tenants.clear()
+            self._idle.clear()
+            self._virtual = dict.fromkeys(_KINDS, 0.0)
+            return
+        # Keep a tenant's finish tags while they are ahead of virtual time,
+        # so a tenant cannot reset its share by pausing between operations
+        if self._caught_up(state):
+            del self._tenants[key]
+            return
+        self._idle[key] = None
+        while len(self._idle) > MAX_IDLE_TENANTS:
+            oldest, _ = self._idle.popitem(last=False)
+            del self._tenants[oldest]
+
+    def _caught_up(self, state: _TenantState) -> bool:
+        return all(state.finish[kind] <= self._virtual[kind] for kind in _KINDS)
+
+    def _sweep_idle(self) -> None:
+        """Forget idle tenants that virtual time has caught up with."""
+        for key in [key for key in self._idle if self._caught_up(self._tenants[key])]:
+            del self._idle[key]
+            del self._tenants[key]
+
+    def _dispatch(self) -> None:
+        while self.active < self.slots:
+            picked = self._pick(INTERACTIVE)
+            if picked is None and self._active_batch < self.batch_slots:
+                picked = self._pick(BATCH)
+            if picked is None:
+                return
+            kind, key, tag = picked
+            queue = self._queues[kind][key]
+            waiter = queue.popleft()
+            if not queue:
+                del self._queues[kind][key]
+            if waiter.future.done():  # cancelled while queued
+                continue
+            state = self._tenants[key]
+            state.active += 1
+            state.finish[kind] = tag + waiter.cost / PLAN_WEIGHTS.get(state.plan, 1.0)
+            advanced = tag > self._virtual[kind]
+            self._virtual[kind] = tag
+            if advanced and self._idle:
+                self._sweep_idle()
+            self.active += 1
+            if kind == BATCH:
+                self._active_batch += 1
+            waiter.future.set_result(None)
+
+    def _pick(self, kind: str) -> Optional[tuple[str, str, float]]:
+        """The tenant whose next operation has the smallest start tag."""
+        best = None
+        for key in self._queues[kind]:
+            state = self._tenants[key]
+            if state.active >= PLAN_CONCURRENCY.get(state.plan, 1):
+                continue
+            tag = max(self._virtual[kind], state.finish[kind])
+            if best is None or tag < best[2]:
+                best = (kind, key, tag)
+        return best
+
+
+scheduler = FairScheduler()